@@ -29,14 +29,20 @@ from core.db import (
     get_all_projects,
     get_project_from_id,
     get_core_db_conn,
+    start_session_table_sweeper,
     update_project_files,
     get_project_code_from_id,
     update_project_details,
+    get_build_history,
 )
 
 from core.transpiler.generate_pyi import generate_pyi_stubs, CORE_LIBS
 from core.transpiler.lint_code import main as linter_main
-from core.compiler import compile_project
+from core.compiler import compile_project, compile_matrix
+from core.compile_scheduler import CompileScheduler, get_background_build_jobs
+from core.compile_status import CompileStatusStore
+from core.event_stream import publish_status, publish_prefetch_status
+from core.prefetch import PrefetchTask, get_project_boards, is_prefetch_enabled
 from core.env_manager import (
     get_all,
     get_value,
@@ -63,6 +69,9 @@ else:
 CORE_LIBS_PATH = os.path.join(BASE_DIR, "core", "transpiler", "core_libs")
 CORE_STUBS_PATH = os.path.join(BASE_DIR, "core", "transpiler", "core_stubs")
 
+# quiet period after a save before its speculative build is linted and queued
+SPECULATIVE_BUILD_DELAY = 2.0
+
 
 # Serial monitor
 _serial_instance = None
@@ -76,9 +85,13 @@ class Api:
     def __init__(self):
         self.is_packaged = getattr(sys, "frozen", False)
         self.main_loop = None
-        self.compile_queue = None
+        self.compile_scheduler = None
         self.loop_ready = False
-        self.compile_status = {}
+        self.compile_status = CompileStatusStore(publish=publish_status)
+        # project id → pending lint task / state of its speculative build
+        self.speculative_tasks = {}
+        self.speculative_builds = {}
+        self.prefetch = None
 
     # ------------------------
     # General app utils
@@ -156,7 +169,10 @@ class Api:
     def lint_code(self, code: str, platform):
         print(f"🔎 Linting code for {platform}")
         conn = get_core_db_conn()
-        errors = linter_main(code, conn, platform, CORE_LIBS_PATH)
+        try:
+            errors = linter_main(code, conn, platform, CORE_LIBS_PATH)
+        finally:
+            conn.close()
         print(f"Errors: {errors}")
         return errors
 
@@ -300,6 +316,7 @@ class Api:
     # ------------------------
     def save_project_files(self, project_id, code):
         update_project_files(project_id, code)
+        self.schedule_speculative_build(project_id, code)
         return
 
     def get_project_code(self, project_id):
@@ -332,28 +349,219 @@ class Api:
             "port": port,
         }
 
-        self.compile_status[project_id] = {
-            "completed": False,
-            "success": False,
-            "in_progress": True,
-            "message": "Compilation queued",
-            "session_id": None,
+        if not self.loop_ready:
+            return {"success": False, "error": "Main loop not ready"}
+
+        job = asyncio.run_coroutine_threadsafe(
+            self.queue_compile_job(project_id, task), self.main_loop
+        ).result()
+        return {
+            "success": True,
+            "message": "Compilation scheduled",
+            "session_id": job.session.id,
+        }
+
+    def compile_matrix(self, project_id, board_ids=None):
+        """Schedule a build of the project for several boards at once."""
+        project = get_project_from_id(project_id)
+        if not project:
+            return {"success": False, "error": f"Project {project_id} not found"}
+
+        board_ids = board_ids or [project["metadata"].get("board_id")]
+        board_ids = [board_id for board_id in board_ids if board_id]
+        if not board_ids:
+            return {"success": False, "error": "No boards selected"}
+
+        task = {
+            "project_id": project_id,
+            "boards": board_ids,
+            "code_files": {"main.py": get_project_code_from_id(project_id)},
         }
 
         if not self.loop_ready:
             return {"success": False, "error": "Main loop not ready"}
 
-        self.main_loop.call_soon_threadsafe(self.compile_queue.put_nowait, task)
-        return {"success": True, "message": "Compilation scheduled"}
+        job = asyncio.run_coroutine_threadsafe(
+            self.queue_compile_job(project_id, task), self.main_loop
+        ).result()
+        return {
+            "success": True,
+            "message": f"Matrix build of {len(board_ids)} boards scheduled",
+            "session_id": job.session.id,
+        }
+
+    async def queue_compile_job(self, project_id, task):
+        job = await self.compile_scheduler.submit(project_id, task)
+        # set on the loop, before a worker can pick the job up
+        self.compile_status.set(
+            project_id,
+            {
+                "state": "queued",
+                "percent": 0,
+                "completed": False,
+                "success": False,
+                "in_progress": True,
+                "message": "Compilation queued",
+                "session_id": job.session.id,
+            },
+        )
+        return job
+
+    # ------------------------
+    # Speculative builds
+    # ------------------------
+    def schedule_speculative_build(self, project_id, code):
+        """
+        Restart the project's speculative build after a save.
+
+        Projects that opted in (metadata "speculative_build") get a low
+        priority background build of the saved code once it lints clean. Its
+        firmware lands in the firmware cache, so the next upload of the same
+        code skips the compile and flashes straight away.
+        """
+        if not self.loop_ready:
+            return
+
+        task = None
+        project = get_project_from_id(project_id)
+        metadata = (project or {}).get("metadata") or {}
+        if metadata.get("speculative_build"):
+            board = metadata.get("board_id")
+            platform = metadata.get("platform")
+            if board and platform:
+                task = {
+                    "project_id": project_id,
+                    "board": board,
+                    "platform": platform,
+                    "code_files": {"main.py": code},
+                    "upload": False,
+                    "port": None,
+                }
+
+        asyncio.run_coroutine_threadsafe(
+            self.restart_speculative_build(project_id, task), self.main_loop
+        )
+
+    async def restart_speculative_build(self, project_id, task):
+        """Cancel the build of the previous save, then queue `task` if given."""
+        previous = self.speculative_tasks.pop(project_id, None)
+        if previous is not None:
+            previous.cancel()
+        if await self.compile_scheduler.cancel_background(project_id):
+            print(f"⏹️ Cancelled speculative build of {project_id}")
+        self.speculative_builds.pop(project_id, None)
+
+        if task is not None:
+            self.speculative_tasks[project_id] = asyncio.ensure_future(
+                self.queue_speculative_build(project_id, task)
+            )
+
+    async def queue_speculative_build(self, project_id, task):
+        """Lint the saved code after a quiet period, queue a build if clean."""
+        try:
+            await asyncio.sleep(SPECULATIVE_BUILD_DELAY)
+            lint = await asyncio.to_thread(
+                self._lint_quietly, task["code_files"]["main.py"], task["platform"]
+            )
+            if lint.get("errors"):
+                return
+
+            job = await self.compile_scheduler.submit(project_id, task, background=True)
+            if job is not None:
+                self.speculative_builds[project_id] = {
+                    "state": "queued",
+                    "session_id": job.session.id,
+                    "board": task["board"],
+                }
+        finally:
+            if self.speculative_tasks.get(project_id) is asyncio.current_task():
+                del self.speculative_tasks[project_id]
+
+    def _lint_quietly(self, code, platform):
+        conn = get_core_db_conn()
+        try:
+            return linter_main(code, conn, platform, CORE_LIBS_PATH) or {}
+        finally:
+            conn.close()
+
+    async def run_speculative_job(self, job):
+        """Build a background job; its firmware is cached for the next upload."""
+        task = job.request
+        project_id = job.project_id
+        self.speculative_builds[project_id] = {
+            "state": "building",
+            "session_id": job.session.id,
+            "board": task["board"],
+        }
+
+        try:
+            result = await compile_project(
+                task["code_files"],
+                task["board"],
+                task["platform"],
+                user_app_dir=str(get_app_dir()),
+                project_id=project_id,
+                session=job.session,
+                jobs=get_background_build_jobs(),
+                low_priority=True,
+            )
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+
+        # cancelled by the next save, which has reset the state already
+        if result.get("cancelled"):
+            return
+
+        self.speculative_builds[project_id] = {
+            "state": "ready" if result.get("success") else "failed",
+            "session_id": job.session.id,
+            "board": task["board"],
+            "error": result.get("error"),
+            "finished_at": time.time(),
+        }
+        print(
+            f"🧪 Speculative build of {project_id}: "
+            f"{self.speculative_builds[project_id]['state']}"
+        )
 
     async def compile_worker(self):
-        """Processes compile tasks sequentially."""
+        """Runs the compile scheduler's worker pool."""
         self.loop_ready = True
-        while True:
-            task = await self.compile_queue.get()
-            project_id = task["project_id"]
+        await self.compile_scheduler.run()
+
+    async def run_compile_job(self, job):
+        """Build (and optionally upload) one scheduled compile job."""
+        if job.background:
+            return await self.run_speculative_job(job)
+
+        task = job.request
+        project_id = job.project_id
+
+        self.compile_status.set(
+            project_id,
+            {
+                "state": "transpiling",
+                "percent": 5,
+                "completed": False,
+                "success": False,
+                "in_progress": True,
+                "message": "Compiling",
+                "session_id": job.session.id,
+            },
+        )
+        job.session.listeners.append(self.compile_status.track_session(project_id))
 
-            try:
+        try:
+            if "boards" in task:
+                result = await compile_matrix(
+                    task["code_files"],
+                    task["boards"],
+                    user_app_dir=str(get_app_dir()),
+                    project_id=project_id,
+                    session=job.session,
+                    max_parallel=self.compile_scheduler.workers,
+                )
+            else:
                 result = await compile_project(
                     task["code_files"],
                     task["board"],
@@ -361,49 +569,128 @@ class Api:
                     user_app_dir=str(get_app_dir()),
                     upload=task["upload"],
                     port=task["port"],
+                    project_id=project_id,
+                    session=job.session,
                 )
 
-                session_id = result.get("session_id")
-                self.compile_status[project_id] = {
+            # a newer request pre-empted this build and owns the status now
+            if job.preempted and self.compile_scheduler.has_pending(project_id):
+                return
+
+            if result.get("success"):
+                state = "done"
+            elif result.get("cancelled"):
+                state = "cancelled"
+            else:
+                state = "failed"
+
+            self.compile_status.set(
+                project_id,
+                {
+                    "state": state,
+                    "percent": 100,
                     "completed": True,
                     "success": result.get("success", False),
                     "in_progress": False,
                     "message": result.get("message", "Done"),
-                    "session_id": session_id,
+                    "session_id": job.session.id,
                     "error": result.get("error"),
                     "warnings": result.get("warnings", []),
                     "specs": result.get("specs", {}),
                     "suggestions": result.get("suggestions", []),
-                }
+                    "results": result.get("results"),
+                    "size_report": result.get("size_report"),
+                },
+            )
 
-            except Exception as e:
-                self.compile_status[project_id] = {
+        except Exception as e:
+            self.compile_status.set(
+                project_id,
+                {
+                    "state": "failed",
+                    "percent": 100,
                     "completed": True,
                     "success": False,
                     "in_progress": False,
+                    "message": "Compilation failed",
+                    "session_id": job.session.id,
                     "error": str(e),
-                }
-            finally:
-                self.compile_queue.task_done()
+                },
+            )
+
+    def start_prefetch(self):
+        """Install the PlatformIO packages builds will need in the background."""
+        if not is_prefetch_enabled():
+            print("⏭️ Package prefetch disabled")
+            return
+        boards = get_project_boards(get_all_projects())
+        self.prefetch = PrefetchTask(
+            str(get_app_dir()), boards, publish=publish_prefetch_status
+        )
+        self.prefetch.start()
+
+    def get_prefetch_status(self):
+        """Progress of the startup package prefetch."""
+        if self.prefetch is None:
+            return {"state": "disabled"}
+        return self.prefetch.get_status()
 
     def get_compile_status(self, project_id):
-        """Get current compile or upload state."""
-        return self.compile_status.get(project_id, {"exists": False})
+        """Get current compile or upload state, with scheduler queue details."""
+        status = self.compile_status.get(project_id)
+        if status is None:
+            return {
+                "exists": False,
+                "speculative": self.speculative_builds.get(project_id),
+            }
+
+        if self.compile_scheduler is not None:
+            status["queue"] = self.compile_scheduler.get_job_status(project_id)
+        status["speculative"] = self.speculative_builds.get(project_id)
+        return status
+
+    def wait_compile_status(self, project_id, since=0, timeout=25):
+        """
+        Long-poll for status changes after sequence number `since`.
+
+        Returns as soon as the project's status changes (or after `timeout`
+        seconds) with the latest `seq`, the current `status` and the
+        transitions missed since `since` in `events`.
+        """
+        timeout = max(0, min(float(timeout), 60))
+        result = self.compile_status.wait(project_id, since=since, timeout=timeout)
+        if result["status"] is not None and self.compile_scheduler is not None:
+            result["status"]["queue"] = self.compile_scheduler.get_job_status(
+                project_id
+            )
+        return result
 
     def cancel_compile(self, project_id):
-        """Cancel an ongoing compilation."""
-        status = self.compile_status.get(project_id)
-        if not status or not status.get("session_id"):
-            return {"success": False, "error": "No active session"}
-        session_id = status["session_id"]
-        ok = cancel_session(session_id)
+        """Cancel a queued or ongoing compilation."""
+        if not self.loop_ready:
+            return {"success": False, "error": "Main loop not ready"}
+
+        ok = asyncio.run_coroutine_threadsafe(
+            self.compile_scheduler.cancel(project_id), self.main_loop
+        ).result()
         if ok:
-            status["in_progress"] = False
-            status["completed"] = True
-            status["success"] = False
-            status["message"] = "Cancelled by user"
+            if self.compile_status.get(project_id):
+                # merged, so it keeps the cancelled build's session_id
+                self.compile_status.update(
+                    project_id,
+                    state="cancelled",
+                    percent=100,
+                    in_progress=False,
+                    completed=True,
+                    success=False,
+                    message="Cancelled by user",
+                )
             return {"success": True, "message": "Cancelled"}
-        return {"success": False, "error": "Session not found or inactive"}
+        return {"success": False, "error": "No active session"}
+
+    def get_build_history(self, project_id, board=None, limit=50):
+        """Memory and size specs of past builds, newest first."""
+        return get_build_history(project_id, board=board, limit=limit)
 
     # ------------------------
     # Environment Variables
@@ -572,14 +859,20 @@ if __name__ == "__main__":
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     api.main_loop = loop
-    api.compile_queue = asyncio.Queue()
+    api.compile_scheduler = CompileScheduler(api.run_compile_job)
 
-    # Start compile worker
+    # Start compile workers
     loop.create_task(api.compile_worker())
     threading.Thread(target=loop.run_forever, daemon=True).start()
 
     # Start update checker
     start_update_checker(window, interval=3600)
 
+    # Clear leftover transpile/lint session tables and compact core_db.db
+    start_session_table_sweeper()
+
+    # Install toolchains and libraries before the first build needs them
+    api.start_prefetch()
+
     # Launch webview
     webview.start(debug=DEV, http_server=True, private_mode=False)
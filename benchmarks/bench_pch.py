@@ -0,0 +1,129 @@
+"""
+Benchmark sketch compile time with and without the precompiled Py* runtime.
+
+Transpiles one sketch, sets up a build folder for each variant and builds it
+once so the framework and libraries are compiled. Every timed run then
+deletes only the sketch objects (.pio/build/<board>/src) and the shared
+object cache, and times `pio run`, i.e. recompiling the sketch and linking,
+which is what an edit costs.
+
+"pch cold" is the first timed run with an empty PCH dir, so it includes
+precompiling PyRuntime.h; "pch warm" reuses it. Needs the PlatformIO
+install and the board's platform that compiles use.
+
+Usage:
+    python benchmarks/bench_pch.py [--runs 5] [--board esp32dev] [--sketch tests/test_pylist.py]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from core.utils import get_app_dir, get_platform_for_board_id
+from core.compiler import (
+    PCH_DIR_NAME,
+    get_platformio_command,
+    prepare_build_folder,
+    run_transpiler,
+    write_platformio_ini,
+    write_transpiled_code,
+)
+
+
+def clear_object_cache(cache_dir):
+    """Empty the shared object cache, keeping the precompiled headers."""
+    for name in os.listdir(cache_dir):
+        if name != PCH_DIR_NAME:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+
+def pio_run(pio_cmd, env, build_dir):
+    start = time.perf_counter()
+    result = subprocess.run(
+        pio_cmd + ["run"],
+        cwd=build_dir,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stdout[-4000:])
+        raise SystemExit(f"pio run failed in {build_dir}")
+    return elapsed
+
+
+def time_variant(transpiled, board, platform, pch, runs, work_dir):
+    user_app_dir = str(get_app_dir())
+    build_dir = prepare_build_folder()
+    cache_dir = os.path.join(work_dir, "cache-pch" if pch else "cache")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    try:
+        write_transpiled_code(transpiled["code"], build_dir)
+        write_platformio_ini(
+            board,
+            platform,
+            build_dir,
+            transpiled.get("dependencies", []),
+            cache_dir,
+            pch=pch,
+        )
+        pio_cmd, pio_env = get_platformio_command(user_app_dir, cache_dir)
+        env = os.environ.copy()
+        env.update(pio_env)
+
+        # framework and libraries
+        pio_run(pio_cmd, env, build_dir)
+        sketch_objects = os.path.join(build_dir, ".pio", "build", board, "src")
+        # the first timed run has to precompile PyRuntime.h again
+        shutil.rmtree(os.path.join(cache_dir, PCH_DIR_NAME), ignore_errors=True)
+
+        timings = []
+        for _ in range(runs):
+            shutil.rmtree(sketch_objects, ignore_errors=True)
+            clear_object_cache(cache_dir)
+            timings.append(pio_run(pio_cmd, env, build_dir))
+        return timings
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="at least 2")
+    parser.add_argument("--board", default="esp32dev")
+    parser.add_argument(
+        "--sketch", default=os.path.join(ROOT_DIR, "tests", "test_pylist.py")
+    )
+    args = parser.parse_args()
+
+    platform = get_platform_for_board_id(args.board)
+    if not platform:
+        raise SystemExit(f"Unknown board {args.board}")
+
+    with open(args.sketch, "r", encoding="utf-8") as f:
+        transpiled = run_transpiler({"main.py": f.read()}, platform, 115200, None)
+
+    runs = max(2, args.runs)
+    with tempfile.TemporaryDirectory(prefix="bench_pch_") as work_dir:
+        plain = time_variant(transpiled, args.board, platform, False, runs, work_dir)
+        pch = time_variant(transpiled, args.board, platform, True, runs, work_dir)
+
+    print(f"Sketch rebuild of {os.path.basename(args.sketch)} for {args.board}")
+    print(f"  {'no pch':<10} median {statistics.median(plain):7.2f} s")
+    print(f"  {'pch warm':<10} median {statistics.median(pch[1:]):7.2f} s")
+    print(f"  {'pch cold':<10}        {pch[0]:7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark DependencyResolver session setup over the full core_libs set.
+
+Builds a sketch that imports every module under core/transpiler/core_libs
+and times how long it takes to create a resolver session for it against an
+on-disk SQLite file, which is where per-row commits hurt the most.
+
+"legacy" replays the old write path (PRAGMA table_info, one-row INSERT and
+a commit for every row) so the numbers can be compared in a single run.
+All variants use the TEMP session tables, so the legacy numbers understate
+what per-row commits cost when the tables lived in core_db.db itself.
+
+Usage:
+    python benchmarks/bench_resolver_setup.py [--runs 20] [--platform espressif32]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+import ast
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from core.transpiler.transpiler import (
+    DependencyResolver,
+    create_dependency_resolver,
+    extract_imported_modules_from_tree,
+)
+
+CORE_LIBS_PATH = os.path.join(ROOT_DIR, "core", "transpiler", "core_libs")
+
+
+class LegacyWriteDependencyResolver(DependencyResolver):
+    """SQLite resolver with the pre-batching write path."""
+
+    def _insert_dicts_to_table(self, table_name, dict_list):
+        self.cursor.execute(f"PRAGMA table_info({table_name})")
+        table_columns = [col[1] for col in self.cursor.fetchall()]
+
+        for data in dict_list:
+            placeholders = ",".join("?" for _ in table_columns)
+            self.cursor.execute(
+                f"INSERT INTO {table_name} ({','.join(table_columns)}) VALUES ({placeholders})",
+                [data.get(col) for col in table_columns],
+            )
+            self.conn.commit()
+
+
+def get_all_core_modules_sketch():
+    imports = []
+    for dirpath, _, filenames in os.walk(CORE_LIBS_PATH):
+        for filename in sorted(filenames):
+            if not filename.endswith(".py"):
+                continue
+            rel_path = os.path.relpath(os.path.join(dirpath, filename), CORE_LIBS_PATH)
+            module_name = rel_path[: -len(".py")].replace(os.sep, ".")
+            imports.append(f"import {module_name}")
+
+    return "\n".join(sorted(imports))
+
+
+def time_setup(make_resolver, db_path, platform, runs):
+    tree = ast.parse(get_all_core_modules_sketch())
+    timings = []
+
+    for _ in range(runs):
+        conn = sqlite3.connect(db_path)
+        session_id = str(uuid.uuid4()).replace("-", "_")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            modules = extract_imported_modules_from_tree(tree, CORE_LIBS_PATH)
+            resolver = make_resolver(session_id, conn, platform, modules)
+            timings.append(time.perf_counter() - start)
+            resolver.close()
+
+        conn.close()
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--platform", default="espressif32")
+    args = parser.parse_args()
+
+    variants = {
+        "legacy (per-row commit)": lambda *a: LegacyWriteDependencyResolver(
+            *a[:3], imported_modules=a[3]
+        ),
+        "sqlite (batched)": lambda *a: create_dependency_resolver(
+            *a[:3], imported_modules=a[3], backend="sqlite"
+        ),
+        "memory": lambda *a: create_dependency_resolver(
+            *a[:3], imported_modules=a[3], backend="memory"
+        ),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_core_db.db")
+
+        # warm the metadata cache so every variant measures the write path only
+        time_setup(variants["memory"], db_path, args.platform, 1)
+
+        print(f"Session setup over all core_libs ({args.runs} runs)")
+        for name, make_resolver in variants.items():
+            timings = time_setup(make_resolver, db_path, args.platform, args.runs)
+            print(
+                f"  {name:<26} median {statistics.median(timings) * 1000:8.2f} ms"
+                f"   min {min(timings) * 1000:8.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark ArduinoTranspiler.visit dispatch over the sketches in tests/.
+
+"legacy" replays the old dispatcher (getattr on every node, a call with
+context= and a second call when the visitor raises TypeError) so both can
+be compared in a single run. Resolver sessions are created outside the
+timed region, only ArduinoTranspiler.transpile() is measured. Sketches that
+fail to transpile are skipped.
+
+Usage:
+    python benchmarks/bench_visitor_dispatch.py [--runs 20] [--platform espressif32]
+"""
+
+import argparse
+import ast
+import glob
+import os
+import sqlite3
+import statistics
+import sys
+import time
+import uuid
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from core.logger import configure_logging
+from core.transpiler.transpiler import (
+    ArduinoTranspiler,
+    create_dependency_resolver,
+    extract_imported_modules_from_tree,
+)
+
+CORE_LIBS_PATH = os.path.join(ROOT_DIR, "core", "transpiler", "core_libs")
+SKETCHES_PATH = os.path.join(ROOT_DIR, "tests")
+
+
+class LegacyDispatchTranspiler(ArduinoTranspiler):
+    """ArduinoTranspiler with the pre-dispatch-table visit()."""
+
+    def visit(self, node, context=None):
+        method_name = "visit_" + node.__class__.__name__
+        visitor = getattr(self, method_name, self.generic_visit)
+        try:
+            return visitor(node, context=context)
+        except TypeError:
+            return visitor(node)
+
+
+def load_sketches():
+    sketches = {}
+    for path in sorted(
+        glob.glob(os.path.join(SKETCHES_PATH, "**", "*.py"), recursive=True)
+    ):
+        with open(path, "r", encoding="utf-8") as f:
+            sketches[os.path.relpath(path, ROOT_DIR)] = ast.parse(f.read())
+    return sketches
+
+
+def transpile_once(transpiler_class, tree, platform):
+    conn = sqlite3.connect(":memory:")
+    session_id = str(uuid.uuid4()).replace("-", "_")
+    modules = extract_imported_modules_from_tree(tree, CORE_LIBS_PATH)
+    resolver = create_dependency_resolver(
+        session_id, conn, platform, imported_modules=modules
+    )
+
+    try:
+        transpiler = transpiler_class("main.py", tree, resolver, 115200)
+        start = time.perf_counter()
+        transpiler.transpile()
+        return time.perf_counter() - start
+    finally:
+        resolver.close()
+        conn.close()
+
+
+def time_variant(transpiler_class, sketches, platform, runs):
+    timings = []
+    for _ in range(runs):
+        total = 0.0
+        for tree in sketches.values():
+            total += transpile_once(transpiler_class, tree, platform)
+        timings.append(total)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--platform", default="espressif32")
+    args = parser.parse_args()
+
+    # keep failing sketches' log output out of the results
+    configure_logging(level="off")
+
+    sketches = {}
+    for name, tree in load_sketches().items():
+        try:
+            transpile_once(ArduinoTranspiler, tree, args.platform)
+        except Exception:
+            continue
+        sketches[name] = tree
+
+    variants = {
+        "legacy (getattr + retry)": LegacyDispatchTranspiler,
+        "dispatch table": ArduinoTranspiler,
+    }
+
+    print(f"Transpiling {len(sketches)} sketches from tests/ ({args.runs} runs)")
+    results = {}
+    for name, transpiler_class in variants.items():
+        timings = time_variant(transpiler_class, sketches, args.platform, args.runs)
+        results[name] = statistics.median(timings)
+        print(
+            f"  {name:<26} median {results[name] * 1000:8.2f} ms"
+            f"   min {min(timings) * 1000:8.2f} ms"
+        )
+
+    legacy, current = results.values()
+    print(f"  speedup {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
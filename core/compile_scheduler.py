@@ -0,0 +1,312 @@
+"""
+Scheduler for compile and upload jobs.
+
+Up to `workers` builds run at once, at most one per project, so a build for
+project B no longer waits behind project A. A request for a project that
+already has a job of the same kind (single board or matrix, see
+get_request_kind) waiting is coalesced into that job: it keeps its place
+and session but runs the newest request, still uploading if either of them
+asked to (see merge_requests). A request for a project whose build of the
+same kind is running pre-empts it through CompilerSession.cancel, unless
+that build has already started flashing the board; the upload it was
+bound for carries over to the new job. Jobs of different kinds for one
+project wait side by side and run one after the other.
+
+Background jobs (speculative builds started on save) have the lowest
+priority: they only start when no requested build could, they never take
+the last idle worker (unless there is only one), and at most
+`background_workers` of them run at once. A background job is dropped when
+a build is requested for its project; one that is already running is left
+to finish, so the requested build that follows it reuses its firmware.
+
+The worker count defaults to DEFAULT_COMPILE_WORKERS and can be set with
+MOJOSCALE_COMPILE_WORKERS. MOJOSCALE_BACKGROUND_BUILD_JOBS caps the
+parallel compiler processes of a background build (its CPU budget).
+"""
+
+import os
+import time
+import asyncio
+import threading
+from typing import Optional
+from collections import OrderedDict, deque
+
+from core.compiler import CompilerSession, SessionPhase
+from core.logger import get_logger
+
+log = get_logger("compiler")
+
+COMPILE_WORKERS_ENV_VAR = "MOJOSCALE_COMPILE_WORKERS"
+DEFAULT_COMPILE_WORKERS = 2
+DEFAULT_BACKGROUND_WORKERS = 1
+
+BACKGROUND_BUILD_JOBS_ENV_VAR = "MOJOSCALE_BACKGROUND_BUILD_JOBS"
+
+# wait time stats cover the last N started jobs
+WAIT_TIME_WINDOW = 50
+
+_UPLOAD_PHASES = (SessionPhase.START_UPLOAD, SessionPhase.END_UPLOAD)
+
+
+def get_worker_count(workers=None) -> int:
+    if workers is None:
+        workers = os.getenv(COMPILE_WORKERS_ENV_VAR)
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        workers = DEFAULT_COMPILE_WORKERS
+    return max(1, workers)
+
+
+def get_background_build_jobs() -> int:
+    """Parallel compiler processes (`pio run -j`) for a background build."""
+    try:
+        return max(1, int(os.getenv(BACKGROUND_BUILD_JOBS_ENV_VAR)))
+    except (TypeError, ValueError):
+        return max(1, (os.cpu_count() or 1) // 4)
+
+
+def get_request_kind(request: dict) -> str:
+    """Requests of the same kind for a project are duplicates of each other."""
+    return "matrix" if "boards" in request else "board"
+
+
+def merge_requests(previous: dict, request: dict) -> dict:
+    """The newest request, still flashing the board if `previous` would have."""
+    merged = dict(request)
+    if previous.get("upload") and not request.get("upload"):
+        merged["upload"] = True
+        merged["port"] = previous.get("port")
+    return merged
+
+
+class CompileJob:
+    def __init__(self, project_id, request: dict, background: bool = False):
+        self.project_id = project_id
+        self.request = request
+        self.background = background
+        self.session = CompilerSession()
+        # speculative builds stay out of the terminal
+        self.session.quiet = background
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.coalesced = 0
+        self.preempted = False
+
+    @property
+    def key(self):
+        """Key of the job in CompileScheduler.pending."""
+        return (self.project_id, get_request_kind(self.request))
+
+    def get_wait_time(self) -> float:
+        return (self.started_at or time.time()) - self.enqueued_at
+
+
+class CompileScheduler:
+    def __init__(
+        self, run_job, workers=None, background_workers=DEFAULT_BACKGROUND_WORKERS
+    ):
+        """`run_job` is an async callable taking a CompileJob."""
+        self.run_job = run_job
+        self.workers = get_worker_count(workers)
+        self.background_workers = background_workers
+        # (project id, request kind) → waiting job
+        self.pending: "OrderedDict[tuple, CompileJob]" = OrderedDict()
+        self.running: dict = {}
+        self.wait_times = deque(maxlen=WAIT_TIME_WINDOW)
+        # status is read from the webview thread
+        self._lock = threading.Lock()
+        self._wakeup = None
+
+    async def run(self):
+        """Run the worker pool forever."""
+        self._wakeup = asyncio.Event()
+        log.info("🧵 Compile scheduler started with %s workers", self.workers)
+        await asyncio.gather(*(self._worker() for _ in range(self.workers)))
+
+    async def submit(
+        self, project_id, request: dict, background: bool = False
+    ) -> Optional[CompileJob]:
+        """Queue a request, coalescing it with a waiting job of the same kind.
+
+        Returns None for a background request while a requested build of
+        the project is waiting or running.
+        """
+        key = (project_id, get_request_kind(request))
+        with self._lock:
+            waiting = self._get_pending(project_id)
+            running = self.running.get(project_id)
+            if background and any(
+                not other.background
+                for other in waiting + ([running] if running is not None else [])
+            ):
+                return None
+            if not background:
+                for other in waiting:
+                    if other.background:
+                        log.info("⏭️ Dropping speculative build of %s", project_id)
+                        del self.pending[other.key]
+
+            job = self.pending.get(key)
+            if job is not None:
+                job.request = merge_requests(job.request, request)
+                job.coalesced += 1
+                log.info(
+                    "🔁 Coalesced compile request for %s (%s merged)",
+                    project_id,
+                    job.coalesced,
+                )
+                return job
+
+            # a running speculative build is left to finish for a requested
+            # one, which then reuses its firmware
+            preempt = (
+                running is not None
+                and running.background == background
+                and running.key == key
+                and running.session.phase not in _UPLOAD_PHASES
+            )
+            if preempt:
+                request = merge_requests(running.request, request)
+            job = self.pending[key] = CompileJob(project_id, request, background)
+
+        if preempt:
+            log.info("⏹️ Pre-empting running build of %s", project_id)
+            running.preempted = True
+            await running.session.cancel()
+
+        self._notify()
+        return job
+
+    def _get_pending(self, project_id) -> list:
+        """Waiting jobs of a project, oldest first (call with the lock held)."""
+        return [job for job in self.pending.values() if job.project_id == project_id]
+
+    async def cancel(self, project_id) -> bool:
+        """Drop the waiting jobs and cancel the running one for a project."""
+        with self._lock:
+            jobs = self._get_pending(project_id)
+            for job in jobs:
+                del self.pending[job.key]
+            running = self.running.get(project_id)
+            if running is not None:
+                jobs.append(running)
+
+        for job in jobs:
+            await job.session.cancel()
+        return bool(jobs)
+
+    async def cancel_background(self, project_id) -> bool:
+        """Drop or cancel the project's speculative build, if it has one."""
+        with self._lock:
+            pending = next(
+                (job for job in self._get_pending(project_id) if job.background),
+                None,
+            )
+            if pending is not None:
+                del self.pending[pending.key]
+            running = self.running.get(project_id)
+            if running is not None and not running.background:
+                running = None
+
+        if running is not None:
+            running.preempted = True
+            await running.session.cancel()
+        return pending is not None or running is not None
+
+    def has_pending(self, project_id) -> bool:
+        with self._lock:
+            return bool(self._get_pending(project_id))
+
+    def get_job_status(self, project_id) -> dict:
+        """Queue position, depth and wait times for a project's jobs."""
+        with self._lock:
+            pending_ids = [job.project_id for job in self.pending.values()]
+            waiting = self._get_pending(project_id)
+            job = waiting[0] if waiting else None
+            state = "queued"
+            if job is None:
+                job = self.running.get(project_id)
+                state = "running"
+            wait_times = list(self.wait_times)
+            running_count = len(self.running)
+
+        status = {
+            "state": None,
+            "queue_depth": len(pending_ids),
+            "running": running_count,
+            "workers": self.workers,
+            "avg_wait": sum(wait_times) / len(wait_times) if wait_times else 0.0,
+            "max_wait": max(wait_times, default=0.0),
+        }
+        if job is not None:
+            status.update(
+                {
+                    "state": state,
+                    "session_id": job.session.id,
+                    "wait_time": job.get_wait_time(),
+                    "coalesced": job.coalesced,
+                    "background": job.background,
+                }
+            )
+            if state == "queued":
+                status["queue_position"] = pending_ids.index(project_id) + 1
+        return status
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _can_start_background(self) -> bool:
+        running = self.running.values()
+        if sum(1 for job in running if job.background) >= self.background_workers:
+            return False
+        # keep a worker free for requested builds
+        return len(self.running) < max(1, self.workers - 1)
+
+    def _next_job(self):
+        """Pop the oldest waiting job whose project has no build running.
+
+        Requested builds go first; background jobs only when none can start.
+        """
+        with self._lock:
+            runnable = [
+                job
+                for job in self.pending.values()
+                if job.project_id not in self.running
+            ]
+            job = next((job for job in runnable if not job.background), None)
+            if job is None and self._can_start_background():
+                job = next(iter(runnable), None)
+            if job is None:
+                return None
+
+            del self.pending[job.key]
+            self.running[job.project_id] = job
+            job.started_at = time.time()
+            if not job.background:
+                self.wait_times.append(job.get_wait_time())
+            return job
+
+    async def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            log.info(
+                "▶️ Building %s after waiting %.2fs",
+                job.project_id,
+                job.get_wait_time(),
+            )
+            try:
+                await self.run_job(job)
+            except Exception:
+                log.exception("❌ Compile job for %s crashed", job.project_id)
+            finally:
+                with self._lock:
+                    self.running.pop(job.project_id, None)
+                # a job for the same project may be waiting on this one
+                self._notify()
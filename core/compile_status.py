@@ -0,0 +1,149 @@
+"""
+Compile status per project, with sequence numbers and push delivery.
+
+Every change to a project's status gets the next number of a process-wide
+sequence and is kept in a bounded history. Changes are pushed to the
+frontend over the compiler event channel (as {"type": "status"} events,
+delivered to window.__onCompileStatus), and `wait` offers a long-poll for
+clients that prefer to pull: it returns as soon as the project's status is
+newer than the sequence number the client last saw, together with every
+transition it missed.
+
+States: queued, transpiling, compiling, uploading, done, failed, cancelled.
+"""
+
+import re
+import time
+import threading
+from collections import deque
+
+from core.compiler import SessionPhase
+
+HISTORY_SIZE = 500
+LONG_POLL_TIMEOUT = 25.0
+
+# phase → (state, percent) while a build is running
+PHASE_STATES = {
+    SessionPhase.BEGIN_TRANSPILE: ("transpiling", 10),
+    SessionPhase.END_TRANSPILE: ("transpiling", 25),
+    SessionPhase.COMPILE_CACHE_MISS: ("compiling", 35),
+    SessionPhase.BEGIN_COMPILE: ("compiling", 40),
+    SessionPhase.COMPILE_CACHE_HIT: ("compiling", 65),
+    SessionPhase.END_COMPILE: ("compiling", 70),
+    SessionPhase.START_UPLOAD: ("uploading", 80),
+    SessionPhase.END_UPLOAD: ("uploading", 95),
+}
+
+# esptool: "Writing at 0x00010000... (40 %)"
+UPLOAD_PERCENT_PATTERN = re.compile(r"\((\d{1,3})\s*%\)")
+
+
+class CompileStatusStore:
+    def __init__(self, publish=None, history_size: int = HISTORY_SIZE):
+        """`publish` is called with every new status snapshot."""
+        self.publish = publish
+        self._statuses = {}
+        self._history = deque(maxlen=history_size)
+        self._seq = 0
+        self._condition = threading.Condition()
+
+    def get(self, project_id):
+        with self._condition:
+            status = self._statuses.get(project_id)
+            return dict(status) if status is not None else None
+
+    def set(self, project_id, status: dict) -> dict:
+        """Replace a project's status."""
+        return self._commit(project_id, dict(status))
+
+    def update(self, project_id, **fields) -> dict:
+        """Merge fields into a project's status."""
+        with self._condition:
+            status = dict(self._statuses.get(project_id) or {})
+            status.update(fields)
+            return self._commit(project_id, status)
+
+    def _commit(self, project_id, status: dict) -> dict:
+        with self._condition:
+            prev_seq = self._get_seq(project_id)
+            self._seq += 1
+            status["seq"] = self._seq
+            status["project_id"] = project_id
+            status["updated_at"] = time.time()
+            self._statuses[project_id] = status
+            self._history.append((self._seq, prev_seq, project_id, status))
+            self._condition.notify_all()
+
+            # under the lock, so snapshots are published in seq order
+            snapshot = dict(status)
+            if self.publish is not None:
+                self.publish(snapshot)
+            return snapshot
+
+    def _get_seq(self, project_id) -> int:
+        status = self._statuses.get(project_id)
+        return status["seq"] if status else 0
+
+    def wait(self, project_id, since: int = 0, timeout: float = LONG_POLL_TIMEOUT):
+        """
+        Long-poll: wait until the project's status is newer than `since`.
+
+        Returns {"seq", "status", "events", "truncated"}; `events` are the
+        transitions after `since` still in the history, and `truncated` is
+        set when older ones have already been evicted.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._get_seq(project_id) > since, timeout=timeout
+            )
+            entries = [
+                (prev_seq, status)
+                for seq, prev_seq, pid, status in self._history
+                if seq > since and pid == project_id
+            ]
+            current_seq = self._get_seq(project_id)
+            # a transition after `since` was evicted if the oldest one kept
+            # follows it, or if none are kept although the status moved on
+            if entries:
+                truncated = entries[0][0] > since
+            else:
+                truncated = current_seq > since
+            status = self._statuses.get(project_id)
+            return {
+                "seq": current_seq or since,
+                "status": dict(status) if status is not None else None,
+                "events": [dict(status) for _, status in entries],
+                "truncated": truncated and since > 0,
+            }
+
+    def track_session(self, project_id):
+        """
+        Return a CompilerSession listener that turns its events into status
+        transitions. While compiling, the percentage is an estimate that
+        grows with each "Compiling" line; while uploading it follows esptool.
+        """
+        compiled = [0]
+
+        def on_event(event):
+            state_percent = PHASE_STATES.get(event.phase)
+            if state_percent is None:
+                return
+            state, percent = state_percent
+
+            if event.phase == SessionPhase.BEGIN_COMPILE:
+                if event.text.startswith("Compiling "):
+                    compiled[0] += 1
+                percent = 40 + round(30 * (1 - 0.97 ** compiled[0]))
+            elif event.phase == SessionPhase.START_UPLOAD:
+                match = UPLOAD_PERCENT_PATTERN.search(event.text)
+                if match:
+                    percent = 80 + int(match.group(1)) * 15 // 100
+
+            current = self.get(project_id) or {}
+            if current.get("state") == state:
+                percent = max(percent, current.get("percent") or 0)
+                if current.get("percent") == percent:
+                    return
+            self.update(project_id, state=state, percent=percent)
+
+        return on_event
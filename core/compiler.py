@@ -5,18 +5,37 @@ import subprocess
 import asyncio
 import urllib.request
 import re
+import json
+import hashlib
+import struct
 import uuid
 import serial.tools.list_ports
-import webview
 import sys
 import sqlite3
 from pathlib import Path
-from core.utils import get_bundled_python_exe
-from core.db import db_path as DB_PATH
+from core.utils import get_bundled_python_exe, get_app_dir, get_platform_for_board_id
+from core.db import db_path as DB_PATH, record_build, get_last_build
+from core.elf import ElfFile, ElfError, get_size_totals
+from core.size_report import analyze_firmware_size, format_top_consumers
+from core.event_stream import COMPILER_EVENTS
 from core.transpiler.transpiler import main as transpiler_main
+from core.transpiler.result_cache import (
+    get_result_key,
+    load_transpile_result,
+    save_transpile_result,
+)
+from core.firmware_cache import get_build_digest, restore_firmware, store_firmware
+from core.translation_units import is_split_enabled, split_translation_units
+from core.template_closure import get_template_closure, get_template_index
+from core.package_mirror import mirror_lib_deps
 from typing import Optional, Dict, Any, List
 from enum import Enum
 import time
+import logging
+
+from core.logger import get_logger
+
+log = get_logger("compiler")
 
 
 # hide the terminal wondow from openeing for subprocess.
@@ -46,6 +65,46 @@ STARTER_TEMPLATE = (
     / "starter_template"
 )
 
+# per-project build dirs live in <app dir>/builds/<project_id>/<board>
+BUILDS_DIR_NAME = "builds"
+BUILD_MANIFEST_NAME = ".mojoscale_build.json"
+
+BUILD_FLAGS = [
+    "-std=gnu++17",
+    "-DARDUINO_USB_MODE=1",
+    "-DSPIFFS_USE_LEGACY=1",
+    # linker map next to firmware.elf, read by the size report
+    "-Wl,-Map,${BUILD_DIR}/firmware.map",
+]
+BUILD_UNFLAGS = ["-std=gnu++11", "-std=gnu++14"]
+
+# the Py* runtime is precompiled by the template's scripts/pch.py and shared
+# per board, flags and toolchain under <build cache dir>/pch
+PCH_ENV_VAR = "MOJOSCALE_PCH"
+PCH_HEADER = "PyRuntime.h"
+PCH_SCRIPT = "scripts/pch.py"
+PCH_DIR_NAME = "pch"
+
+# shared object cache in <app dir>/.platformio/build_cache/<board>-<key>
+BUILD_CACHE_DIR_NAME = "build_cache"
+BUILD_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# newest cache dir mtime seen by the last prune_build_cache walk
+BUILD_CACHE_PRUNE_MARKER = ".last_prune"
+
+# "RAM:   [==        ]  16.3% (used 53372 bytes from 327680 bytes)"
+MEMORY_USAGE_PATTERN = re.compile(
+    r"^\s*(RAM|Flash):\s*\[[^\]]*\]\s*[-\d.]+%\s*"
+    r"\(used\s+(\d+)\s+bytes\s+from\s+(\d+)\s+bytes\)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# warn before flashing when RAM grew this much since the last build
+RAM_REGRESSION_BYTES = 2048
+RAM_WARNING_PERCENT = 90
+
+# niceness of low priority (background) builds on POSIX
+LOW_PRIORITY_NICE = 10
+
 # =============================================================================
 # Compiler Session System
 # =============================================================================
@@ -56,6 +115,8 @@ class SessionPhase(str, Enum):
     END_TRANSPILE = "end_transpile"
     BEGIN_COMPILE = "begin_compile"
     END_COMPILE = "end_compile"
+    COMPILE_CACHE_HIT = "compile_cache_hit"
+    COMPILE_CACHE_MISS = "compile_cache_miss"
     START_UPLOAD = "start_upload"
     END_UPLOAD = "end_upload"
     ALL_DONE = "all_done"
@@ -64,10 +125,17 @@ class SessionPhase(str, Enum):
 
 
 class CompilerEvent:
-    def __init__(self, phase: SessionPhase, text: str, level: str = "info"):
+    def __init__(
+        self,
+        phase: SessionPhase,
+        text: str,
+        level: str = "info",
+        session_id: Optional[str] = None,
+    ):
         self.phase = phase
         self.text = text
         self.level = level
+        self.session_id = session_id
         self.timestamp = time.time()
 
     def to_dict(self):
@@ -75,6 +143,7 @@ class CompilerEvent:
             "phase": self.phase.value,
             "text": self.text,
             "level": self.level,
+            "session_id": self.session_id,
             "timestamp": self.timestamp,
         }
 
@@ -84,22 +153,34 @@ class CompilerSession:
         self.id = session_id or str(uuid.uuid4())
         self.process: Optional[asyncio.subprocess.Process] = None
         self.cancelled = False
+        self.phase: Optional[SessionPhase] = None
+        # per-board sessions of a matrix build, cancelled along with this one
+        self.children: List["CompilerSession"] = []
+        # called with every CompilerEvent, e.g. to track the compile status
+        self.listeners: List = []
+        # quiet sessions only log, nothing is sent to the frontend
+        self.quiet = False
 
     async def send(self, phase: SessionPhase, text: str, level: str = "info"):
         """Send structured compiler event to frontend."""
-        event = CompilerEvent(phase, text, level)
-        print(f"[{phase.value}] {text}")
-        try:
-            webview.windows[0].evaluate_js(
-                f"window.__onCompilerEvent({event.to_dict()})"
-            )
-        except Exception:
-            pass
+        event = CompilerEvent(phase, text, level, self.id)
+        self.phase = phase
+        log.info("[%s] %s", phase.value, text)
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception:
+                log.exception("Compiler event listener failed")
+        # batched and sent from the dispatcher thread, see core.event_stream
+        if not self.quiet:
+            COMPILER_EVENTS.push(event.to_dict())
 
     async def cancel(self):
         if self.cancelled:
             return
         self.cancelled = True
+        for child in self.children:
+            await child.cancel()
         if self.process and self.process.returncode is None:
             try:
                 self.process.terminate()
@@ -141,106 +222,160 @@ async def compile_project(
     upload: bool = False,
     port=None,
     dependencies=None,
+    resolver_backend=None,
+    monitor_speed=115200,
+    project_id=None,
+    session: Optional[CompilerSession] = None,
+    transpiled: Optional[dict] = None,
+    jobs: Optional[int] = None,
+    low_priority: bool = False,
 ):
-    """Unified compile + upload flow with event streaming and dependency support."""
-    session = create_session()
+    """Unified compile + upload flow with event streaming and dependency support.
+
+    A `session` created ahead of time (e.g. by the compile scheduler) can be
+    passed in so the build can be cancelled before it starts. `transpiled`
+    skips the transpile step with a result shared between boards. `jobs`
+    caps PlatformIO's parallel compiler processes and `low_priority` runs
+    them at a lower OS priority, for builds nobody is waiting on.
+    """
+    if session is None:
+        session = create_session()
+    else:
+        _active_sessions[session.id] = session
     try:
         # ---------------------------------------------------------------------
         # 1. Transpile
         # ---------------------------------------------------------------------
-        await session.send(SessionPhase.BEGIN_TRANSPILE, "Transpiling Python code...")
-        commit_hash = str(uuid.uuid4()).replace("-", "_")
-        DB_CONN = sqlite3.connect(DB_PATH)
-        transpiler = transpiler_main(
-            commit_hash, DB_CONN, py_files, CORE_LIBS_PATH, platform
-        )
-        await session.send(SessionPhase.END_TRANSPILE, "Transpilation complete")
+        transpiler = transpiled
+        if transpiler is None:
+            transpiler = await transpile_project(
+                session, py_files, platform, monitor_speed, resolver_backend
+            )
+        else:
+            await session.send(
+                SessionPhase.END_TRANSPILE, "Using the shared transpile for this board"
+            )
 
         files = transpiler["code"]
         dependencies = (dependencies or []) + transpiler.get("dependencies", [])
 
         # ---------------------------------------------------------------------
-        # 💡 NEW: Pretty-print the transpiled C++ code to terminal
+        # 💡 Pretty-print the transpiled C++ code when compiler debug logs are on
         # ---------------------------------------------------------------------
-        import textwrap
+        if log.isEnabledFor(logging.DEBUG):
+            import textwrap
 
-        print("\n==================== 🧩 Transpiled Arduino Code ====================\n")
-        for name, code in files.items():
-            # Determine file type
-            ext = "ino" if name == "main.py" else "h"
-            file_label = f"{name.replace('.py', f'.{ext}')}"
-            print(f"📄 {file_label}:\n")
+            log.debug(
+                "==================== 🧩 Transpiled Arduino Code ===================="
+            )
+            for name, code in files.items():
+                # Determine file type
+                ext = "ino" if name == "main.py" else "h"
+                file_label = f"{name.replace('.py', f'.{ext}')}"
+
+                # Re-indent for nice visual display
+                formatted = textwrap.indent(code.strip(), "    ")
+                log.debug("📄 %s:\n\n%s\n\n%s", file_label, formatted, "-" * 70)
 
-            # Re-indent for nice visual display
-            formatted = textwrap.indent(code.strip(), "    ")
-            print(formatted)
-            print("\n" + "-" * 70 + "\n")
+            log.debug(
+                "===================== ✅ End of Transpiled Code ====================="
+            )
 
-        print("===================== ✅ End of Transpiled Code =====================\n")
+        if session.cancelled:
+            return _cancelled_result(session)
 
         # ---------------------------------------------------------------------
         # 2. Build Environment Setup
         # ---------------------------------------------------------------------
         await session.send(SessionPhase.BEGIN_COMPILE, "Setting up build folder...")
-        build_dir = prepare_build_folder()
-        write_transpiled_code(files, build_dir)
-        write_platformio_ini(board, platform, build_dir, dependencies)
+        build_dir = prepare_build_folder(
+            project_id, board, list(files.values()), dependencies
+        )
+        write_transpiled_code(files, build_dir, transpiler.get("units"))
+        build_cache_dir = get_build_cache_dir(user_app_dir, board, platform)
+        await asyncio.to_thread(
+            write_platformio_ini,
+            board,
+            platform,
+            build_dir,
+            dependencies,
+            build_cache_dir,
+        )
         await session.send(SessionPhase.BEGIN_COMPILE, "Build folder ready")
 
         # Get PlatformIO
-        pio_cmd, pio_env = get_platformio_command(user_app_dir)
+        pio_cmd, pio_env = get_platformio_command(user_app_dir, build_cache_dir)
         env = os.environ.copy()
         env.update(pio_env)
 
         # ---------------------------------------------------------------------
-        # 3. Compilation
+        # 3. Compilation (skipped when the same sources were built before)
         # ---------------------------------------------------------------------
-        await session.send(SessionPhase.BEGIN_COMPILE, "Starting compilation...")
-        cmd = pio_cmd + ["run"]
-
-        # MODIFIED: Add CREATE_NO_WINDOW flag for Windows
-        if sys.platform == "win32":
-            session.process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=build_dir,
-                env=env,
-                creationflags=subprocess.CREATE_NO_WINDOW,
+        build_digest = get_build_digest(
+            build_dir, get_platform_version(user_app_dir, platform)
+        )
+        firmware_cached = await asyncio.to_thread(
+            restore_firmware, build_digest, build_dir, board
+        )
+
+        if firmware_cached:
+            await session.send(
+                SessionPhase.COMPILE_CACHE_HIT,
+                "Build unchanged, reusing previous firmware",
             )
+            parsed = {
+                "success": True,
+                "message": "Build reused",
+                "specs": _get_cached_specs(project_id, board, build_digest),
+            }
         else:
-            session.process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=build_dir,
-                env=env,
+            await session.send(
+                SessionPhase.COMPILE_CACHE_MISS, "No cached firmware for this build"
+            )
+            await session.send(SessionPhase.BEGIN_COMPILE, "Starting compilation...")
+            cmd = pio_cmd + ["run"]
+            if jobs:
+                cmd += ["-j", str(jobs)]
+            code, stdout, stderr = await run_platformio_build(
+                session, cmd, build_dir, env, low_priority=low_priority
             )
 
-        stdout, stderr = [], []
+            if session.cancelled:
+                return _cancelled_result(session)
 
-        async def stream(pipe, collector):
-            while True:
-                line = await pipe.readline()
-                if not line:
-                    break
-                decoded = line.decode(errors="ignore").rstrip()
-                collector.append(decoded)
-                await session.send(SessionPhase.BEGIN_COMPILE, decoded)
+            parsed = parse_platformio_result("\n".join(stdout), "\n".join(stderr))
+            if not parsed["success"] or code != 0:
+                await session.send(SessionPhase.ERROR, "Compilation failed", "error")
+                return parsed
 
-        await asyncio.gather(
-            stream(session.process.stdout, stdout),
-            stream(session.process.stderr, stderr),
-        )
-        code = await session.process.wait()
-        session.process = None
+            await asyncio.to_thread(
+                store_firmware, build_digest, build_dir, board, platform
+            )
 
-        parsed = parse_platformio_result("\n".join(stdout), "\n".join(stderr))
-        if not parsed["success"] or code != 0:
-            await session.send(SessionPhase.ERROR, "Compilation failed", "error")
-            return parsed
+        parsed["specs"] = add_elf_specs(parsed["specs"], build_dir, board)
+        size_report = await asyncio.to_thread(
+            analyze_firmware_size, build_dir, board, py_files
+        )
+        if size_report:
+            log.info(
+                "📊 Top flash/RAM consumers:\n%s", format_top_consumers(size_report)
+            )
+        memory_warnings = []
+        if project_id is not None:
+            memory_warnings = await asyncio.to_thread(
+                record_build_specs,
+                project_id,
+                board,
+                platform,
+                parsed["specs"],
+                build_digest,
+                firmware_cached,
+            )
+            for warning in memory_warnings:
+                await session.send(SessionPhase.END_COMPILE, warning, "warn")
 
         await session.send(SessionPhase.END_COMPILE, "Compilation successful")
+        await asyncio.to_thread(prune_build_cache, user_app_dir)
 
         # ---------------------------------------------------------------------
         # 4. Upload (fixed event logic)
@@ -256,7 +391,15 @@ async def compile_project(
                 )
                 return {"success": False, "error": "No ESP device found"}
 
-            cmd = pio_cmd + ["run", "-t", "upload", f"--upload-port={actual_port}"]
+            # the firmware is already built (or restored), only flash it
+            cmd = pio_cmd + [
+                "run",
+                "-t",
+                "nobuild",
+                "-t",
+                "upload",
+                f"--upload-port={actual_port}",
+            ]
 
             # MODIFIED: Add CREATE_NO_WINDOW flag for Windows
             if sys.platform == "win32":
@@ -327,6 +470,8 @@ async def compile_project(
             "success": parsed["success"] and (upload_success or not upload),
             "upload_success": upload_success,
             "specs": parsed.get("specs", {}),
+            "warnings": memory_warnings,
+            "size_report": size_report,
             "message": "Process completed",
             "session_id": session.id,
         }
@@ -338,65 +483,617 @@ async def compile_project(
         _active_sessions.pop(session.id, None)
 
 
+async def transpile_project(
+    session: CompilerSession,
+    py_files: dict,
+    platform: str,
+    monitor_speed=115200,
+    resolver_backend=None,
+) -> dict:
+    """Transpile for a platform, reusing a cached result when the code is unchanged."""
+    await session.send(SessionPhase.BEGIN_TRANSPILE, "Transpiling Python code...")
+    result_key = get_result_key(py_files, platform, monitor_speed)
+    transpiled = load_transpile_result(result_key)
+
+    if transpiled is not None:
+        await session.send(
+            SessionPhase.END_TRANSPILE, "Code unchanged, reusing previous transpile"
+        )
+        return transpiled
+
+    # off the event loop, so other builds keep streaming meanwhile
+    transpiled = await asyncio.to_thread(
+        run_transpiler, py_files, platform, monitor_speed, resolver_backend
+    )
+    # env vars were baked into the code, a later .env edit must retranspile
+    if not transpiled.get("uses_eval"):
+        save_transpile_result(result_key, transpiled)
+    await session.send(SessionPhase.END_TRANSPILE, "Transpilation complete")
+    return transpiled
+
+
+# =============================================================================
+# Multi-board Matrix Builds
+# =============================================================================
+
+
+async def compile_matrix(
+    py_files: dict,
+    boards: List[str],
+    user_app_dir: str,
+    dependencies=None,
+    resolver_backend=None,
+    monitor_speed=115200,
+    project_id=None,
+    session: Optional[CompilerSession] = None,
+    max_parallel: Optional[int] = None,
+):
+    """
+    Compile one project for several boards.
+
+    The code is transpiled once per platform, then every board is built in
+    its own PlatformIO process with its own session, up to `max_parallel`
+    (default: the compile scheduler's worker count) at a time. A failing
+    board does not stop the others; the result holds one row per board with
+    its session id and specs.
+    """
+    if max_parallel is None:
+        # imported here, the scheduler module imports this one
+        from core.compile_scheduler import get_worker_count
+
+        max_parallel = get_worker_count()
+
+    if session is None:
+        session = create_session()
+    else:
+        _active_sessions[session.id] = session
+
+    rows = {}
+    by_platform: Dict[str, List[str]] = {}
+    for board in dict.fromkeys(boards):
+        platform = get_platform_for_board_id(board)
+        if platform:
+            by_platform.setdefault(platform, []).append(board)
+        else:
+            rows[board] = {
+                "board": board,
+                "platform": None,
+                "success": False,
+                "error": f"Unknown board {board}",
+            }
+
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+    async def build_board(board, platform, transpiled):
+        board_session = CompilerSession()
+        session.children.append(board_session)
+        async with semaphore:
+            if session.cancelled:
+                return board, platform, _cancelled_result(board_session)
+            result = await compile_project(
+                py_files,
+                board,
+                platform,
+                user_app_dir,
+                dependencies=dependencies,
+                monitor_speed=monitor_speed,
+                project_id=project_id,
+                session=board_session,
+                transpiled=transpiled,
+            )
+        result.setdefault("session_id", board_session.id)
+        return board, platform, result
+
+    try:
+        builds = []
+        for platform, platform_boards in by_platform.items():
+            try:
+                transpiled = await transpile_project(
+                    session, py_files, platform, monitor_speed, resolver_backend
+                )
+            except Exception as e:
+                await session.send(
+                    SessionPhase.ERROR,
+                    f"Transpiling for {platform} failed: {e}",
+                    "error",
+                )
+                for board in platform_boards:
+                    rows[board] = {
+                        "board": board,
+                        "platform": platform,
+                        "success": False,
+                        "error": str(e),
+                    }
+                continue
+
+            for board in platform_boards:
+                builds.append(build_board(board, platform, transpiled))
+
+        await session.send(
+            SessionPhase.BEGIN_COMPILE, f"Building {len(builds)} boards..."
+        )
+        for outcome in await asyncio.gather(*builds, return_exceptions=True):
+            if isinstance(outcome, BaseException):
+                log.error("❌ Matrix build crashed: %s", outcome)
+                continue
+            board, platform, result = outcome
+            rows[board] = {
+                "board": board,
+                "platform": platform,
+                "success": result.get("success", False),
+                "session_id": result.get("session_id"),
+                "specs": result.get("specs", {}),
+                "error": (
+                    None
+                    if result.get("success")
+                    else result.get("error") or result.get("message")
+                ),
+            }
+
+        results = [rows[board] for board in dict.fromkeys(boards) if board in rows]
+        passed = sum(1 for row in results if row["success"])
+        summary = f"{passed}/{len(results)} boards built"
+        if session.cancelled:
+            return {**_cancelled_result(session), "results": results}
+
+        await session.send(
+            SessionPhase.ALL_DONE,
+            summary,
+            "info" if passed == len(results) else "warn",
+        )
+        return {
+            "success": passed == len(results),
+            "message": summary,
+            "results": results,
+            "session_id": session.id,
+        }
+    finally:
+        _active_sessions.pop(session.id, None)
+
+
 # =============================================================================
 # Helpers
 # =============================================================================
 
 
-def prepare_build_folder() -> str:
-    """Copy starter template and return a temporary build directory."""
+def run_transpiler(py_files: dict, platform: str, monitor_speed, resolver_backend):
+    """Transpile with a resolver connection of its own (safe in a worker thread)."""
+    commit_hash = str(uuid.uuid4()).replace("-", "_")
+    DB_CONN = sqlite3.connect(DB_PATH)
+    try:
+        return transpiler_main(
+            commit_hash,
+            DB_CONN,
+            py_files,
+            CORE_LIBS_PATH,
+            platform,
+            monitor_speed=monitor_speed,
+            resolver_backend=resolver_backend,
+        )
+    finally:
+        DB_CONN.close()
+
+
+def _cancelled_result(session: CompilerSession) -> dict:
+    return {
+        "success": False,
+        "cancelled": True,
+        "message": "Cancelled",
+        "error": "Build cancelled",
+        "session_id": session.id,
+    }
+
+
+def _lower_process_priority():
+    try:
+        os.nice(LOW_PRIORITY_NICE)
+    except OSError:
+        pass
+
+
+async def run_platformio_build(
+    session: CompilerSession,
+    cmd: List[str],
+    build_dir: str,
+    env: dict,
+    low_priority: bool = False,
+):
+    """Run a PlatformIO build, streaming its output as BEGIN_COMPILE events.
+
+    Returns (exit code, stdout lines, stderr lines).
+    """
+    # MODIFIED: Add CREATE_NO_WINDOW flag for Windows
+    if sys.platform == "win32":
+        creationflags = subprocess.CREATE_NO_WINDOW
+        if low_priority:
+            creationflags |= subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        session.process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=build_dir,
+            env=env,
+            creationflags=creationflags,
+        )
+    else:
+        session.process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=build_dir,
+            env=env,
+            preexec_fn=_lower_process_priority if low_priority else None,
+        )
+
+    stdout, stderr = [], []
+
+    async def stream(pipe, collector):
+        while True:
+            line = await pipe.readline()
+            if not line:
+                break
+            decoded = line.decode(errors="ignore").rstrip()
+            collector.append(decoded)
+            await session.send(SessionPhase.BEGIN_COMPILE, decoded)
+
+    await asyncio.gather(
+        stream(session.process.stdout, stdout),
+        stream(session.process.stderr, stderr),
+    )
+    code = await session.process.wait()
+    session.process = None
+    return code, stdout, stderr
+
+
+def _safe_dir_name(value) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(value))
+
+
+def get_project_build_dir(project_id, board: str) -> str:
+    """Stable build directory for a project and board under the app dir."""
+    return os.path.join(
+        get_app_dir(),
+        BUILDS_DIR_NAME,
+        _safe_dir_name(project_id),
+        _safe_dir_name(board),
+    )
+
+
+def _write_if_changed(path: str, data: bytes) -> bool:
+    """Write `data` to `path` unless it already holds exactly that content.
+
+    Untouched files keep their mtime, so PlatformIO reuses their objects.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def _load_build_manifest(build_dir: str) -> dict:
+    try:
+        with open(os.path.join(build_dir, BUILD_MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_build_manifest(build_dir: str, manifest: dict):
+    with open(os.path.join(build_dir, BUILD_MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _remove_stale_files(build_dir: str, previous: list, current: list):
+    """Delete files a previous build wrote that the current one no longer has."""
+    for rel_path in set(previous or []) - set(current):
+        path = os.path.join(build_dir, rel_path)
+        if os.path.isfile(path):
+            os.remove(path)
+            log.debug("🗑️ Removed stale %s", path)
+
+
+def get_template_files(sources=None, dependencies=()) -> List[str]:
+    """Starter template files to copy, only those `sources` need if given."""
+    if sources is not None:
+        rel_paths = get_template_closure(STARTER_TEMPLATE, sources, dependencies)
+    else:
+        rel_paths = get_template_index(str(STARTER_TEMPLATE)).files
+    return [os.path.join(*rel_path.split("/")) for rel_path in rel_paths]
+
+
+def sync_starter_template(build_dir: str, sources=None, dependencies=()) -> int:
+    """Copy starter template files whose content differs, return how many changed.
+
+    With `sources` (the transpiled code) only the helpers and bundled
+    libraries it includes are copied, see core.template_closure.
+    """
+    manifest = _load_build_manifest(build_dir)
+    template_files = []
+    changed = 0
+
+    for rel_path in get_template_files(sources, dependencies):
+        template_files.append(rel_path)
+        with open(os.path.join(STARTER_TEMPLATE, rel_path), "rb") as f:
+            if _write_if_changed(os.path.join(build_dir, rel_path), f.read()):
+                changed += 1
+
+    _remove_stale_files(build_dir, manifest.get("template"), template_files)
+    manifest["template"] = sorted(template_files)
+    _save_build_manifest(build_dir, manifest)
+    return changed
+
+
+def prepare_build_folder(
+    project_id=None, board: Optional[str] = None, sources=None, dependencies=()
+) -> str:
+    """
+    Return a build directory holding the starter template.
+
+    With a project_id the directory is stable per project and board, so
+    PlatformIO's .pio/build objects survive between compiles. Without one
+    a fresh temporary directory is used. `sources` (the transpiled code)
+    limits the template to what it and its `dependencies` need.
+    """
     if not STARTER_TEMPLATE.exists():
         raise FileNotFoundError(f"Starter template not found at {STARTER_TEMPLATE}")
 
-    build_dir = tempfile.mkdtemp(prefix="build_")
-    shutil.copytree(str(STARTER_TEMPLATE), build_dir, dirs_exist_ok=True)
-    print(f"📁 Build folder prepared at {build_dir}")
+    if project_id is None:
+        build_dir = tempfile.mkdtemp(prefix="build_")
+        for rel_path in get_template_files(sources, dependencies):
+            target = os.path.join(build_dir, rel_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(STARTER_TEMPLATE, rel_path), target)
+        log.info("📁 Build folder prepared at %s", build_dir)
+        return build_dir
+
+    build_dir = get_project_build_dir(project_id, board)
+    os.makedirs(build_dir, exist_ok=True)
+    changed = sync_starter_template(build_dir, sources, dependencies)
+    log.info(
+        "📁 Build folder ready at %s (%s template files updated)", build_dir, changed
+    )
     return build_dir
 
 
-def write_transpiled_code(files: dict, build_dir: str):
-    """Write .ino and .h files into src/include as per PlatformIO structure."""
-    src_dir = os.path.join(build_dir, "src")
-    include_dir = os.path.join(build_dir, "include")
-    os.makedirs(src_dir, exist_ok=True)
-    os.makedirs(include_dir, exist_ok=True)
+def get_sketch_files(files: dict, units: Optional[dict] = None) -> dict:
+    """Build dir path → code for a transpile result.
+
+    main.py becomes src/main.ino and other modules headers under include/,
+    unless split translation units are enabled and the project allows it
+    (see core.translation_units).
+    """
+    if units and is_split_enabled():
+        split = split_translation_units(units)
+        if split is not None:
+            return split
 
+    sketch_files = {}
     for name, code in files.items():
         if name == "main.py":
-            out_path = os.path.join(src_dir, "main.ino")
+            rel_path = os.path.join("src", "main.ino")
         else:
-            out_path = os.path.join(include_dir, name.replace(".py", ".h"))
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(code)
-        print(f"✍️ Wrote {out_path}")
+            rel_path = os.path.join("include", name.replace(".py", ".h"))
+        sketch_files[rel_path] = code
+    return sketch_files
+
+
+def write_transpiled_code(files: dict, build_dir: str, units: Optional[dict] = None):
+    """Write .ino and .h files into src/include as per PlatformIO structure.
+
+    Files are only rewritten when their content changed, and files generated
+    by an earlier compile that are no longer produced are removed.
+    """
+    manifest = _load_build_manifest(build_dir)
+    generated = []
+
+    for rel_path, code in get_sketch_files(files, units).items():
+        generated.append(rel_path)
+
+        out_path = os.path.join(build_dir, rel_path)
+        if _write_if_changed(out_path, code.encode("utf-8")):
+            log.debug("✍️ Wrote %s", out_path)
+
+    template_files = set(manifest.get("template") or [])
+    _remove_stale_files(
+        build_dir,
+        [p for p in manifest.get("generated") or [] if p not in template_files],
+        generated,
+    )
+    manifest["generated"] = sorted(generated)
+    _save_build_manifest(build_dir, manifest)
+
+
+def get_platform_version(user_app_dir: str, platform: str) -> str:
+    """Version of an installed PlatformIO platform, "unknown" if not installed."""
+    manifest_path = os.path.join(
+        user_app_dir, ".platformio", "platforms", platform, "platform.json"
+    )
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("version", "unknown")
+    except (OSError, ValueError):
+        return "unknown"
+
+
+def get_build_cache_dir(user_app_dir: str, board: str, platform: str) -> str:
+    """
+    Shared PlatformIO object cache for a board, flags and toolchain version.
+
+    Every project building for the same board with the same flags and
+    platform version points at the same cache, so framework and library
+    objects are compiled once.
+    """
+    key = json.dumps(
+        {
+            "board": board,
+            "platform": platform,
+            "platform_version": get_platform_version(user_app_dir, platform),
+            "build_flags": BUILD_FLAGS,
+            "build_unflags": BUILD_UNFLAGS,
+        },
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(
+        user_app_dir,
+        ".platformio",
+        BUILD_CACHE_DIR_NAME,
+        f"{_safe_dir_name(board)}-{digest}",
+    )
+
+
+def _get_build_cache_mtime(cache_root: str) -> float:
+    """
+    Newest mtime of the dirs PlatformIO adds objects to
+    (<board>-<key>/<2 hex digits>/), without listing the objects themselves.
+    """
+    newest = 0.0
+    for board_entry in os.scandir(cache_root):
+        if not board_entry.is_dir():
+            continue
+        newest = max(newest, board_entry.stat().st_mtime)
+        for entry in os.scandir(board_entry.path):
+            if entry.is_dir() and entry.name != PCH_DIR_NAME:
+                newest = max(newest, entry.stat().st_mtime)
+    return newest
 
 
-def write_platformio_ini(board: str, platform: str, build_dir: str, dependencies: list):
-    """Generate platformio.ini including dependencies and build flags."""
-    deps = ["ArduinoJson@6.21.4"] + list(set(dependencies or []))
-    build_flags = ["-std=gnu++17", "-DARDUINO_USB_MODE=1", "-DSPIFFS_USE_LEGACY=1"]
-    unflags = ["-std=gnu++11", "-std=gnu++14"]
+def _read_prune_marker(marker_path: str) -> float:
+    try:
+        with open(marker_path, "r", encoding="utf-8") as f:
+            return float(f.read().strip())
+    except (OSError, ValueError):
+        return -1.0
+
+
+def prune_build_cache(user_app_dir: str, max_bytes: int = BUILD_CACHE_MAX_BYTES):
+    """
+    Delete least recently used cached objects until the cache fits.
+
+    The walk is skipped while no object was added since the last prune. The
+    precompiled headers under <board>-<key>/pch are left alone.
+    """
+    cache_root = os.path.join(user_app_dir, ".platformio", BUILD_CACHE_DIR_NAME)
+    if not os.path.isdir(cache_root):
+        return
+
+    marker_path = os.path.join(cache_root, BUILD_CACHE_PRUNE_MARKER)
+    try:
+        if _get_build_cache_mtime(cache_root) <= _read_prune_marker(marker_path):
+            return
+    except OSError as e:
+        log.debug("Could not check the build cache: %s", e)
+
+    entries = []
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(cache_root):
+        if dirpath != cache_root:
+            dirnames[:] = [d for d in dirnames if d != PCH_DIR_NAME]
+        for filename in filenames:
+            if dirpath == cache_root:
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # atime is often not updated, a cache hit at least reads the file
+            entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+            total += stat.st_size
+
+    removed = 0
+    if total > max_bytes:
+        entries.sort()
+        while total > max_bytes and entries:
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        log.info("🧹 Pruned %s objects from the PlatformIO build cache", removed)
+
+    try:
+        # after removing, which touched the dirs too
+        _write_if_changed(
+            marker_path, repr(_get_build_cache_mtime(cache_root)).encode("ascii")
+        )
+    except OSError as e:
+        log.debug("Could not write %s: %s", marker_path, e)
+
+
+def is_pch_enabled() -> bool:
+    return os.getenv(PCH_ENV_VAR, "1").lower() not in ("0", "false", "no")
+
+
+def write_platformio_ini(
+    board: str,
+    platform: str,
+    build_dir: str,
+    dependencies: list,
+    build_cache_dir: Optional[str] = None,
+    pch: Optional[bool] = None,
+):
+    """Generate platformio.ini including dependencies and build flags.
+
+    With `pch` (default: MOJOSCALE_PCH, on) and a build cache dir, sketch
+    sources are compiled against a precompiled Py* runtime. With the package
+    mirror enabled (see core.package_mirror), lib_deps point at its archives;
+    that may download them, so async callers run this in a thread.
+    """
+    deps = mirror_lib_deps(
+        ["ArduinoJson@6.21.4"] + sorted(set(dependencies or [])), platform
+    )
+    build_flags = BUILD_FLAGS
+    unflags = BUILD_UNFLAGS
+    if pch is None:
+        pch = is_pch_enabled()
+
+    platformio_section = ""
+    if build_cache_dir:
+        platformio_section = (
+            f"[platformio]\nbuild_cache_dir = {Path(build_cache_dir).as_posix()}\n\n"
+        )
 
     ini = (
-        f"[env:{board}]\n"
+        platformio_section + f"[env:{board}]\n"
         f"platform = {platform}\n"
         f"board = {board}\n"
         f"framework = arduino\n"
         f"upload_speed = 921600\n"
         f"monitor_speed = 115200\n"
+        # the build folder only holds the helpers and libraries the sketch
+        # includes (see core.template_closure), following includes is enough
+        f"lib_ldf_mode = chain\n"
         f"build_unflags =\n  " + "\n  ".join(unflags) + "\n\n"
         f"build_flags =\n  " + "\n  ".join(build_flags) + "\n\n"
         f"lib_deps =\n  " + "\n  ".join(deps) + "\n"
     )
+    if pch and build_cache_dir:
+        # sketch sources only: the framework and libraries include C files
+        pch_dir = Path(build_cache_dir, PCH_DIR_NAME).as_posix()
+        ini += (
+            f"\nbuild_src_flags =\n  -include {PCH_HEADER}\n"
+            f"extra_scripts =\n  post:{PCH_SCRIPT}\n"
+            f"custom_pch_dir = {pch_dir}\n"
+        )
 
     ini_path = os.path.join(build_dir, "platformio.ini")
-    with open(ini_path, "w", encoding="utf-8") as f:
-        f.write(ini)
-    print(f"📝 platformio.ini written to {ini_path}")
-    print(ini)
+    if _write_if_changed(ini_path, ini.encode("utf-8")):
+        log.info("📝 platformio.ini written to %s", ini_path)
+    log.debug("%s", ini)
 
 
-def get_platformio_command(user_app_dir: str):
+def get_platformio_command(user_app_dir: str, build_cache_dir: Optional[str] = None):
     pio_home = os.path.join(user_app_dir, ".platformio")
     venv = os.path.join(pio_home, "platformio_venv")
     exe = (
@@ -406,6 +1103,8 @@ def get_platformio_command(user_app_dir: str):
     )
     env = os.environ.copy()
     env["PLATFORMIO_CORE_DIR"] = pio_home
+    if build_cache_dir:
+        env["PLATFORMIO_BUILD_CACHE_DIR"] = build_cache_dir
     return [exe, "-c", "import platformio.__main__; platformio.__main__.main()"], env
 
 
@@ -416,12 +1115,115 @@ def parse_platformio_result(stdout: str, stderr: str) -> dict:
     result = {
         "success": not failed,
         "message": "Build success" if not failed else "Build failed",
-        "specs": {},
+        "specs": parse_memory_usage(combined),
     }
-    # (Memory parse optional here)
     return result
 
 
+def parse_memory_usage(output: str) -> dict:
+    """Parse PlatformIO's "RAM:" / "Flash:" usage lines into specs."""
+    specs = {}
+    for name, used, total in MEMORY_USAGE_PATTERN.findall(output):
+        used, total = int(used), int(total)
+        specs[name.lower()] = {
+            "used": used,
+            "total": total,
+            "percent": round(used * 100 / total, 1) if total else 0.0,
+        }
+    return specs
+
+
+def add_elf_specs(specs: dict, build_dir: str, board: str) -> dict:
+    """Add `size`-style section totals of the built firmware.elf to specs."""
+    elf_path = os.path.join(build_dir, ".pio", "build", board, "firmware.elf")
+    try:
+        totals = get_size_totals(ElfFile.from_path(elf_path))
+    except FileNotFoundError:
+        return specs
+    except (OSError, ElfError, struct.error) as e:
+        log.warning("⚠️ Could not read %s: %s", elf_path, e)
+        return specs
+
+    specs = dict(specs)
+    specs["elf"] = totals
+    additional = dict(specs.get("additional") or {})
+    for key in ("text", "data", "bss"):
+        additional[f".{key}"] = f"{totals[key]} bytes"
+    specs["additional"] = additional
+    return specs
+
+
+def _get_cached_specs(project_id, board: str, digest: str) -> dict:
+    """Memory specs recorded when a reused firmware was originally built."""
+    if project_id is None:
+        return {}
+    record = get_last_build(project_id, board, digest)
+    if not record:
+        return {}
+
+    specs = {}
+    for name in ("flash", "ram"):
+        used, total = record[f"{name}_used"], record[f"{name}_total"]
+        if used is not None and total:
+            specs[name] = {
+                "used": used,
+                "total": total,
+                "percent": round(used * 100 / total, 1),
+            }
+    return specs
+
+
+def record_build_specs(
+    project_id,
+    board: str,
+    platform: str,
+    specs: dict,
+    digest: Optional[str] = None,
+    cached: bool = False,
+) -> List[str]:
+    """
+    Store a build in the history, return warnings about RAM growth.
+
+    Re-uploading the stored firmware of the last build adds no new row.
+    """
+    previous = get_last_build(project_id, board)
+    unchanged = (
+        cached
+        and digest is not None
+        and previous is not None
+        and previous.get("digest") == digest
+    )
+    if not unchanged:
+        record_build(project_id, board, platform, specs, digest=digest, cached=cached)
+
+    warnings = []
+    ram = specs.get("ram")
+    if not ram:
+        return warnings
+
+    additional = specs.setdefault("additional", {})
+    if previous and previous.get("ram_used") is not None:
+        ram_delta = ram["used"] - previous["ram_used"]
+        additional["RAM change"] = f"{ram_delta:+d} bytes"
+        if ram_delta >= RAM_REGRESSION_BYTES:
+            warnings.append(
+                f"⚠️ RAM use grew by {ram_delta} bytes since the last build "
+                f"({previous['ram_used']} → {ram['used']} bytes)"
+            )
+
+    flash = specs.get("flash")
+    if flash and previous and previous.get("flash_used") is not None:
+        flash_delta = flash["used"] - previous["flash_used"]
+        additional["Flash change"] = f"{flash_delta:+d} bytes"
+
+    if ram["percent"] >= RAM_WARNING_PERCENT:
+        warnings.append(
+            f"⚠️ Static RAM use is at {ram['percent']}%, "
+            "little is left for the heap and stack"
+        )
+    return warnings
+
+
 def parse_upload_result(code: int, stdout: str, stderr: str) -> bool:
     """Check upload success."""
     return code == 0 or "Hard resetting" in stdout
@@ -432,6 +1234,6 @@ def find_esp_serial_port() -> Optional[str]:
     for p in ports:
         desc = p.description.lower() if p.description else ""
         if "esp32" in desc or "espressif" in desc or "cp210" in desc or "ch340" in desc:
-            print(f"✅ ESP device detected at {p.device}")
+            log.info("✅ ESP device detected at %s", p.device)
             return p.device
     return ports[0].device if ports else None
@@ -7,6 +7,7 @@ from peewee import (
     Model,
     TextField,
     BooleanField,
+    IntegerField,
 )
 from playhouse.shortcuts import model_to_dict
 
@@ -15,6 +16,8 @@ import os
 import uuid
 import json
 import sqlite3
+import threading
+import time
 
 import datetime
 import re
@@ -64,6 +67,65 @@ def get_core_db_conn():
     return sqlite3.connect(db_path)
 
 
+SESSION_TABLE_PATTERN = re.compile(
+    r"^commit_\w+_(methods|variables|modules|imported_modules)$"
+)
+
+
+def sweep_session_tables(vacuum=True):
+    """
+    Drop transpile/lint session tables left behind in core_db.db.
+
+    Sessions keep their tables in the TEMP schema of their own connection,
+    so any commit_* table in the main schema is a leftover from an older
+    build or a crashed session. The file is vacuumed afterwards when it has
+    free pages to give back.
+    """
+    conn = get_core_db_conn()
+    dropped = 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'commit_%'"
+        )
+        table_names = [
+            row[0] for row in cursor.fetchall() if SESSION_TABLE_PATTERN.match(row[0])
+        ]
+
+        for table_name in table_names:
+            cursor.execute(f'DROP TABLE IF EXISTS main."{table_name}"')
+            dropped += 1
+        conn.commit()
+
+        if vacuum:
+            cursor.execute("PRAGMA freelist_count")
+            free_pages = cursor.fetchone()[0]
+            if free_pages:
+                cursor.execute("VACUUM")
+
+        if dropped:
+            print(f"🧹 Dropped {dropped} stale session tables from core_db.db")
+
+    except sqlite3.Error as e:
+        print(f"⚠️ Session table sweep failed: {e}")
+
+    finally:
+        conn.close()
+
+    return dropped
+
+
+def start_session_table_sweeper(interval=6 * 3600):
+    """Sweep stale session tables now and then every `interval` seconds."""
+
+    def run():
+        while True:
+            sweep_session_tables()
+            time.sleep(interval)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
 class JSONField(TextField):
     def db_value(self, value):
         return json.dumps(value) if value is not None else None
@@ -92,9 +154,41 @@ class Project(BaseModel):
         return super().save(*args, **kwargs)
 
 
+class FirmwareArtifact(BaseModel):
+    """A compiled firmware kept in the artifact store, keyed by build digest."""
+
+    digest = CharField(primary_key=True)
+    board = CharField()
+    platform = CharField()
+    path = TextField()
+    files = JSONField()
+    size = IntegerField(default=0)
+    created_at = DateTimeField(default=datetime.datetime.now)
+    last_used_at = DateTimeField(default=datetime.datetime.now)
+
+
+class BuildRecord(BaseModel):
+    """Memory and size specs of one successful build, kept as history."""
+
+    project_id = CharField(index=True)
+    board = CharField()
+    platform = CharField()
+    digest = CharField(null=True, index=True)
+    cached = BooleanField(default=False)
+    flash_used = IntegerField(null=True)
+    flash_total = IntegerField(null=True)
+    ram_used = IntegerField(null=True)
+    ram_total = IntegerField(null=True)
+    text = IntegerField(null=True)
+    data = IntegerField(null=True)
+    bss = IntegerField(null=True)
+    sections = JSONField(null=True)
+    created_at = DateTimeField(default=datetime.datetime.now)
+
+
 # ✅ Ensure tables exist
 db.connect()
-db.create_tables([Project])
+db.create_tables([Project, FirmwareArtifact, BuildRecord])
 
 
 def create_new_project(name, description, metadata={}):
@@ -141,6 +235,12 @@ def update_project_details(payload: dict):
 
             project.metadata = metadata
 
+    if "speculative_build" in payload:
+        # opt-in background build after every clean save
+        metadata = project.metadata or {}
+        metadata["speculative_build"] = bool(payload["speculative_build"])
+        project.metadata = metadata
+
     project.save()
     return
 
@@ -199,3 +299,45 @@ def get_project_code_from_id(project_id: str) -> str:
 
     with open(project_path, "r", encoding="utf-8") as f:
         return f.read()
+
+
+def record_build(project_id, board, platform, specs: dict, digest=None, cached=False):
+    """Store the specs of a finished build in the build history."""
+    flash = specs.get("flash") or {}
+    ram = specs.get("ram") or {}
+    elf = specs.get("elf") or {}
+    BuildRecord.create(
+        project_id=str(project_id),
+        board=board,
+        platform=platform,
+        digest=digest,
+        cached=cached,
+        flash_used=flash.get("used"),
+        flash_total=flash.get("total"),
+        ram_used=ram.get("used"),
+        ram_total=ram.get("total"),
+        text=elf.get("text"),
+        data=elf.get("data"),
+        bss=elf.get("bss"),
+        sections=elf.get("sections"),
+    )
+
+
+def get_last_build(project_id, board, digest=None):
+    """Most recent build record of a project and board (optionally of a digest)."""
+    query = BuildRecord.select().where(
+        (BuildRecord.project_id == str(project_id)) & (BuildRecord.board == board)
+    )
+    if digest is not None:
+        query = query.where(BuildRecord.digest == digest)
+    record = query.order_by(BuildRecord.id.desc()).first()
+    return _serialize_row(model_to_dict(record)) if record else None
+
+
+def get_build_history(project_id, board=None, limit=50):
+    """Build records of a project, newest first."""
+    query = BuildRecord.select().where(BuildRecord.project_id == str(project_id))
+    if board:
+        query = query.where(BuildRecord.board == board)
+    query = query.order_by(BuildRecord.id.desc()).limit(limit)
+    return [_serialize_row(model_to_dict(record)) for record in query]
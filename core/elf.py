@@ -0,0 +1,180 @@
+"""
+Minimal ELF reader for firmware size reports.
+
+Only what `size` and `nm --size-sort` need: the section headers and the
+symbol table of a 32 or 64 bit ELF in either byte order. Sections are
+totalled the way `size` (Berkeley format) does it:
+
+    text   allocated, read-only sections (code and constants)
+    data   allocated, writable sections with contents in the image
+    bss    allocated sections without contents (zero-initialised RAM)
+"""
+
+import struct
+
+ELF_MAGIC = b"\x7fELF"
+
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+
+STT_OBJECT = 1
+STT_FUNC = 2
+
+SHN_UNDEF = 0
+SHN_LORESERVE = 0xFF00
+
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+
+
+class ElfError(ValueError):
+    pass
+
+
+class ElfSection:
+    def __init__(self, name, sh_type, flags, addr, offset, size, link, entsize):
+        self.name = name
+        self.type = sh_type
+        self.flags = flags
+        self.addr = addr
+        self.offset = offset
+        self.size = size
+        self.link = link
+        self.entsize = entsize
+
+    @property
+    def is_alloc(self):
+        return bool(self.flags & SHF_ALLOC)
+
+    @property
+    def is_writable(self):
+        return bool(self.flags & SHF_WRITE)
+
+
+class ElfSymbol:
+    def __init__(self, name, value, size, sym_type, section):
+        self.name = name
+        self.value = value
+        self.size = size
+        self.type = sym_type
+        # None for absolute / common / undefined symbols
+        self.section = section
+
+
+class ElfFile:
+    def __init__(self, data: bytes):
+        if data[:4] != ELF_MAGIC:
+            raise ElfError("Not an ELF file")
+
+        elf_class, byte_order = data[4], data[5]
+        if elf_class not in (1, 2) or byte_order not in (1, 2):
+            raise ElfError("Unsupported ELF class or byte order")
+
+        self.data = data
+        self.is_64 = elf_class == 2
+        self.endian = "<" if byte_order == 1 else ">"
+        self.sections = self._read_sections()
+
+    @classmethod
+    def from_path(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def _unpack(self, fmt, offset):
+        return struct.unpack_from(self.endian + fmt, self.data, offset)
+
+    def _read_sections(self):
+        if self.is_64:
+            shoff = self._unpack("Q", 0x28)[0]
+            shentsize, shnum, shstrndx = self._unpack("HHH", 0x3A)
+            header_fmt = "IIQQQQIIQQ"
+        else:
+            shoff = self._unpack("I", 0x20)[0]
+            shentsize, shnum, shstrndx = self._unpack("HHH", 0x2E)
+            header_fmt = "IIIIIIIIII"
+
+        headers = []
+        for index in range(shnum):
+            headers.append(self._unpack(header_fmt, shoff + index * shentsize))
+
+        names = b""
+        if 0 <= shstrndx < len(headers):
+            _, _, _, _, str_offset, str_size = headers[shstrndx][:6]
+            names = self.data[str_offset : str_offset + str_size]
+
+        sections = []
+        for header in headers:
+            name_off, sh_type, flags, addr, offset, size, link, _, _, entsize = header
+            name = names[name_off : names.find(b"\0", name_off)]
+            sections.append(
+                ElfSection(
+                    name.decode("utf-8", "replace"),
+                    sh_type,
+                    flags,
+                    addr,
+                    offset,
+                    size,
+                    link,
+                    entsize,
+                )
+            )
+        return sections
+
+    def get_section(self, name):
+        for section in self.sections:
+            if section.name == name:
+                return section
+        return None
+
+    def get_symbols(self):
+        """Sized function and object symbols from .symtab."""
+        symtab = next((s for s in self.sections if s.type == SHT_SYMTAB), None)
+        if symtab is None or not symtab.entsize:
+            return []
+
+        strtab = self.sections[symtab.link]
+        names = self.data[strtab.offset : strtab.offset + strtab.size]
+
+        symbols = []
+        for offset in range(symtab.offset, symtab.offset + symtab.size, symtab.entsize):
+            if self.is_64:
+                name_off, info, _, shndx, value, size = self._unpack("IBBHQQ", offset)
+            else:
+                name_off, value, size, info, _, shndx = self._unpack("IIIBBH", offset)
+
+            sym_type = info & 0xF
+            if not size or sym_type not in (STT_FUNC, STT_OBJECT):
+                continue
+
+            section = None
+            if SHN_UNDEF < shndx < SHN_LORESERVE and shndx < len(self.sections):
+                section = self.sections[shndx]
+
+            name = names[name_off : names.find(b"\0", name_off)]
+            symbols.append(
+                ElfSymbol(
+                    name.decode("utf-8", "replace"), value, size, sym_type, section
+                )
+            )
+        return symbols
+
+
+def get_size_totals(elf: ElfFile) -> dict:
+    """Berkeley `size` totals plus the size of every allocated section."""
+    totals = {"text": 0, "data": 0, "bss": 0}
+    sections = {}
+
+    for section in elf.sections:
+        if not section.is_alloc or not section.size:
+            continue
+        sections[section.name] = section.size
+        if section.type == SHT_NOBITS:
+            totals["bss"] += section.size
+        elif section.is_writable:
+            totals["data"] += section.size
+        else:
+            totals["text"] += section.size
+
+    totals["total"] = totals["text"] + totals["data"] + totals["bss"]
+    totals["sections"] = sections
+    return totals
@@ -0,0 +1,208 @@
+"""
+Batched delivery of compiler events to the frontend.
+
+Every evaluate_js call is a synchronous round trip into the webview, and an
+ESP32 build prints thousands of lines. CompilerSession.send therefore only
+queues its event here; a dispatcher thread sends everything queued as one
+evaluate_js call every FLUSH_INTERVAL seconds, or as soon as
+MAX_BATCH_EVENTS are waiting. The script calls window.__onCompilerEvent
+once per event, so the frontend sees the same events as before; compile
+status snapshots ({"type": "status"}) go to window.__onCompileStatus, and
+package prefetch progress ({"type": "prefetch"}) to window.__onPrefetchStatus.
+
+Events that change a session's phase, and warnings and errors, are always
+delivered and flush the queue straight away. Plain log lines are condensed:
+a progress line ("Compiling ...", "Writing at 0x... (40 %)") replaces the
+previous one of the same kind and counts it in `repeat`, and an exact
+repeat of the previous line is folded the same way. Past MAX_PENDING_EVENTS
+queued events, further plain lines are dropped and summarised as a single
+"... N lines skipped" line, queued where the first of them was dropped so
+it stays ahead of the phase change or error that followed.
+"""
+
+import re
+import json
+import threading
+
+import webview
+
+from core.logger import get_logger
+
+log = get_logger("compiler")
+
+FLUSH_INTERVAL = 0.1
+MAX_BATCH_EVENTS = 200
+MAX_PENDING_EVENTS = 2000
+
+PROGRESS_LINE_PATTERN = re.compile(
+    r"^(Compiling|Archiving|Indexing|Linking|Building|Retrieving|Checking"
+    r"|Writing at|Reading at|Downloading|Unpacking)\b"
+)
+
+# phases after which a session sends nothing more
+_FINAL_PHASES = {"all_done", "cancelled"}
+
+DISPATCH_SCRIPT = (
+    "(function(events){var f=window.__onCompilerEvent,s=window.__onCompileStatus,"
+    "p=window.__onPrefetchStatus;for(var i=0;i<events.length;i++){var e=events[i];"
+    "if(e.type==='status'){if(s){s(e.status);}}"
+    "else if(e.type==='prefetch'){if(p){p(e.status);}}else if(f){f(e);}}})(%s)"
+)
+
+
+def dispatch_to_webview(events: list):
+    """Send a batch of events to the first window in one evaluate_js call."""
+    if not webview.windows:
+        return
+    webview.windows[0].evaluate_js(DISPATCH_SCRIPT % json.dumps(events))
+
+
+def publish_status(status: dict):
+    """Push a compile status snapshot to the frontend."""
+    COMPILER_EVENTS.push({"type": "status", "status": status}, important=True)
+
+
+def publish_prefetch_status(status: dict):
+    """Push package prefetch progress to the frontend."""
+    COMPILER_EVENTS.push({"type": "prefetch", "status": status}, important=True)
+
+
+def _get_progress_kind(text: str):
+    match = PROGRESS_LINE_PATTERN.match(text)
+    return match.group(1) if match else None
+
+
+class EventBatcher:
+    def __init__(
+        self,
+        dispatch=dispatch_to_webview,
+        interval: float = FLUSH_INTERVAL,
+        max_batch: int = MAX_BATCH_EVENTS,
+        max_pending: int = MAX_PENDING_EVENTS,
+    ):
+        self.dispatch = dispatch
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+
+        # (event, important) pairs
+        self._pending = []
+        # (session id, phase) → [queued "lines skipped" event, count]
+        self._skipped = {}
+        self._last_phase = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        self.stats = {"events": 0, "condensed": 0, "dropped": 0, "batches": 0}
+
+    def push(self, event: dict, important: bool = False):
+        """Queue an event dict (see CompilerEvent.to_dict).
+
+        `important` events are never condensed or dropped.
+        """
+        session_id = event.get("session_id")
+        phase = event.get("phase")
+
+        with self._lock:
+            self.stats["events"] += 1
+            if not important:
+                important = (
+                    self._last_phase.get(session_id) != phase
+                    or event.get("level", "info") != "info"
+                )
+                if phase in _FINAL_PHASES:
+                    self._last_phase.pop(session_id, None)
+                else:
+                    self._last_phase[session_id] = phase
+
+            if not important:
+                if self._condense(event):
+                    return
+                if len(self._pending) >= self.max_pending:
+                    self._skip(session_id, phase)
+                    return
+
+            self._pending.append((event, important))
+            # later drops of this session are summarised after this event
+            for key in [key for key in self._skipped if key[0] == session_id]:
+                del self._skipped[key]
+            flush_now = important or len(self._pending) >= self.max_batch
+
+        self._ensure_thread()
+        if flush_now:
+            self._wakeup.set()
+
+    def _skip(self, session_id, phase):
+        """Count a dropped line in the summary queued where the drops began."""
+        self.stats["dropped"] += 1
+        key = (session_id, phase)
+        entry = self._skipped.get(key)
+        if entry is None:
+            summary = {"phase": phase, "level": "info", "session_id": session_id}
+            entry = self._skipped[key] = [summary, 0]
+            # important, so no plain line gets condensed into it
+            self._pending.append((summary, True))
+        entry[1] += 1
+        entry[0]["text"] = f"... {entry[1]} lines skipped"
+
+    def _condense(self, event: dict) -> bool:
+        """Fold a plain line into the previous queued one, if it repeats it."""
+        if not self._pending:
+            return False
+        previous, important = self._pending[-1]
+        if (
+            important
+            or previous.get("session_id") != event.get("session_id")
+            or previous.get("phase") != event.get("phase")
+            or previous.get("level", "info") != "info"
+        ):
+            return False
+
+        kind = _get_progress_kind(event["text"])
+        same = previous["text"] == event["text"]
+        if not same and (kind is None or kind != _get_progress_kind(previous["text"])):
+            return False
+
+        repeat = previous.get("repeat", 1) + 1
+        if not same:
+            previous.update(event)
+        previous["repeat"] = repeat
+        self.stats["condensed"] += 1
+        return True
+
+    def flush(self):
+        """Deliver everything queued now, on the calling thread."""
+        with self._lock:
+            events, self._pending = self._pending, []
+            self._skipped = {}
+
+        events = [event for event, _ in events]
+        if not events:
+            return
+
+        self.stats["batches"] += 1
+        try:
+            self.dispatch(events)
+        except Exception as e:
+            log.debug("Dropped %s compiler events: %s", len(events), e)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="compiler-events", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+# shared by every compiler session in this process
+COMPILER_EVENTS = EventBatcher()
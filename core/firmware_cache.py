@@ -0,0 +1,162 @@
+"""
+Content-addressed store of compiled firmware.
+
+A build is identified by a digest of everything PlatformIO compiles from:
+the transpiled sources, platformio.ini and the starter template files in
+the build dir, plus the installed platform version. After a successful
+build the firmware images from .pio/build/<board> are copied into
+<app dir>/cache/firmware/<digest>; the next compile with the same digest
+copies them back and skips `pio run` entirely, so an unchanged project
+goes straight to upload.
+
+Metadata lives in the FirmwareArtifact table of core_db.db. Artifacts are
+evicted least recently used first once the store grows past
+MAX_FIRMWARE_CACHE_BYTES.
+"""
+
+import os
+import shutil
+import hashlib
+import datetime
+
+from core.db import FirmwareArtifact
+from core.utils import get_app_dir
+from core.logger import get_logger
+
+log = get_logger("compiler")
+
+FIRMWARE_CACHE_DIR_NAME = os.path.join("cache", "firmware")
+
+MAX_FIRMWARE_CACHE_BYTES = 512 * 1024 * 1024
+
+# images `pio run -t nobuild -t upload` needs, whichever the board produces
+ARTIFACT_FILES = (
+    "firmware.bin",
+    "firmware.elf",
+    "firmware.hex",
+    "bootloader.bin",
+    "partitions.bin",
+    # linker map for the size report
+    "firmware.map",
+)
+
+# build dir entries that are not compiler inputs
+_DIGEST_SKIP = {".pio", ".mojoscale_build.json"}
+
+
+def get_firmware_cache_dir():
+    return os.path.join(get_app_dir(), FIRMWARE_CACHE_DIR_NAME)
+
+
+def get_build_digest(build_dir: str, *extra) -> str:
+    """Digest of every source file in `build_dir` plus any `extra` parts."""
+    digest = hashlib.sha256()
+    for part in extra:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+
+    for dirpath, dirnames, filenames in os.walk(build_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in _DIGEST_SKIP)
+        for filename in sorted(filenames):
+            if filename in _DIGEST_SKIP:
+                continue
+            path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(path, build_dir).replace(os.sep, "/")
+            digest.update(rel_path.encode("utf-8"))
+            digest.update(b"\0")
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+
+    return digest.hexdigest()
+
+
+def _get_board_build_dir(build_dir: str, board: str) -> str:
+    return os.path.join(build_dir, ".pio", "build", board)
+
+
+def restore_firmware(digest: str, build_dir: str, board: str) -> bool:
+    """Copy a cached firmware into the build dir, return False on a miss."""
+    artifact = FirmwareArtifact.get_or_none(FirmwareArtifact.digest == digest)
+    if artifact is None:
+        return False
+
+    sources = [os.path.join(artifact.path, name) for name in artifact.files]
+    if not sources or not all(os.path.isfile(path) for path in sources):
+        log.warning("⚠️ Cached firmware %s is incomplete, dropping it", digest[:12])
+        _delete_artifact(artifact)
+        return False
+
+    target_dir = _get_board_build_dir(build_dir, board)
+    os.makedirs(target_dir, exist_ok=True)
+    for path in sources:
+        shutil.copy2(path, target_dir)
+
+    FirmwareArtifact.update(last_used_at=datetime.datetime.now()).where(
+        FirmwareArtifact.digest == digest
+    ).execute()
+    log.info("♻️ Reusing cached firmware %s", digest[:12])
+    return True
+
+
+def store_firmware(
+    digest: str,
+    build_dir: str,
+    board: str,
+    platform: str,
+    max_bytes: int = MAX_FIRMWARE_CACHE_BYTES,
+):
+    """Copy the firmware images of a finished build into the store."""
+    source_dir = _get_board_build_dir(build_dir, board)
+    files = [
+        name
+        for name in ARTIFACT_FILES
+        if os.path.isfile(os.path.join(source_dir, name))
+    ]
+    if not files:
+        log.warning("⚠️ No firmware images found in %s", source_dir)
+        return
+
+    target_dir = os.path.join(get_firmware_cache_dir(), digest)
+    try:
+        os.makedirs(target_dir, exist_ok=True)
+        size = 0
+        for name in files:
+            shutil.copy2(os.path.join(source_dir, name), target_dir)
+            size += os.path.getsize(os.path.join(target_dir, name))
+    except OSError as e:
+        log.warning("⚠️ Could not store firmware %s: %s", digest[:12], e)
+        shutil.rmtree(target_dir, ignore_errors=True)
+        return
+
+    now = datetime.datetime.now()
+    FirmwareArtifact.replace(
+        digest=digest,
+        board=board,
+        platform=platform,
+        path=target_dir,
+        files=files,
+        size=size,
+        created_at=now,
+        last_used_at=now,
+    ).execute()
+    log.info("📦 Stored firmware %s (%s bytes)", digest[:12], size)
+
+    prune_firmware_cache(max_bytes)
+
+
+def _delete_artifact(artifact):
+    shutil.rmtree(artifact.path, ignore_errors=True)
+    artifact.delete_instance()
+
+
+def prune_firmware_cache(max_bytes: int = MAX_FIRMWARE_CACHE_BYTES):
+    """Delete least recently used firmware until the store fits in `max_bytes`."""
+    artifacts = list(
+        FirmwareArtifact.select().order_by(FirmwareArtifact.last_used_at.desc())
+    )
+    total = 0
+    for artifact in artifacts:
+        total += artifact.size
+        if total > max_bytes:
+            log.debug("🗑️ Evicting cached firmware %s", artifact.digest[:12])
+            _delete_artifact(artifact)
@@ -0,0 +1,136 @@
+"""
+Logging for the transpiler, linter and compiler.
+
+Each subsystem logs through its own logger under "mojoscale", so levels can
+be set per subsystem. Disabled levels cost a single level check: messages
+use lazy %-style arguments and are never formatted unless they are emitted.
+
+Configured from the environment (or the app dir .env):
+
+    MOJOSCALE_LOG_LEVEL    default level for every subsystem (default: warning)
+    MOJOSCALE_LOG          per-subsystem overrides, e.g. "resolver=debug,lint=off"
+    MOJOSCALE_TRACE_FILE   optional path; records are appended to it as JSON lines
+
+Subsystems: transpiler, resolver, types, lint, compiler.
+"""
+
+import os
+import sys
+import json
+import logging
+import threading
+
+ROOT_LOGGER_NAME = "mojoscale"
+
+SUBSYSTEMS = ("transpiler", "resolver", "types", "lint", "compiler")
+
+DEFAULT_LOG_LEVEL = "warning"
+
+# "off" disables a subsystem entirely
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "off": logging.CRITICAL + 1,
+}
+
+_configure_lock = threading.Lock()
+_configured = False
+
+
+class JsonTraceFormatter(logging.Formatter):
+    """Format a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "level": record.levelname.lower(),
+            "subsystem": record.name.split(".", 1)[-1],
+            "func": record.funcName,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _parse_level(value, default=logging.WARNING):
+    if value is None:
+        return default
+    value = str(value).strip().lower()
+    if value in LOG_LEVELS:
+        return LOG_LEVELS[value]
+    print(f"⚠️ Unknown log level '{value}', using default")
+    return default
+
+
+def _parse_subsystem_levels(spec):
+    """Parse "resolver=debug,lint=off" into {"resolver": logging.DEBUG, ...}."""
+    levels = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, level = item.partition("=")
+        levels[name.strip()] = _parse_level(level)
+    return levels
+
+
+def configure_logging(level=None, subsystems=None, trace_file=None):
+    """
+    (Re)configure the mojoscale loggers.
+
+    Arguments default to the MOJOSCALE_LOG_LEVEL, MOJOSCALE_LOG and
+    MOJOSCALE_TRACE_FILE environment variables.
+    """
+    global _configured
+
+    with _configure_lock:
+        if level is None:
+            level = os.getenv("MOJOSCALE_LOG_LEVEL", DEFAULT_LOG_LEVEL)
+        if subsystems is None:
+            subsystems = os.getenv("MOJOSCALE_LOG")
+        if trace_file is None:
+            trace_file = os.getenv("MOJOSCALE_TRACE_FILE")
+
+        default_level = _parse_level(level)
+        if isinstance(subsystems, dict):
+            subsystem_levels = {k: _parse_level(v) for k, v in subsystems.items()}
+        else:
+            subsystem_levels = _parse_subsystem_levels(subsystems)
+
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+
+        # windowed builds have no stdout at all
+        if sys.stdout is not None:
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(logging.Formatter("%(message)s"))
+            root.addHandler(console)
+        else:
+            root.addHandler(logging.NullHandler())
+
+        if trace_file:
+            trace_handler = logging.FileHandler(trace_file, encoding="utf-8")
+            trace_handler.setFormatter(JsonTraceFormatter())
+            root.addHandler(trace_handler)
+
+        root.setLevel(default_level)
+        root.propagate = False
+
+        for name in SUBSYSTEMS:
+            logger = logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+            logger.setLevel(subsystem_levels.get(name, logging.NOTSET))
+
+        _configured = True
+
+
+def get_logger(subsystem):
+    """Return the logger for a subsystem, configuring logging on first use."""
+    if not _configured:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{subsystem}")
@@ -0,0 +1,451 @@
+"""
+Local mirror of PlatformIO library archives.
+
+Every build normally resolves lib_deps ("owner/Name@^1.2.0") against the
+PlatformIO registry. With MOJOSCALE_PACKAGE_MIRROR set, write_platformio_ini
+passes lib_deps through `mirror_lib_deps` instead, which points each one at
+an archive in the app dir:
+
+    <app dir>/package_mirror/<owner>/<Name>@<version>.tar.gz
+
+as a `file://` dependency. A library's own library.json dependencies are
+added the same way, so PlatformIO has nothing left to look up. Every project
+shares the archives, each version is downloaded once.
+
+    MOJOSCALE_PACKAGE_MIRROR=on        use the mirror, download what it lacks
+    MOJOSCALE_PACKAGE_MIRROR=offline   use the mirror only, never the network
+
+Missing archives come from the PlatformIO registry API, or, with
+MOJOSCALE_PACKAGE_REGISTRY=<dir>, from a local directory laid out like the
+mirror itself (a stand-in registry for air-gapped machines and tests).
+Dependencies that are URLs (git, http, file) are left as they are, and so is
+anything the mirror cannot resolve, with a warning.
+
+Version requirements follow the subset of semver PlatformIO specs use:
+"1.2.3" (exact), "^1.2.3", "~1.2.3", comparisons (">=1.0 <2.0") and "*".
+"""
+
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import hashlib
+import zipfile
+from pathlib import Path
+
+import requests
+
+from core.logger import get_logger
+from core.utils import get_app_dir
+
+log = get_logger("compiler")
+
+MIRROR_ENV_VAR = "MOJOSCALE_PACKAGE_MIRROR"
+REGISTRY_ENV_VAR = "MOJOSCALE_PACKAGE_REGISTRY"
+MIRROR_DIR_NAME = "package_mirror"
+
+MODE_OFF = "off"
+MODE_ON = "on"
+MODE_OFFLINE = "offline"
+
+REGISTRY_API_URL = "https://api.registry.platformio.org/v3"
+REGISTRY_TIMEOUT = 30
+
+ARCHIVE_EXTENSIONS = (".tar.gz", ".tgz", ".zip")
+
+# a PackageMirror is made per platformio.ini; builds running in parallel
+# download a library they all lack once
+_FETCH_LOCK = threading.Lock()
+MANIFEST_NAME = "library.json"
+
+VERSION_PATTERN = re.compile(r"^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:[-+].*)?$")
+COMPARISON_PATTERN = re.compile(r"^(>=|<=|>|<|==|=|!=|\^|~)?\s*(.+)$")
+
+
+def get_mirror_mode() -> str:
+    mode = os.getenv(MIRROR_ENV_VAR, MODE_OFF).lower()
+    if mode in ("1", "true", "yes"):
+        return MODE_ON
+    return mode if mode in (MODE_ON, MODE_OFFLINE) else MODE_OFF
+
+
+def is_mirror_enabled() -> bool:
+    return get_mirror_mode() != MODE_OFF
+
+
+# -----------------------------------------------------------------------------
+# Specs and versions
+# -----------------------------------------------------------------------------
+
+
+def parse_version(version: str):
+    """ "1.2" → (1, 2, 0); None when it is not a version."""
+    match = VERSION_PATTERN.match(str(version).strip())
+    if match is None:
+        return None
+    return tuple(int(part or 0) for part in match.groups())
+
+
+def _matches(version: tuple, operator: str, target: tuple) -> bool:
+    if operator == "^":
+        # the first non-zero part must stay the same
+        if target[0]:
+            upper = (target[0] + 1, 0, 0)
+        elif target[1]:
+            upper = (0, target[1] + 1, 0)
+        else:
+            upper = (0, 0, target[2] + 1)
+        return target <= version < upper
+    if operator == "~":
+        return target <= version < (target[0], target[1] + 1, 0)
+    return {
+        ">=": version >= target,
+        "<=": version <= target,
+        ">": version > target,
+        "<": version < target,
+        "!=": version != target,
+    }.get(operator, version == target)
+
+
+def version_satisfies(version: str, requirement: str) -> bool:
+    """Whether `version` meets a requirement such as "^1.2.0" or ">=1 <2"."""
+    parsed = parse_version(version)
+    if parsed is None:
+        return False
+    requirement = (requirement or "").strip()
+    if requirement in ("", "*"):
+        return True
+
+    for part in requirement.replace(",", " ").split():
+        match = COMPARISON_PATTERN.match(part)
+        target = parse_version(match.group(2)) if match else None
+        if target is None or not _matches(parsed, match.group(1) or "=", target):
+            return False
+    return True
+
+
+def pick_version(versions, requirement: str):
+    """Highest of `versions` that meets `requirement`, or None."""
+    matching = [v for v in versions if version_satisfies(v, requirement)]
+    return max(matching, key=parse_version) if matching else None
+
+
+def is_url_dependency(dependency: str) -> bool:
+    return "://" in dependency or dependency.endswith(".git")
+
+
+def parse_dependency(dependency: str):
+    """ "owner/Name @ ^1.0" → ("owner", "Name", "^1.0"); owner may be None."""
+    name, _, requirement = dependency.partition("@")
+    owner, _, name = name.strip().rpartition("/")
+    return owner or None, name.strip(), requirement.strip()
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def _same_name(a: str, b: str) -> bool:
+    return _safe_name(a).lower() == _safe_name(b).lower()
+
+
+def _split_archive_name(filename: str):
+    """ "Name@1.2.0.tar.gz" → ("Name", "1.2.0"), None for other files."""
+    for extension in ARCHIVE_EXTENSIONS:
+        if filename.endswith(extension):
+            name, _, version = filename[: -len(extension)].rpartition("@")
+            if name and parse_version(version) is not None:
+                return name, version
+    return None
+
+
+def read_archive_manifest(path: str) -> dict:
+    """The library.json closest to the root of an archive, {} without one."""
+    try:
+        if path.endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                names = [n for n in archive.namelist() if n.endswith(MANIFEST_NAME)]
+                if not names:
+                    return {}
+                data = archive.read(min(names, key=lambda n: n.count("/")))
+        else:
+            with tarfile.open(path, "r:*") as archive:
+                members = [
+                    m
+                    for m in archive.getmembers()
+                    if m.isfile() and m.name.endswith(MANIFEST_NAME)
+                ]
+                if not members:
+                    return {}
+                member = min(members, key=lambda m: m.name.count("/"))
+                data = archive.extractfile(member).read()
+        return json.loads(data.decode("utf-8"))
+    except (OSError, ValueError, tarfile.TarError, zipfile.BadZipFile):
+        return {}
+
+
+def _applies_to(value, platform: str) -> bool:
+    if not value or not platform:
+        return True
+    if isinstance(value, str):
+        value = [v.strip() for v in value.split(",")]
+    return "*" in value or platform in value
+
+
+def get_manifest_dependencies(manifest: dict, platform: str = None) -> list:
+    """Dependency specs a library.json declares for `platform`."""
+    dependencies = manifest.get("dependencies") or []
+    if isinstance(dependencies, dict):
+        dependencies = [
+            {"name": name, "version": version} for name, version in dependencies.items()
+        ]
+
+    specs = []
+    for dependency in dependencies:
+        if not isinstance(dependency, dict) or not dependency.get("name"):
+            continue
+        if not _applies_to(dependency.get("platforms"), platform):
+            continue
+        name = dependency["name"]
+        if dependency.get("owner"):
+            name = f"{dependency['owner']}/{name}"
+        version = dependency.get("version")
+        specs.append(f"{name}@{version}" if version else name)
+    return specs
+
+
+# -----------------------------------------------------------------------------
+# Registries
+# -----------------------------------------------------------------------------
+
+
+class DirectoryRegistry:
+    """Archives in a directory laid out like the mirror (<owner>/<Name>@<version>)."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def find_versions(self, owner, name: str) -> list:
+        """(owner, name, version) of every archive for a library."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        owners = [owner] if owner else sorted(os.listdir(self.root))
+        for candidate in owners:
+            owner_dir = os.path.join(self.root, _safe_name(candidate))
+            if not os.path.isdir(owner_dir):
+                continue
+            for filename in sorted(os.listdir(owner_dir)):
+                parsed = _split_archive_name(filename)
+                if parsed and _same_name(parsed[0], name):
+                    found.append((candidate, parsed[0], parsed[1]))
+        return found
+
+    def get_archive(self, owner: str, name: str, version: str):
+        owner_dir = os.path.join(self.root, _safe_name(owner))
+        for extension in ARCHIVE_EXTENSIONS:
+            path = os.path.join(owner_dir, f"{_safe_name(name)}@{version}{extension}")
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def download(self, owner: str, name: str, version: str, target_dir: str):
+        """Copy an archive into `target_dir`, return its file name."""
+        source = self.get_archive(owner, name, version)
+        if source is None:
+            raise FileNotFoundError(f"{owner}/{name}@{version} not in {self.root}")
+        filename = os.path.basename(source)
+        shutil.copyfile(source, os.path.join(target_dir, filename))
+        return filename
+
+
+class PlatformIORegistry:
+    """The public PlatformIO registry API."""
+
+    def __init__(self, api_url: str = REGISTRY_API_URL):
+        self.api_url = api_url.rstrip("/")
+        self._packages = {}
+
+    def _get_package(self, owner, name: str):
+        key = (owner, name.lower())
+        if key not in self._packages:
+            if owner is None:
+                response = requests.get(
+                    f"{self.api_url}/search",
+                    params={"query": f'type:library name:"{name}"'},
+                    timeout=REGISTRY_TIMEOUT,
+                )
+                response.raise_for_status()
+                items = [
+                    item
+                    for item in response.json().get("items", [])
+                    if _same_name(item.get("name", ""), name)
+                ]
+                if not items:
+                    self._packages[key] = None
+                    return None
+                owner = items[0]["owner"]["username"]
+
+            response = requests.get(
+                f"{self.api_url}/packages/{owner}/library/{name}",
+                timeout=REGISTRY_TIMEOUT,
+            )
+            if response.status_code == 404:
+                self._packages[key] = None
+                return None
+            response.raise_for_status()
+            self._packages[key] = response.json()
+        return self._packages[key]
+
+    def find_versions(self, owner, name: str) -> list:
+        package = self._get_package(owner, name)
+        if package is None:
+            return []
+        owner = package["owner"]["username"]
+        return [
+            (owner, package["name"], version["name"])
+            for version in package.get("versions", [])
+            if version.get("files")
+        ]
+
+    def download(self, owner: str, name: str, version: str, target_dir: str):
+        package = self._get_package(owner, name)
+        entry = next(v for v in package.get("versions", []) if v["name"] == version)
+        file_info = entry["files"][0]
+        filename = f"{_safe_name(name)}@{version}.tar.gz"
+
+        response = requests.get(file_info["download_url"], timeout=REGISTRY_TIMEOUT)
+        response.raise_for_status()
+        expected = (file_info.get("checksum") or {}).get("sha256")
+        if expected and hashlib.sha256(response.content).hexdigest() != expected:
+            raise ValueError(f"checksum mismatch for {owner}/{name}@{version}")
+        with open(os.path.join(target_dir, filename), "wb") as f:
+            f.write(response.content)
+        return filename
+
+
+def get_registry():
+    registry_dir = os.getenv(REGISTRY_ENV_VAR)
+    if registry_dir:
+        return DirectoryRegistry(registry_dir)
+    return PlatformIORegistry()
+
+
+# -----------------------------------------------------------------------------
+# The mirror
+# -----------------------------------------------------------------------------
+
+
+class PackageMirror:
+    def __init__(self, mirror_dir: str, registry=None, offline: bool = False):
+        """`registry` fills in missing archives unless `offline`."""
+        self.mirror_dir = mirror_dir
+        self.local = DirectoryRegistry(mirror_dir)
+        self.registry = registry
+        self.offline = offline
+
+    def _fetch(self, owner, name: str, requirement: str):
+        """Download the best matching version into the mirror, return its path."""
+        found = self.registry.find_versions(owner, name)
+        version = pick_version([v for _, _, v in found], requirement)
+        if version is None:
+            return None
+        owner, name, _ = next(entry for entry in found if entry[2] == version)
+
+        owner_dir = os.path.join(self.mirror_dir, _safe_name(owner))
+        os.makedirs(owner_dir, exist_ok=True)
+        # a build may read the mirror meanwhile, publish the archive atomically
+        tmp_dir = tempfile.mkdtemp(dir=owner_dir, prefix=".download_")
+        try:
+            filename = self.registry.download(owner, name, version, tmp_dir)
+            target = os.path.join(owner_dir, filename)
+            os.replace(os.path.join(tmp_dir, filename), target)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        log.info("📦 Mirrored %s/%s@%s", owner, name, version)
+        return target
+
+    def _find_local(self, owner, name: str, requirement: str):
+        found = self.local.find_versions(owner, name)
+        version = pick_version([v for _, _, v in found], requirement)
+        if version is None:
+            return None
+        owner, name, _ = next(entry for entry in found if entry[2] == version)
+        return self.local.get_archive(owner, name, version)
+
+    def get_archive(self, dependency: str):
+        """Path of a mirrored archive for a dependency spec, or None."""
+        owner, name, requirement = parse_dependency(dependency)
+        archive = self._find_local(owner, name, requirement)
+        if archive is not None or self.offline or self.registry is None:
+            return archive
+
+        with _FETCH_LOCK:
+            # another build may have fetched it while this one waited
+            archive = self._find_local(owner, name, requirement)
+            if archive is not None:
+                return archive
+            try:
+                return self._fetch(owner, name, requirement)
+            except (OSError, ValueError, StopIteration, requests.RequestException) as e:
+                log.warning("⚠️ Could not mirror %s: %s", dependency, e)
+                return None
+
+    def resolve(self, dependencies, platform: str = None) -> list:
+        """
+        lib_deps entries for `dependencies`: a file:// archive for every
+        library the mirror has (and the libraries those depend on), the
+        spec as it was for the rest. Dependencies of mirrored libraries that
+        the mirror lacks are left to PlatformIO.
+        """
+        resolved, archives, seen = [], set(), set()
+        # (spec, listed in `dependencies`)
+        pending = [(dependency, True) for dependency in dependencies]
+        while pending:
+            dependency, direct = pending.pop(0)
+            dependency = dependency.strip()
+            if not dependency or dependency in seen:
+                continue
+            seen.add(dependency)
+            if is_url_dependency(dependency):
+                if direct:
+                    resolved.append(dependency)
+                continue
+
+            archive = self.get_archive(dependency)
+            if archive is None:
+                log.warning("⚠️ %s is not in the package mirror", dependency)
+                if direct:
+                    resolved.append(dependency)
+                continue
+            if archive in archives:
+                continue
+            archives.add(archive)
+            # forward slashes on Windows too, PlatformIO does not unquote it
+            resolved.append("file://" + Path(archive).as_posix())
+            pending += [
+                (spec, False)
+                for spec in get_manifest_dependencies(
+                    read_archive_manifest(archive), platform
+                )
+            ]
+        return resolved
+
+
+def get_package_mirror() -> PackageMirror:
+    mode = get_mirror_mode()
+    return PackageMirror(
+        os.path.join(get_app_dir(), MIRROR_DIR_NAME),
+        registry=None if mode == MODE_OFFLINE else get_registry(),
+        offline=mode == MODE_OFFLINE,
+    )
+
+
+def mirror_lib_deps(dependencies, platform: str = None) -> list:
+    """lib_deps pointing at the package mirror, if it is enabled."""
+    if not is_mirror_enabled():
+        return list(dependencies)
+    return get_package_mirror().resolve(dependencies, platform)
@@ -0,0 +1,271 @@
+"""
+Background warm-up of PlatformIO packages at startup.
+
+The first compile for a board otherwise waits for PlatformIO to download
+the platform, its toolchain and framework, and every library in lib_deps.
+The warm-up installs those ahead of time, in a daemon thread at low
+priority: for every board an existing project targets, `pio pkg install`
+in a small warm-up project (<app dir>/.platformio/prefetch/<board>) with the
+same platformio.ini a build writes, then each core-lib `__dependencies__`
+entry for that board's platform.
+
+Platforms and tools land in the shared PlatformIO core dir. Libraries are
+installed into the warm-up project, which fills PlatformIO's download cache,
+so a project's own lib_deps install no longer goes to the network.
+With the package mirror enabled (see core.package_mirror), libraries go into
+the mirror instead. Items that were installed before are recorded in
+prefetch.json and skipped.
+
+Progress is kept in a status dict (see PrefetchTask.get_status) and pushed
+through `publish` on every change. Set MOJOSCALE_PREFETCH=0 to turn it off.
+"""
+
+import ast
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from core.logger import get_logger
+from core.package_mirror import (
+    get_package_mirror,
+    is_mirror_enabled,
+    is_url_dependency,
+)
+from core.compiler import (
+    CORE_LIBS_PATH,
+    _lower_process_priority,
+    _safe_dir_name,
+    get_platform_version,
+    get_platformio_command,
+    write_platformio_ini,
+)
+
+log = get_logger("compiler")
+
+PREFETCH_ENV_VAR = "MOJOSCALE_PREFETCH"
+PREFETCH_DIR_NAME = "prefetch"
+PREFETCH_STATE_NAME = "prefetch.json"
+DEFAULT_BOARDS = {"esp32dev": "espressif32"}
+
+# a stuck download should not keep the warm-up going forever
+INSTALL_TIMEOUT = 30 * 60
+
+
+def is_prefetch_enabled() -> bool:
+    return os.getenv(PREFETCH_ENV_VAR, "1").lower() not in ("0", "false", "no")
+
+
+def _read_dependencies(path: str):
+    """The __dependencies__ value of a core-lib file, without importing it."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "__dependencies__"
+            for target in node.targets
+        ):
+            try:
+                return ast.literal_eval(node.value)
+            except ValueError:
+                return None
+    return None
+
+
+def get_core_lib_dependencies(platform: str, core_libs_path: str = CORE_LIBS_PATH):
+    """Every lib_deps entry a core-lib module can add for `platform`."""
+    dependencies = set()
+    for dirpath, dirnames, filenames in os.walk(core_libs_path):
+        dirnames[:] = [d for d in dirnames if d != "__pycache__"]
+        for filename in filenames:
+            if not filename.endswith(".py"):
+                continue
+            value = _read_dependencies(os.path.join(dirpath, filename))
+            if isinstance(value, dict):
+                # per-platform dependencies, as the transpiler reads them
+                value = value.get(platform)
+            if not isinstance(value, str):
+                continue
+            dependencies.update(d.strip() for d in value.split(",") if d.strip())
+    return sorted(dependencies)
+
+
+def get_project_boards(projects) -> dict:
+    """board id → platform for the boards existing projects target."""
+    boards = {}
+    for project in projects:
+        metadata = project.get("metadata") or {}
+        board, platform = metadata.get("board_id"), metadata.get("platform")
+        if board and platform:
+            boards.setdefault(board, platform)
+    return boards or dict(DEFAULT_BOARDS)
+
+
+class PrefetchTask:
+    def __init__(self, user_app_dir: str, boards: dict, publish=None):
+        """`boards` maps board id → platform; `publish` gets status snapshots."""
+        self.user_app_dir = user_app_dir
+        self.boards = boards
+        self.publish = publish
+        self.prefetch_dir = os.path.join(user_app_dir, ".platformio", PREFETCH_DIR_NAME)
+        self.state_path = os.path.join(self.prefetch_dir, PREFETCH_STATE_NAME)
+        self._lock = threading.Lock()
+        self._status = {
+            "state": "idle",
+            "percent": 0,
+            "done": 0,
+            "total": 0,
+            "current": None,
+            "failed": [],
+        }
+
+    def get_status(self) -> dict:
+        with self._lock:
+            return dict(self._status, failed=list(self._status["failed"]))
+
+    def _update(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+            total = self._status["total"]
+            self._status["percent"] = (
+                100 * self._status["done"] // total if total else 100
+            )
+            self._status["updated_at"] = time.time()
+        snapshot = self.get_status()
+        if self.publish is not None:
+            self.publish(snapshot)
+        return snapshot
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: dict):
+        os.makedirs(self.prefetch_dir, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def get_steps(self) -> list:
+        """(key, label, board, library or None) for everything to install."""
+        steps = []
+        seen_platforms = set()
+        for board, platform in sorted(self.boards.items()):
+            steps.append((f"board:{board}", f"{platform} for {board}", board, None))
+            if platform in seen_platforms:
+                continue
+            seen_platforms.add(platform)
+            for dependency in get_core_lib_dependencies(platform):
+                steps.append(
+                    (f"lib:{platform}:{dependency}", dependency, board, dependency)
+                )
+        return steps
+
+    def _install(self, board: str, library=None) -> bool:
+        platform = self.boards[board]
+        if library and is_mirror_enabled() and not is_url_dependency(library):
+            # builds take libraries from the mirror, fill that instead
+            return get_package_mirror().get_archive(library) is not None
+
+        project_dir = os.path.join(self.prefetch_dir, _safe_dir_name(board))
+        os.makedirs(project_dir, exist_ok=True)
+        # same platform, board and ArduinoJson as a build; no PCH script
+        write_platformio_ini(board, platform, project_dir, [], pch=False)
+
+        pio_cmd, env = get_platformio_command(self.user_app_dir)
+        cmd = pio_cmd + ["pkg", "install", "-d", project_dir]
+        if library is not None:
+            cmd += ["--no-save", "-l", library]
+
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = (
+                subprocess.CREATE_NO_WINDOW | subprocess.BELOW_NORMAL_PRIORITY_CLASS
+            )
+        else:
+            kwargs["preexec_fn"] = _lower_process_priority
+
+        try:
+            result = subprocess.run(
+                cmd,
+                cwd=project_dir,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="ignore",
+                timeout=INSTALL_TIMEOUT,
+                **kwargs,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            log.warning("⚠️ Prefetch of %s failed: %s", library or platform, e)
+            return False
+
+        if result.returncode != 0:
+            log.warning(
+                "⚠️ Prefetch of %s failed:\n%s",
+                library or platform,
+                result.stdout[-2000:],
+            )
+            return False
+        return True
+
+    def _get_installed_marker(self, board: str, library=None):
+        if library is not None:
+            return True
+        return get_platform_version(self.user_app_dir, self.boards[board])
+
+    def _is_installed(self, state: dict, step) -> bool:
+        key, _, board, library = step
+        if key not in state:
+            return False
+        # an updated platform needs its toolchain and framework again
+        return state[key] == self._get_installed_marker(board, library)
+
+    def run(self):
+        pio_cmd, _ = get_platformio_command(self.user_app_dir)
+        if not os.path.isfile(pio_cmd[0]):
+            log.info("⏭️ PlatformIO is not installed yet, skipping the prefetch")
+            return self._update(state="skipped")
+
+        state = self._load_state()
+        steps = self.get_steps()
+        pending = [step for step in steps if not self._is_installed(state, step)]
+
+        self._update(state="running", total=len(steps), done=len(steps) - len(pending))
+        log.info("📦 Prefetching %s PlatformIO packages", len(pending))
+
+        failed = []
+        for key, label, board, library in pending:
+            self._update(current=label)
+            if self._install(board, library):
+                state[key] = self._get_installed_marker(board, library)
+                self._save_state(state)
+            else:
+                failed.append(label)
+            self._update(done=self.get_status()["done"] + 1, failed=failed)
+
+        log.info("📦 Prefetch finished, %s failed", len(failed))
+        return self._update(state="failed" if failed else "done", current=None)
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._run_safely, daemon=True)
+        thread.start()
+        return thread
+
+    def _run_safely(self):
+        try:
+            self.run()
+        except Exception as e:
+            log.exception("❌ Prefetch crashed: %s", e)
+            self._update(state="failed", current=None)
@@ -0,0 +1,389 @@
+"""
+Per-symbol flash/RAM attribution for a built firmware.
+
+Reads the symbol table of firmware.elf and the linker map PlatformIO writes
+next to it (see the -Wl,-Map flag in BUILD_FLAGS), then groups every sized
+symbol under whatever produced it:
+
+    function   a function from main.py; ArduinoTranspiler.visit_FunctionDef
+               emits them under their Python names, so `loop` maps back to
+               `def loop()` in main.py
+    helper     a class or function defined in a header under include/
+               (the Py* runtime and the core-lib helper headers)
+    sketch     anything else compiled from src/main.ino
+    library    a library under lib/ or .pio/libdeps
+    framework  the Arduino core and the ESP SDK
+    toolchain  libc, libgcc and friends
+
+Symbols are matched by their demangled names, using the small Itanium
+demangler below (qualified name only, parameter lists are dropped). A
+function-local static is named after its function ("setup::count"), and
+vtables, typeinfo and guard variables after what they belong to, so they
+are charged to it.
+"""
+
+import os
+import re
+import ast
+import bisect
+import struct
+
+from core.elf import ElfFile, ElfError, SHT_NOBITS
+from core.logger import get_logger
+
+log = get_logger("compiler")
+
+MAP_FILE_NAME = "firmware.map"
+
+DEFAULT_TOP_SYMBOLS = 20
+
+HEADER_EXTENSIONS = (".h", ".hpp")
+
+TOOLCHAIN_ARCHIVES = {"libc.a", "libm.a", "libgcc.a", "libstdc++.a", "libnosys.a"}
+
+HEADER_CLASS_PATTERN = re.compile(
+    r"^(?:template\s*<[^>]*>\s*)?(?:class|struct)\s+(\w+)\s*[:{\n]", re.M
+)
+HEADER_FUNCTION_PATTERN = re.compile(
+    r"^(?:template\s*<[^>]*>\s*)?(?:(?:inline|static|constexpr)\s+)*"
+    r"[\w:<>,*&]+(?:\s+[\w:<>,*&]+)*?[\s*&]+(\w+)\s*\([^;{)]*\)\s*(?:const\s*)?\{",
+    re.M,
+)
+_NOT_FUNCTIONS = {"if", "for", "while", "switch", "return", "sizeof"}
+
+# " .text.loop   0x400d1234   0x2a .pio/build/esp32dev/src/main.ino.cpp.o"
+MAP_INPUT_SECTION_PATTERN = re.compile(
+    r"^\s+(?:(\.\S+)\s+)?0x([0-9a-fA-F]+)\s+0x([0-9a-fA-F]+)\s+(\S.*)$"
+)
+MAP_SECTION_NAME_PATTERN = re.compile(r"^\s(\.\S+)\s*$")
+MAP_ARCHIVE_MEMBER_PATTERN = re.compile(r"([^/\\(]+)\(([^)]+)\)$")
+
+# vtable, typeinfo, typeinfo name and guard variable of what follows
+SPECIAL_NAME_PREFIXES = ("_ZTV", "_ZTI", "_ZTS", "_ZGV")
+# "_0" or "__12_" after a local entity tells apart statics of the same name
+LOCAL_DISCRIMINATOR_PATTERN = re.compile(r"(?:_\d|__\d+_)?")
+
+
+# =============================================================================
+# Demangler
+# =============================================================================
+
+
+def demangle(name: str) -> str:
+    """Qualified name of an Itanium-mangled C++ symbol, e.g. "PyList::append"."""
+    if not name.startswith("_Z"):
+        return name
+    start = 4 if name.startswith(SPECIAL_NAME_PREFIXES) else 2
+    try:
+        if name[start] == "Z":
+            parts = _parse_local_name(name, start)
+        else:
+            parts, _ = _parse_name(name, start)
+    except (IndexError, ValueError):
+        return name
+    parts = [part for part in parts if part]
+    return "::".join(parts) if parts else name
+
+
+def _parse_local_name(s, i):
+    """
+    "Z <function encoding> E <entity>": a static (or string literal) local to
+    a function, e.g. "_ZZ5setupvE5count" → ["setup", "count"].
+    """
+    parts, _ = _parse_name(s, i + 1)
+    # the function's parameter types come before the E, the entity is what
+    # follows the last E that leaves a well-formed entity
+    end = len(s)
+    while True:
+        end = s.rfind("E", i + 1, end)
+        if end < 0:
+            # e.g. a lambda; still the function's
+            return parts
+        entity = _parse_local_entity(s[end + 1 :])
+        if entity is not None:
+            return parts + [entity]
+
+
+def _parse_local_entity(tail):
+    if tail[:1] == "s" and LOCAL_DISCRIMINATOR_PATTERN.fullmatch(tail[1:]):
+        return "string literal"
+    j = 0
+    while j < len(tail) and tail[j].isdigit():
+        j += 1
+    if not j:
+        return None
+    end = j + int(tail[:j])
+    if end > len(tail) or not LOCAL_DISCRIMINATOR_PATTERN.fullmatch(tail[end:]):
+        return None
+    return tail[j:end]
+
+
+def _parse_name(s, i):
+    if s[i] == "L":
+        i += 1
+
+    if s[i] == "N":
+        i += 1
+        while s[i] in "rVKRO":
+            i += 1
+        parts = []
+        while s[i] != "E":
+            part, i = _parse_component(s, i, parts)
+            parts.append(part)
+        return parts, i + 1
+
+    parts = []
+    if s.startswith("St", i):
+        parts.append("std")
+        i += 2
+    part, i = _parse_component(s, i, parts)
+    parts.append(part)
+    return parts, i
+
+
+def _parse_component(s, i, parts):
+    if s[i].isdigit():
+        j = i
+        while s[j].isdigit():
+            j += 1
+        end = j + int(s[i:j])
+        if end > len(s):
+            raise ValueError("truncated source name")
+        return s[j:end], end
+
+    if s.startswith("St", i):
+        return "std", i + 2
+    if s[i] == "I":
+        # template arguments are not part of the name we report
+        return None, _skip_template_args(s, i)
+    # constructors and destructors are named after their class
+    class_name = next((part for part in reversed(parts) if part), None)
+    if s[i] == "C" and class_name:
+        return class_name, i + 2
+    if s[i] == "D" and s[i + 1] in "012" and class_name:
+        return "~" + class_name, i + 2
+    if s[i].islower() and s[i + 1].isalpha():
+        return "operator", i + 2
+    raise ValueError(f"unsupported mangling at {i}")
+
+
+def _skip_template_args(s, i):
+    depth = 0
+    while True:
+        c = s[i]
+        if c.isdigit():
+            j = i
+            while s[j].isdigit():
+                j += 1
+            i = j + int(s[i:j])
+            continue
+        if c in "INJLX":
+            depth += 1
+        elif c == "E":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+
+
+# =============================================================================
+# Sources: main.py, headers and the linker map
+# =============================================================================
+
+
+def get_user_definitions(py_files: dict) -> dict:
+    """Map transpiled function names to their "main.py:<line>" definition."""
+    definitions = {}
+    for filename, code in py_files.items():
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            continue
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef):
+                definitions[node.name] = f"{filename}:{node.lineno}"
+            elif isinstance(node, ast.ClassDef):
+                definitions[node.name] = f"{filename}:{node.lineno}"
+    return definitions
+
+
+def scan_header_definitions(include_dir: str) -> dict:
+    """Map classes and functions defined in headers to the header's path."""
+    definitions = {}
+    for dirpath, _, filenames in os.walk(include_dir):
+        for filename in sorted(filenames):
+            if not filename.endswith(HEADER_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(path, include_dir).replace(os.sep, "/")
+            try:
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    source = f.read()
+            except OSError:
+                continue
+
+            for pattern in (HEADER_CLASS_PATTERN, HEADER_FUNCTION_PATTERN):
+                for name in pattern.findall(source):
+                    if name not in _NOT_FUNCTIONS:
+                        definitions.setdefault(name, rel_path)
+    return definitions
+
+
+def parse_map_file(path: str):
+    """Return sorted (start, end, object file) ranges of the linked input sections."""
+    ranges = []
+    pending_name = None
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            match = MAP_INPUT_SECTION_PATTERN.match(line)
+            if match and (match.group(1) or pending_name):
+                start, size = int(match.group(2), 16), int(match.group(3), 16)
+                if size and start:
+                    ranges.append((start, start + size, match.group(4).strip()))
+                pending_name = None
+                continue
+            # long input section names wrap onto their own line
+            name_match = MAP_SECTION_NAME_PATTERN.match(line)
+            pending_name = name_match.group(1) if name_match else None
+
+    ranges.sort()
+    return ranges
+
+
+def _find_object(ranges, starts, address):
+    index = bisect.bisect_right(starts, address) - 1
+    if index >= 0 and address < ranges[index][1]:
+        return ranges[index][2]
+    return None
+
+
+def _classify_object(obj: str):
+    """Group name and kind for an object file path from the linker map."""
+    obj = obj.replace("\\", "/")
+    member = MAP_ARCHIVE_MEMBER_PATTERN.search(obj)
+    archive = member.group(1) if member else None
+
+    if "/src/" in obj and archive is None:
+        return "main.ino", "sketch"
+    if archive in TOOLCHAIN_ARCHIVES or "/toolchain-" in obj:
+        return archive or os.path.basename(obj), "toolchain"
+    if "framework-" in obj or archive == "libFrameworkArduino.a":
+        return "Arduino framework", "framework"
+    if archive and archive.startswith("lib") and archive.endswith(".a"):
+        return archive[3:-2], "library"
+    return os.path.basename(obj), "other"
+
+
+# =============================================================================
+# Report
+# =============================================================================
+
+
+def _get_symbol_regions(symbol):
+    """Memory a symbol occupies: code and constants live in flash, data in both."""
+    section = symbol.section
+    if section is None or not section.is_alloc:
+        return ()
+    if section.type == SHT_NOBITS:
+        return ("ram",)
+    if section.is_writable:
+        return ("flash", "ram")
+    return ("flash",)
+
+
+def analyze_firmware_size(
+    build_dir: str, board: str, py_files: dict, top: int = DEFAULT_TOP_SYMBOLS
+):
+    """
+    Group the firmware's symbols by Python function, helper header and
+    library. Returns None when the build has no readable firmware.elf.
+    """
+    board_dir = os.path.join(build_dir, ".pio", "build", board)
+    elf_path = os.path.join(board_dir, "firmware.elf")
+    try:
+        symbols = ElfFile.from_path(elf_path).get_symbols()
+    except FileNotFoundError:
+        return None
+    except (OSError, ElfError, struct.error) as e:
+        log.warning("⚠️ Could not read symbols of %s: %s", board_dir, e)
+        return None
+
+    ranges = []
+    map_path = os.path.join(board_dir, MAP_FILE_NAME)
+    if os.path.isfile(map_path):
+        ranges = parse_map_file(map_path)
+    starts = [start for start, _, _ in ranges]
+
+    user_definitions = get_user_definitions(py_files)
+    header_definitions = scan_header_definitions(os.path.join(build_dir, "include"))
+
+    groups = {}
+    rows = []
+    totals = {"flash": 0, "ram": 0}
+
+    for symbol in symbols:
+        regions = _get_symbol_regions(symbol)
+        if not regions:
+            continue
+
+        name = demangle(symbol.name)
+        scope = name.split("::", 1)[0]
+
+        if scope in user_definitions:
+            key, kind, source = scope, "function", user_definitions[scope]
+        elif scope in header_definitions:
+            key, kind = header_definitions[scope], "helper"
+            source = f"include/{key}"
+        else:
+            obj = _find_object(ranges, starts, symbol.value) if ranges else None
+            key, kind = _classify_object(obj) if obj else ("unknown", "other")
+            source = obj
+
+        group = groups.get((kind, key))
+        if group is None:
+            group = groups[(kind, key)] = {
+                "name": key,
+                "kind": kind,
+                "source": source,
+                "flash": 0,
+                "ram": 0,
+                "symbols": 0,
+            }
+        group["symbols"] += 1
+        for region in regions:
+            group[region] += symbol.size
+            totals[region] += symbol.size
+
+        rows.append(
+            {
+                "symbol": name,
+                "group": key,
+                "kind": kind,
+                "region": "+".join(regions),
+                "size": symbol.size,
+            }
+        )
+
+    ordered = sorted(
+        groups.values(), key=lambda g: (g["flash"] + g["ram"], g["name"]), reverse=True
+    )
+    rows.sort(key=lambda row: row["size"], reverse=True)
+    return {
+        "flash": totals["flash"],
+        "ram": totals["ram"],
+        "groups": ordered,
+        "top_symbols": rows[:top],
+    }
+
+
+def format_top_consumers(report: dict, limit: int = 10) -> str:
+    """Plain-text table of the biggest groups of a size report."""
+    lines = [f"{'flash':>9} {'ram':>9}  {'kind':<10} name"]
+    for group in report["groups"][:limit]:
+        name = group["name"]
+        if group["kind"] == "function":
+            name = f"{name}() ({group['source']})"
+        lines.append(
+            f"{group['flash']:>9} {group['ram']:>9}  {group['kind']:<10} {name}"
+        )
+    return "\n".join(lines)
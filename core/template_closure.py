@@ -0,0 +1,136 @@
+"""
+The part of the starter template a sketch actually needs.
+
+The template ships every core-lib helper header (include/helpers/...) and
+every bundled library (lib/<name>/), but a sketch only uses the ones its
+imports pulled in: the transpiler emits `#include "helpers/..."` for a
+module's __include_internal_modules__ and `#include <Lib.h>` for the
+library it wraps. Following those includes from the transpiled code, through
+the helpers and bundled libraries they reach, gives the closure;
+everything else stays out of the build folder, so there is less to copy and
+less for PlatformIO's library dependency finder to scan.
+
+The Py* runtime and everything outside include/helpers and lib/ (e.g.
+scripts/) are always part of it.
+
+Includes are matched case-insensitively, like the Windows and macOS file
+systems most sketches are built on: a core lib asking for
+"helpers/WiFiHelper.h" still gets include/helpers/WifiHelper.h.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+INCLUDE_PATTERN = re.compile(r'^\s*#\s*include\s*([<"])([^>"]+)[>"]', re.M)
+
+HELPERS_DIR = "include/helpers/"
+LIB_DIR = "lib/"
+SOURCE_EXTENSIONS = (".h", ".hpp", ".c", ".cpp", ".ino")
+
+
+class TemplateIndex:
+    def __init__(self, template_dir: str):
+        self.template_dir = template_dir
+        # template paths use "/" here, whatever the OS
+        self.files = []
+        # lowercased header file name → bundled library dirs
+        # ("onewire.h" → ["lib/OneWire"])
+        self.lib_headers = {}
+        self.lib_files = {}
+
+        for dirpath, dirnames, filenames in os.walk(template_dir):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            for filename in sorted(filenames):
+                rel_path = os.path.relpath(
+                    os.path.join(dirpath, filename), template_dir
+                ).replace(os.sep, "/")
+                self.files.append(rel_path)
+
+                if rel_path.startswith(LIB_DIR):
+                    lib_dir = "/".join(rel_path.split("/")[:2])
+                    self.lib_files.setdefault(lib_dir, []).append(rel_path)
+                    if filename.endswith((".h", ".hpp")):
+                        lib_dirs = self.lib_headers.setdefault(filename.lower(), [])
+                        if lib_dir not in lib_dirs:
+                            lib_dirs.append(lib_dir)
+
+        # lowercased path → path
+        self._file_names = {path.lower(): path for path in self.files}
+
+    def is_optional(self, rel_path: str) -> bool:
+        return rel_path.startswith((HELPERS_DIR, LIB_DIR))
+
+    def read(self, rel_path: str) -> str:
+        path = os.path.join(self.template_dir, *rel_path.split("/"))
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read()
+
+    def resolve(self, quote: str, header: str, including: str = None):
+        """Template files an include refers to (empty for framework headers)."""
+        candidates = []
+        if quote == '"' and including is not None:
+            base = os.path.dirname(including)
+            candidates.append(os.path.normpath(os.path.join(base, header)))
+        candidates.append(os.path.normpath(os.path.join("include", header)))
+
+        for candidate in candidates:
+            path = self._file_names.get(candidate.replace(os.sep, "/").lower())
+            if path is not None:
+                return [path]
+
+        # the include does not say which library it means when several
+        # ship the header; keep them all rather than break the build
+        return [
+            path
+            for lib_dir in self.lib_headers.get(os.path.basename(header).lower(), [])
+            for path in self.lib_files[lib_dir]
+        ]
+
+
+@lru_cache(maxsize=4)
+def get_template_index(template_dir: str) -> TemplateIndex:
+    return TemplateIndex(template_dir)
+
+
+def _get_dependency_name(dependency: str) -> str:
+    """ "owner/Name@^1.0" → "name"."""
+    return dependency.split("@", 1)[0].rsplit("/", 1)[-1].strip().lower()
+
+
+def get_template_closure(template_dir: str, sources, dependencies=()) -> list:
+    """
+    Template files (relative paths, "/" separated) needed to build `sources`,
+    the transpiled code of a sketch. Bundled libraries named in
+    `dependencies` (lib_deps) are kept too, registry libraries may include
+    them without the sketch doing so.
+    """
+    index = get_template_index(str(template_dir))
+    needed = {path for path in index.files if not index.is_optional(path)}
+
+    dependency_names = {_get_dependency_name(d) for d in dependencies}
+    for lib_dir, files in index.lib_files.items():
+        if lib_dir[len(LIB_DIR) :].lower() in dependency_names:
+            needed.update(files)
+
+    # (code, path of the file it came from, None for the sketch)
+    pending = [(code, None) for code in sources]
+    pending += [
+        (index.read(path), path)
+        for path in sorted(needed)
+        if path.endswith(SOURCE_EXTENSIONS)
+    ]
+    scanned = set(needed)
+
+    while pending:
+        code, including = pending.pop()
+        for quote, header in INCLUDE_PATTERN.findall(code):
+            for path in index.resolve(quote, header, including):
+                needed.add(path)
+                if path in scanned:
+                    continue
+                scanned.add(path)
+                if path.endswith(SOURCE_EXTENSIONS):
+                    pending.append((index.read(path), path))
+
+    return sorted(needed)
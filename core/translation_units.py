@@ -0,0 +1,219 @@
+"""
+Split a transpiled project into separate translation units.
+
+By default the whole sketch is compiled as src/main.ino, and every user
+module as a header under include/. An edit anywhere then recompiles all of
+it. With MOJOSCALE_SPLIT_UNITS=1, the top-level units recorded by the
+transpiler (see get_unit_kind) are laid out as:
+
+    include/main.h           includes, `extern` globals, function prototypes
+                             (template functions are kept whole here)
+    src/main.cpp             global definitions
+    src/main.<function>.cpp  one file per function of main.py
+    include/<module>.h       the same declarations for a user module
+    src/<module>.cpp         its globals and functions
+
+The file names only depend on the Python names, so a unit whose code did not
+change keeps its file (and mtime), and PlatformIO keeps its object. A body
+edit recompiles one .cpp; only a changed signature or global recompiles
+every unit that includes the header.
+
+Everything a header includes ends up in several translation units, so this
+only works for headers that keep to the one-definition rule. The Py*
+runtime does; the core-lib helper headers (include/helpers/...) define
+non-inline functions and globals. Projects that use them, or whose units
+cannot be split safely, keep the single-file layout.
+"""
+
+import os
+import re
+
+from core.logger import get_logger
+from core.transpiler.transpiler import TOPLINE_INCLUDES
+
+log = get_logger("compiler")
+
+SPLIT_UNITS_ENV_VAR = "MOJOSCALE_SPLIT_UNITS"
+
+MAIN_MODULE = "main.py"
+
+# headers of the Py* runtime, safe to include from every unit
+RUNTIME_HEADERS = set(TOPLINE_INCLUDES)
+
+INCLUDE_PATTERN = re.compile(r'^\s*#include\s+([<"])([^>"]+)[>"]', re.M)
+TEMPLATE_PREFIX_PATTERN = re.compile(r"^\s*template\s*<")
+
+
+def is_split_enabled() -> bool:
+    return os.getenv(SPLIT_UNITS_ENV_VAR, "").lower() in ("1", "true", "yes")
+
+
+class SplitError(ValueError):
+    """A unit cannot be moved out of its file safely."""
+
+
+def _split_top_level(text: str, separator: str):
+    """Split on `separator` outside brackets and string/char literals."""
+    parts, depth, quote, start = [], 0, None, 0
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if quote:
+            if c == "\\":
+                i += 1
+            elif c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c in "([{<":
+            depth += 1
+        elif c in ")]}>":
+            depth -= 1
+        elif c == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _find_body_start(code: str) -> int:
+    """Index of the `{` opening a function body, skipping the parameter list."""
+    depth, quote = 0, None
+    for i, c in enumerate(code):
+        if quote:
+            if c == quote and code[i - 1] != "\\":
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "{" and depth == 0:
+            return i
+    raise SplitError("function without a body")
+
+
+def split_function(name: str, code: str):
+    """Return (prototype, definition) of a transpiled function."""
+    code = code.strip()
+    body = _find_body_start(code)
+    signature = code[:body].rstrip()
+
+    match = re.search(r"\b%s\s*\(" % re.escape(name), signature)
+    if match is None or not signature.endswith(")"):
+        raise SplitError(f"unexpected signature for {name}: {signature!r}")
+
+    params = signature[match.end() : -1]
+    definition_signature = signature
+    if "=" in params:
+        # default arguments belong on the prototype only
+        params = [
+            _split_top_level(param, "=")[0].strip()
+            for param in _split_top_level(params, ",")
+        ]
+        definition_signature = signature[: match.end()] + ", ".join(params) + ")"
+
+    return signature + ";", definition_signature + " " + code[body:]
+
+
+def split_global(name: str, code: str):
+    """Return (extern declaration, definition) of a transpiled global."""
+    code = code.strip()
+    if not code.endswith(";") or len(_split_top_level(code[:-1], ";")) != 1:
+        raise SplitError(f"global {name} is not a single declaration")
+
+    match = re.match(r"^(.+?)\s*\b%s\s*(=|\(|\{|;)" % re.escape(name), code)
+    if match is None:
+        raise SplitError(f"unexpected declaration of {name}: {code!r}")
+    cpp_type = match.group(1).strip()
+    if not cpp_type or re.search(r"\b(auto|static|extern)\b", cpp_type):
+        raise SplitError(f"global {name} of type {cpp_type!r} cannot be extern")
+
+    return f"extern {cpp_type} {name};", code
+
+
+def _get_module_name(filename: str) -> str:
+    return filename[:-3] if filename.endswith(".py") else filename
+
+
+def _check_includes(code: str):
+    for quote, header in INCLUDE_PATTERN.findall(code):
+        header = header[:-2] if header.endswith(".h") else header
+        if quote == '"' and header not in RUNTIME_HEADERS:
+            raise SplitError(f"{header}.h is not safe to include from every unit")
+
+
+def split_module(filename: str, units: list) -> dict:
+    """Files (path relative to the build dir → code) for one transpiled module."""
+    module = _get_module_name(filename)
+    header_name = f"{module}.h"
+
+    includes = [f'#include "{name}.h"' for name in TOPLINE_INCLUDES]
+    declarations, definitions, functions = [], [], {}
+
+    for unit in units:
+        kind, name, code = unit["kind"], unit["name"], unit["code"]
+        if kind == "include":
+            _check_includes(code)
+            includes.append(code.strip())
+        elif kind == "global":
+            declaration, definition = split_global(name, code)
+            declarations.append(declaration)
+            definitions.append(definition)
+        elif kind == "function":
+            if name in functions:
+                raise SplitError(f"{name} is defined twice")
+            if TEMPLATE_PREFIX_PATTERN.match(code):
+                # templates are instantiated where they are used
+                declarations.append(code.strip())
+                functions[name] = None
+                continue
+            prototype, definition = split_function(name, code)
+            declarations.append(prototype)
+            functions[name] = definition
+        else:
+            raise SplitError(f"unsupported top-level statement in {filename}")
+
+    header = "\n".join(
+        ["#pragma once", "#include <Arduino.h>"] + includes + [""] + declarations
+    )
+    files = {os.path.join("include", header_name): header + "\n"}
+    preamble = f'#include "{header_name}"\n'
+
+    if filename == MAIN_MODULE:
+        files[os.path.join("src", "main.cpp")] = (
+            preamble + "\n" + "\n".join(definitions) + "\n"
+        )
+        for name, definition in functions.items():
+            if definition is not None:
+                files[os.path.join("src", f"main.{name}.cpp")] = (
+                    preamble + "\n" + definition + "\n"
+                )
+    else:
+        body = definitions + [d for d in functions.values() if d is not None]
+        files[os.path.join("src", f"{module}.cpp")] = (
+            preamble + "\n" + "\n".join(body) + "\n"
+        )
+    return files
+
+
+def split_translation_units(units: dict):
+    """
+    Split every module of a transpile result (its "units"), or return None
+    when the project has to stay in the single-file layout.
+    """
+    if not units or MAIN_MODULE not in units:
+        return None
+
+    files = {}
+    try:
+        for filename, module_units in units.items():
+            files.update(split_module(filename, module_units))
+    except SplitError as e:
+        log.info("📄 Keeping the single-file sketch: %s", e)
+        return None
+
+    log.debug("📄 Split the sketch into %s files", len(files))
+    return files
@@ -1,5 +1,5 @@
 __include_modules__ = {"espressif32": "WiFi", "espressif8266": "ESP8266WiFi"}
-__include_internal_modules__ = "helpers/WiFiHelper"
+__include_internal_modules__ = "helpers/WifiHelper"
 __dependencies__ = ""
 
 
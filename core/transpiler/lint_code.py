@@ -1,7 +1,7 @@
 import ast
 import uuid
 from .transpiler import (
-    DependencyResolver,
+    create_dependency_resolver,
     parse_external_python_file,
     extract_imported_modules_from_tree,
     ArduinoTranspiler,
@@ -19,8 +19,13 @@ import sys
 import builtins
 import inspect
 import json
+from contextlib import nullcontext
 
 from .builtin_types import get_core_func_metadata
+from .profiler import VisitorProfiler, get_profile_path
+from core.logger import get_logger
+
+log = get_logger("lint")
 
 builtin_funcs = [
     name
@@ -118,9 +123,8 @@ def safe_visit(method):
                 f"Try simplifying or rewriting this line."
             )
             self.errors.append({"line": lineno, "column": col, "message": msg})
-            # Print traceback for your own debugging
-            print("⚠️ [LINTER CRASH TRACEBACK]")
-            traceback.print_exc()
+            # Log traceback for your own debugging
+            log.exception("⚠️ [LINTER CRASH TRACEBACK]")
             return None
 
     return wrapper
@@ -264,16 +268,16 @@ class LintCode(ast.NodeVisitor):
             init_path = os.path.join(self.path_to_core_libs, *parts, "__init__.py")
 
             if os.path.isfile(file_path):
-                print(f"[DEBUG] Found file module at {file_path}")
+                log.debug("Found file module at %s", file_path)
                 return True
             if os.path.isfile(init_path):
-                print(f"[DEBUG] Found package module at {init_path}")
+                log.debug("Found package module at %s", init_path)
                 return True
 
-            print(f"[DEBUG] Module '{import_name}' not found in core libs")
+            log.debug("Module '%s' not found in core libs", import_name)
             return False
         except Exception as e:
-            print(f"[ERROR] is_core_module('{import_name}') exception: {e}")
+            log.error("is_core_module('%s') exception: %s", import_name, e)
             return False
 
     def visit_Subscript(self, node):
@@ -426,11 +430,11 @@ class LintCode(ast.NodeVisitor):
             import_alias = alias.asname  # e.g., "sx"
             parts = import_name.split(".")  # ["sensors", "x"]
 
-            print(f"[LINT] Processing import: '{import_name}'")
+            log.debug("[LINT] Processing import: '%s'", import_name)
 
             # Rule 2: Must be aliased
             if import_alias is None:
-                print(f"[ERROR] Missing alias for import: '{import_name}'")
+                log.debug("Missing alias for import: '%s'", import_name)
                 self.add_error(
                     node,
                     f"Import '{import_name}' must use 'as' alias (e.g., 'import {import_name} as x')",
@@ -438,15 +442,15 @@ class LintCode(ast.NodeVisitor):
 
             # Rule 3: The full module path must exist in custom core_libs
             if not self.is_core_module(import_name):
-                print(
-                    f"[ERROR] '{import_name}' is not found in allowed modules under core_libs"
+                log.debug(
+                    "'%s' is not found in allowed modules under core_libs", import_name
                 )
                 self.add_error(
                     node,
                     f"Import '{import_name}' is not in the list of allowed modules",
                 )
             else:
-                print(f"[LINT] Import '{import_name}' passed validation")
+                log.debug("[LINT] Import '%s' passed validation", import_name)
                 self.dependency_resolver.insert_imported_module(
                     self.module_name, import_name, import_alias
                 )
@@ -580,7 +584,7 @@ class LintCode(ast.NodeVisitor):
         else:
             # Assume user-defined or imported type
             # No validation errors — acceptable as "custom type"
-            print(f"hoo hoo haa haa got type {annotation_type}")
+            log.debug("hoo hoo haa haa got type %s", annotation_type)
 
             is_class_valid = self.dependency_resolver.is_module_class(annotation_type)
 
@@ -670,8 +674,11 @@ class LintCode(ast.NodeVisitor):
 
         # finally save the arg types
         for arg in saved_args:
-            print(
-                f'saving arg {arg["name"]} of type {arg["arg_type"]} for scope {self.scope}'
+            log.debug(
+                "saving arg %s of type %s for scope %s",
+                arg["name"],
+                arg["arg_type"],
+                self.scope,
             )
             self.dependency_resolver.insert_variable(
                 arg["name"],
@@ -819,7 +826,7 @@ class LintCode(ast.NodeVisitor):
             self.loop_variables[loop_var] = "int"
         elif loop_type == "list":
             element_type = loop_var_type.split(",")[1]
-            print(f"saving loop var {loop_var.id} for {iterable}")
+            log.debug("saving loop var %s for %s", loop_var.id, iterable)
             self.loop_variables[loop_var.id] = element_type
         elif loop_type == "dict_items":
             # Extract key and value variables from the loop target
@@ -1141,11 +1148,11 @@ class LintCode(ast.NodeVisitor):
             self.add_error(node, error)
 
     def _check_args_for_callables(self, node, args):
-        print(f"[CAFC] checking args")
+        log.debug("[CAFC] checking args")
         for arg in args:
-            print(f"[CAFC] checking for arg `{arg}`")
+            log.debug("[CAFC] checking for arg `%s`", arg)
             function_metadata = self.dependency_resolver.get_method_metadata(arg)
-            print(f"[CAFC] found function metadata {function_metadata}")
+            log.debug("[CAFC] found function metadata %s", function_metadata)
 
             if function_metadata:
                 self.add_error(
@@ -1198,7 +1205,7 @@ class LintCode(ast.NodeVisitor):
 
             self.visit(kw_value)
 
-        print(f"call of node type {func}")
+        log.debug("call of node type %s", func)
 
         if isinstance(func, ast.Attribute):
             # either an imported module or
@@ -1211,7 +1218,7 @@ class LintCode(ast.NodeVisitor):
                     self.module_name, base_name
                 )
 
-                print(f"found module {module_name} for base name {base_name}")
+                log.debug("found module %s for base name %s", module_name, base_name)
 
                 if module_name:
                     # check if the method is actually a class and this call is
@@ -1221,8 +1228,11 @@ class LintCode(ast.NodeVisitor):
                         method_name, module_name=module_name
                     )
 
-                    print(
-                        f"method {method_name} is class {is_method_class} and is in module {module_name}"
+                    log.debug(
+                        "method %s is class %s and is in module %s",
+                        method_name,
+                        is_method_class,
+                        module_name,
                     )
 
                     if is_method_class:
@@ -1263,7 +1273,7 @@ class LintCode(ast.NodeVisitor):
 
                 else:
                     # its a variable
-                    print(f"{base_name} is a variable.")
+                    log.debug("%s is a variable.", base_name)
                     if self.scope == "global":
                         self.add_error(
                             node,
@@ -1273,8 +1283,11 @@ class LintCode(ast.NodeVisitor):
                         base_name, self.scope
                     )
 
-                    print(
-                        f"found {base_name} as type {variable_type} for scope {self.scope}."
+                    log.debug(
+                        "found %s as type %s for scope %s.",
+                        base_name,
+                        variable_type,
+                        self.scope,
                     )
 
                     if is_core_python_type(variable_type):
@@ -1301,8 +1314,11 @@ class LintCode(ast.NodeVisitor):
                             )
                         )
 
-                        print(
-                            f"{base_name} has module of {variable_module_name} and variable_type {variable_type}"
+                        log.debug(
+                            "%s has module of %s and variable_type %s",
+                            base_name,
+                            variable_module_name,
+                            variable_type,
                         )
                         method_metadata = self.dependency_resolver.get_method_metadata(
                             method_name, module_name=None, class_name=variable_type
@@ -1340,8 +1356,10 @@ class LintCode(ast.NodeVisitor):
 
                 self._check_args_for_callables(node, arg_names)
 
-                print(
-                    f"[CORETYPE]: checking for {method_name}, {builtin_func_metadata}"
+                log.debug(
+                    "[CORETYPE]: checking for %s, %s",
+                    method_name,
+                    builtin_func_metadata,
                 )
 
                 is_allowed = builtin_func_metadata["is_allowed"]
@@ -1366,13 +1384,13 @@ class LintCode(ast.NodeVisitor):
                     )
 
     def visit_JoinedStr(self, node):
-        print(f"⚡ NodeTransformer/Visitor visit_JoinedStr called!")
+        log.debug("⚡ NodeTransformer/Visitor visit_JoinedStr called!")
         for value in node.values:
             self.visit(value)
         return node
 
     def visit_FormattedValue(self, node):
-        print(f"🔍 NodeTransformer/Visitor visit_FormattedValue called!")
+        log.debug("🔍 NodeTransformer/Visitor visit_FormattedValue called!")
         self.visit(node.value)
         return node
 
@@ -1483,7 +1501,15 @@ for name, func in list(LintCode.__dict__.items()):
         setattr(LintCode, name, safe_visit(func))
 
 
-def main(code, sql_conn, platform, path_to_core_libs, module_name="main"):
+def main(
+    code,
+    sql_conn,
+    platform,
+    path_to_core_libs,
+    module_name="main",
+    resolver_backend=None,
+    profile_path=None,
+):
     try:
         tree = ast.parse(code)
 
@@ -1509,8 +1535,12 @@ def main(code, sql_conn, platform, path_to_core_libs, module_name="main"):
     session_id = str(uuid.uuid4()).replace("-", "_")
     monitor_speed = 115200
 
-    dependency_resolver = DependencyResolver(
-        session_id, sql_conn, platform, imported_modules=extracted_modules
+    dependency_resolver = create_dependency_resolver(
+        session_id,
+        sql_conn,
+        platform,
+        imported_modules=extracted_modules,
+        backend=resolver_backend,
     )
 
     linter = LintCode(
@@ -1521,4 +1551,18 @@ def main(code, sql_conn, platform, path_to_core_libs, module_name="main"):
         module_name,
     )
 
-    return linter.lint(code)
+    profile_path = get_profile_path(profile_path)
+    profiler = None
+    if profile_path:
+        profiler = VisitorProfiler()
+        profiler.attach(linter)
+
+    try:
+        with profiler.profile(module_name) if profiler else nullcontext():
+            return linter.lint(code)
+    finally:
+        dependency_resolver.close()
+        log.debug("Type cache: %s", linter.type_analyzer.get_type_cache_stats())
+        if profiler is not None:
+            profiler.write(profile_path)
+            log.info("⏱️ Lint profile written to %s", profile_path)
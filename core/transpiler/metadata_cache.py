@@ -0,0 +1,127 @@
+"""
+Persistent cache of the metadata DependencyResolver extracts from core libs.
+
+Every transpile and lint session needs the methods, args, translations,
+dunders and variables of each imported core module. Extracting them means
+reading, parsing and walking the module source, so the result is stored as
+a small JSON artifact under the app dir, keyed by the module's content hash
+and the target platform (platform-specific dunders are resolved at build
+time). Artifacts are also kept in memory for the lifetime of the process.
+
+Bump METADATA_CACHE_VERSION whenever the extraction logic in
+DependencyResolver changes, so stale artifacts are rebuilt.
+"""
+
+import os
+import json
+import glob
+import hashlib
+
+from core.utils import get_app_dir
+from core.logger import get_logger
+
+log = get_logger("transpiler")
+
+METADATA_CACHE_VERSION = 1
+
+CACHE_DIR_NAME = os.path.join("cache", "core_metadata")
+
+# (module_name, platform, source_hash) -> metadata
+_loaded_metadata = {}
+
+# file path -> ((mtime_ns, size), source_hash)
+_source_hashes = {}
+
+
+def get_metadata_cache_dir():
+    return os.path.join(get_app_dir(), CACHE_DIR_NAME)
+
+
+def get_source_hash(filepath):
+    """Return the sha256 of a file, re-reading it only when its stat changes."""
+    stat = os.stat(filepath)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _source_hashes.get(filepath)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    with open(filepath, "rb") as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()
+
+    _source_hashes[filepath] = (signature, source_hash)
+    return source_hash
+
+
+def _get_artifact_prefix(module_name, platform):
+    return f"{module_name}-{platform}-"
+
+
+def _get_artifact_path(module_name, platform, source_hash):
+    file_name = _get_artifact_prefix(module_name, platform) + f"{source_hash}.json"
+    return os.path.join(get_metadata_cache_dir(), file_name)
+
+
+def load_module_metadata(module_name, platform, source_hash):
+    """
+    Return cached metadata for a core module, or None on a cache miss.
+
+    Metadata is a dict with "module", "methods" and "variables" keys holding
+    the rows DependencyResolver inserts for the module.
+    """
+    key = (module_name, platform, source_hash)
+    if key in _loaded_metadata:
+        return _loaded_metadata[key]
+
+    artifact_path = _get_artifact_path(module_name, platform, source_hash)
+    if not os.path.exists(artifact_path):
+        return None
+
+    try:
+        with open(artifact_path, "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning(
+            "⚠️ Ignoring unreadable metadata artifact %s: %s", artifact_path, e
+        )
+        return None
+
+    if artifact.get("version") != METADATA_CACHE_VERSION:
+        return None
+
+    metadata = artifact["metadata"]
+    _loaded_metadata[key] = metadata
+    return metadata
+
+
+def save_module_metadata(module_name, platform, source_hash, metadata):
+    """Store metadata for a core module and drop artifacts of older sources."""
+    _loaded_metadata[(module_name, platform, source_hash)] = metadata
+
+    cache_dir = get_metadata_cache_dir()
+    artifact_path = _get_artifact_path(module_name, platform, source_hash)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+
+        prefix = _get_artifact_prefix(module_name, platform)
+        for stale_path in glob.glob(os.path.join(cache_dir, glob.escape(prefix) + "*")):
+            if stale_path != artifact_path:
+                os.remove(stale_path)
+
+        artifact = {
+            "version": METADATA_CACHE_VERSION,
+            "module_name": module_name,
+            "platform": platform,
+            "source_hash": source_hash,
+            "metadata": metadata,
+        }
+
+        # write to a temp file first so concurrent sessions never read half a file
+        tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(artifact, f)
+        os.replace(tmp_path, artifact_path)
+
+    except OSError as e:
+        log.warning("⚠️ Could not write metadata artifact %s: %s", artifact_path, e)
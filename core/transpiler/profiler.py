@@ -0,0 +1,181 @@
+"""
+Opt-in profiler for the transpiler and linter visitors.
+
+When enabled, VisitorProfiler wraps the `visit` method of an ArduinoTranspiler
+or LintCode instance, its TypeAnalyzer.get_node_type, and the lookup methods
+of the DependencyResolver. It records per frame:
+
+    calls     number of calls
+    cum       wall time including children (recursive calls counted once)
+    self      wall time excluding children
+    queries   resolver calls made directly from that frame
+
+Frames are named after the node type, e.g. "visit_Call",
+"get_node_type[Attribute]" and "resolver.get_method_metadata".
+
+`write` produces a collapsed-stack file ("a;b;c <microseconds>" per line)
+that flamegraph.pl, speedscope and inferno read directly, plus a JSON
+summary next to it. Nothing is wrapped when profiling is off, so the
+disabled path costs nothing.
+
+Enable it by setting MOJOSCALE_PROFILE to an output path, or by passing
+`profile_path` to transpiler.main / lint_code.main.
+"""
+
+import os
+import json
+import time
+
+PROFILE_ENV_VAR = "MOJOSCALE_PROFILE"
+
+# resolver methods that are bookkeeping rather than lookups
+_RESOLVER_SKIP_METHODS = {"close", "commit", "delete_all_tables"}
+
+RESOLVER_FRAME_PREFIX = "resolver."
+
+
+def get_profile_path(profile_path=None):
+    """Return the requested profile output path, or None when profiling is off."""
+    return profile_path or os.getenv(PROFILE_ENV_VAR) or None
+
+
+class VisitorProfiler:
+    def __init__(self):
+        self.stats = {}
+        self.stacks = {}
+        # each frame: [label, start, child_time]
+        self._stack = []
+        self._active = {}
+
+    def enter(self, label):
+        self._stack.append([label, time.perf_counter(), 0.0])
+        self._active[label] = self._active.get(label, 0) + 1
+
+    def exit(self):
+        label, start, child_time = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self_time = elapsed - child_time
+
+        self._active[label] -= 1
+        stat = self._get_stat(label)
+        stat["calls"] += 1
+        stat["self"] += self_time
+        if not self._active[label]:
+            # only the outermost call of a recursive frame counts towards cum
+            stat["cum"] += elapsed
+
+        path = tuple(frame[0] for frame in self._stack) + (label,)
+        self.stacks[path] = self.stacks.get(path, 0.0) + self_time
+
+        if self._stack:
+            self._stack[-1][2] += elapsed
+            if label.startswith(RESOLVER_FRAME_PREFIX):
+                self._count_query()
+
+    def _get_stat(self, label):
+        stat = self.stats.get(label)
+        if stat is None:
+            stat = self.stats[label] = {
+                "calls": 0,
+                "cum": 0.0,
+                "self": 0.0,
+                "queries": 0,
+            }
+        return stat
+
+    def _count_query(self):
+        # attribute the lookup to the nearest visitor / type analyzer frame
+        for frame in reversed(self._stack):
+            if not frame[0].startswith(RESOLVER_FRAME_PREFIX):
+                self._get_stat(frame[0])["queries"] += 1
+                return
+
+    def _wrap(self, func, get_label):
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            profiler.enter(get_label(*args, **kwargs))
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.exit()
+
+        return wrapper
+
+    def attach(self, visitor):
+        """Profile a visitor instance (ArduinoTranspiler or LintCode)."""
+        visitor.visit = self._wrap(
+            visitor.visit, lambda node, *a, **kw: "visit_" + type(node).__name__
+        )
+
+        type_analyzer = getattr(visitor, "type_analyzer", None)
+        if type_analyzer is not None:
+            type_analyzer.get_node_type = self._wrap(
+                type_analyzer.get_node_type,
+                lambda node, *a, **kw: f"get_node_type[{type(node).__name__}]",
+            )
+
+        self.attach_resolver(visitor.dependency_resolver)
+
+    def attach_resolver(self, resolver):
+        """Count and time the public lookup methods of a DependencyResolver."""
+        if getattr(resolver, "_profiler", None) is self:
+            return
+        resolver._profiler = self
+
+        for name in dir(type(resolver)):
+            if name.startswith("_") or name in _RESOLVER_SKIP_METHODS:
+                continue
+            method = getattr(resolver, name)
+            if not callable(method):
+                continue
+            label = RESOLVER_FRAME_PREFIX + name
+            setattr(resolver, name, self._wrap(method, lambda *a, _l=label, **kw: _l))
+
+    def profile(self, label):
+        """Context manager for a root frame, e.g. one module being transpiled."""
+        return _ProfileFrame(self, label)
+
+    def get_summary(self):
+        """Return per-frame stats sorted by self time, times in milliseconds."""
+        rows = []
+        for label, stat in self.stats.items():
+            rows.append(
+                {
+                    "frame": label,
+                    "calls": stat["calls"],
+                    "cum_ms": round(stat["cum"] * 1000, 3),
+                    "self_ms": round(stat["self"] * 1000, 3),
+                    "queries": stat["queries"],
+                }
+            )
+        rows.sort(key=lambda row: row["self_ms"], reverse=True)
+        return rows
+
+    def write(self, path):
+        """Write collapsed stacks to `path` and the summary to `path`.json."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, seconds in sorted(self.stacks.items()):
+                micros = int(round(seconds * 1_000_000))
+                if micros:
+                    f.write(f"{';'.join(stack)} {micros}\n")
+
+        with open(f"{path}.json", "w", encoding="utf-8") as f:
+            json.dump(self.get_summary(), f, indent=2)
+
+
+class _ProfileFrame:
+    def __init__(self, profiler, label):
+        self.profiler = profiler
+        self.label = label
+
+    def __enter__(self):
+        self.profiler.enter(self.label)
+        return self.profiler
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.exit()
+        return False
@@ -0,0 +1,149 @@
+"""
+Persistent cache of whole transpile results.
+
+compile_project stores the `{code, dependencies}` dict returned by
+transpiler.main under the app dir, keyed by the input files, platform,
+monitor speed and a digest of everything the output depends on besides
+the sketch: core_libs, the runtime headers and the transpiler sources.
+Hitting Compile or Upload again with unchanged code skips the transpile
+phase entirely. Results that evaluated env vars at transpile time
+(`uses_eval`) are never stored, since the key does not cover `.env`.
+
+Entries are evicted least recently used first once the cache grows past
+MAX_CACHE_BYTES; a hit refreshes the entry's mtime.
+"""
+
+import os
+import json
+import hashlib
+
+from core.utils import get_app_dir
+from core.logger import get_logger
+from .metadata_cache import get_source_hash
+
+log = get_logger("transpiler")
+
+RESULT_CACHE_VERSION = 1
+
+CACHE_DIR_NAME = os.path.join("cache", "transpile_results")
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+TRANSPILER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# trees the transpiled output depends on, besides the sketch itself
+DIGEST_PATHS = (
+    os.path.join(TRANSPILER_DIR, "core_libs"),
+    os.path.join(TRANSPILER_DIR, "runtime"),
+)
+
+
+def get_result_cache_dir():
+    return os.path.join(get_app_dir(), CACHE_DIR_NAME)
+
+
+def _iter_digest_files():
+    # the transpiler sources themselves
+    for filename in sorted(os.listdir(TRANSPILER_DIR)):
+        if filename.endswith(".py"):
+            yield os.path.join(TRANSPILER_DIR, filename)
+
+    for root in DIGEST_PATHS:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            for filename in sorted(filenames):
+                yield os.path.join(dirpath, filename)
+
+
+def get_core_digest():
+    """Digest of core_libs, runtime headers and transpiler sources."""
+    digest = hashlib.sha256()
+    for path in _iter_digest_files():
+        digest.update(os.path.relpath(path, TRANSPILER_DIR).encode("utf-8"))
+        digest.update(get_source_hash(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def get_result_key(py_files, platform, monitor_speed):
+    """Content-addressed key of a transpile request."""
+    payload = json.dumps(
+        {
+            "version": RESULT_CACHE_VERSION,
+            "files": sorted(py_files.items()),
+            "platform": platform,
+            "monitor_speed": monitor_speed,
+            "core": get_core_digest(),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _get_entry_path(key):
+    return os.path.join(get_result_cache_dir(), f"{key}.json")
+
+
+def load_transpile_result(key):
+    """Return the cached transpile result for `key`, or None on a miss."""
+    entry_path = _get_entry_path(key)
+    try:
+        with open(entry_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning(
+            "⚠️ Ignoring unreadable transpile cache entry %s: %s", entry_path, e
+        )
+        return None
+
+    try:
+        # mark as recently used
+        os.utime(entry_path)
+    except OSError:
+        pass
+
+    return result
+
+
+def save_transpile_result(key, result, max_bytes=MAX_CACHE_BYTES):
+    """Store a transpile result and evict old entries beyond `max_bytes`."""
+    cache_dir = get_result_cache_dir()
+    entry_path = _get_entry_path(key)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, entry_path)
+
+        prune_result_cache(max_bytes)
+    except OSError as e:
+        log.warning("⚠️ Could not write transpile cache entry %s: %s", entry_path, e)
+
+
+def prune_result_cache(max_bytes=MAX_CACHE_BYTES):
+    """Delete least recently used entries until the cache fits in `max_bytes`."""
+    cache_dir = get_result_cache_dir()
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    total = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.name.endswith(".json"):
+            continue
+        stat = entry.stat()
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+
+    entries.sort()
+    while total > max_bytes and entries:
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
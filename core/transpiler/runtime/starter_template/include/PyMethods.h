@@ -1,3 +1,5 @@
+#ifndef PYMETHODS_H
+#define PYMETHODS_H
 
 #include "PyInt.h"
 #include "PyFloat.h"
@@ -231,7 +233,7 @@ inline String py_chr(int codepoint) {
 /////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 
 
-PyList<int> py_divmod(int a, int b) {
+inline PyList<int> py_divmod(int a, int b) {
     PyList<int> result;
     if (b == 0) {
         Serial.println("ZeroDivisionError: division or modulo by zero");
@@ -427,7 +429,7 @@ inline float py_pow(float base, float exp) {
 
 /////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 // ========== py_print ==========
-void py_print() {
+inline void py_print() {
     Serial.println();
 }
 
@@ -581,7 +583,7 @@ inline T py_sum(const PyList<T>& list) {
 
 //non python helper method to concat strings.
 
-String concat_all(std::initializer_list<String> parts) {
+inline String concat_all(std::initializer_list<String> parts) {
     String out = "";
     for (const auto& s : parts) {
         out += String(s);  // ✅ double-wrapped: ensures conversion
@@ -591,4 +593,6 @@ String concat_all(std::initializer_list<String> parts) {
 
 
 
-///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
\ No newline at end of file
+///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+#endif
@@ -0,0 +1,22 @@
+#ifndef PYRUNTIME_H
+#define PYRUNTIME_H
+
+// The whole Py* runtime in one header. Every sketch source is compiled with
+// `-include PyRuntime.h`, so it can be precompiled once per board, toolchain
+// and flags (see scripts/pch.py).
+
+#ifdef __cplusplus
+#include <Arduino.h>
+#include "PyList.h"
+#include "PyString.h"
+#include "PyDict.h"
+#include "PyDictFromJsonSpecializations.h"
+#include "PyRange.h"
+#include "PyInt.h"
+#include "PyFloat.h"
+#include "PyMethods.h"
+#include "PyBool.h"
+#include "PyDictItems.h"
+#endif
+
+#endif
@@ -0,0 +1,116 @@
+"""
+PlatformIO post: script that precompiles include/PyRuntime.h.
+
+platformio.ini compiles every sketch source with `-include PyRuntime.h`
+(build_src_flags) and points `custom_pch_dir` at a directory shared by the
+projects of one board. The header is precompiled there with exactly the
+flags the sketch sources use, under a key made of the compiler, those flags
+and the runtime headers, and that directory goes first on the include path.
+GCC then loads PyRuntime.h.gch instead of parsing the runtime again for
+every source file.
+
+GCC silently ignores a precompiled header that does not match the flags of
+a compile and reads PyRuntime.h instead, so a stale or failed PCH only
+costs the speed-up, never the build.
+"""
+
+import hashlib
+import os
+import shutil
+
+Import("env", "projenv")  # noqa: F821 (SCons builtin)
+
+PCH_HEADER = "PyRuntime.h"
+
+
+def _is_pch_include(flag):
+    return (
+        isinstance(flag, (list, tuple))
+        and len(flag) == 2
+        and flag[0] == "-include"
+        and str(flag[1]).endswith(PCH_HEADER)
+    )
+
+
+def _strip_pch_include(flags):
+    """Drop `-include PyRuntime.h` from a flag list."""
+    stripped = []
+    skip_next = False
+    for flag in flags:
+        if skip_next:
+            skip_next = False
+            continue
+        if _is_pch_include(flag):
+            continue
+        if flag == "-include":
+            skip_next = True
+            continue
+        stripped.append(flag)
+    return stripped
+
+
+def _get_runtime_digest(include_dir):
+    digest = hashlib.sha256()
+    for filename in sorted(os.listdir(include_dir)):
+        if filename.startswith("Py") and filename.endswith(".h"):
+            digest.update(filename.encode("utf-8"))
+            with open(os.path.join(include_dir, filename), "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def build_pch():
+    # uploads of an already built firmware compile nothing
+    if set(COMMAND_LINE_TARGETS) & {"nobuild", "clean", "cleanall"}:  # noqa: F821
+        return
+
+    pch_root = env.GetProjectOption("custom_pch_dir", "")
+    include_dir = env.subst("$PROJECT_INCLUDE_DIR")
+    header = os.path.join(include_dir, PCH_HEADER)
+    if not pch_root or not os.path.isfile(header):
+        return
+
+    # the flags sketch sources are compiled with, minus the -include itself
+    pch_env = projenv.Clone()
+    for name in ("CCFLAGS", "CXXFLAGS"):
+        pch_env.Replace(**{name: _strip_pch_include(pch_env.get(name, []))})
+    flags = pch_env.subst("$CXXFLAGS $CCFLAGS $_CCCOMCOM")
+    compiler = pch_env.subst("$CXX")
+
+    # project paths differ between projects, the PCH does not depend on them
+    key_flags = flags.replace(env.subst("$PROJECT_DIR"), "<project>")
+    key = hashlib.sha256(
+        "\0".join([compiler, key_flags, _get_runtime_digest(include_dir)]).encode(
+            "utf-8"
+        )
+    ).hexdigest()[:16]
+
+    pch_dir = os.path.join(pch_root, key)
+    gch_path = os.path.join(pch_dir, PCH_HEADER + ".gch")
+
+    if not os.path.isfile(gch_path):
+        os.makedirs(pch_dir, exist_ok=True)
+        shutil.copy2(header, os.path.join(pch_dir, PCH_HEADER))
+        tmp_path = "%s.%s.tmp" % (gch_path, os.getpid())
+        status = pch_env.Execute(
+            pch_env.VerboseAction(
+                '"%s" -x c++-header %s -c "%s" -o "%s"'
+                % (compiler, flags, header, tmp_path),
+                "Precompiling %s" % PCH_HEADER,
+            )
+        )
+        if status or not os.path.isfile(tmp_path):
+            print("Warning: could not precompile %s, using it as is" % PCH_HEADER)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        # other builds for this board may be reading the same key
+        os.replace(tmp_path, gch_path)
+    else:
+        print("Using precompiled %s (%s)" % (PCH_HEADER, key))
+
+    # searched before include/, so `-include PyRuntime.h` finds the .gch first
+    projenv.Prepend(CPPPATH=[pch_dir])
+
+
+build_pch()
@@ -3,12 +3,23 @@ import uuid
 import sqlite3
 import inspect
 import json
+import hashlib
 from typing import get_args, get_origin
 from pathlib import Path
 
 import builtins
 import types
 import os
+import logging
+from contextlib import nullcontext
+
+from .metadata_cache import (
+    get_source_hash,
+    load_module_metadata,
+    save_module_metadata,
+)
+from .profiler import VisitorProfiler, get_profile_path
+from .unit_cache import TRANSPILE_UNIT_CACHE
 
 
 # move this to arg later
@@ -19,6 +30,13 @@ from dotenv import load_dotenv
 
 load_dotenv(ENV_PATH)
 
+# loggers are created after the .env is loaded so MOJOSCALE_LOG* settings apply
+from core.logger import get_logger
+
+log = get_logger("transpiler")
+resolver_log = get_logger("resolver")
+type_log = get_logger("types")
+
 
 LIST_ALLOWED_TYPES = [str, int, bool, float]
 BUILTIN_TYPES = ["int", "str", "float", "bool", "list", "dict", "range"]
@@ -39,6 +57,27 @@ TOPLINE_INCLUDES = [
 ]
 
 
+def get_unit_kind(stmt):
+    """
+    Kind and name of a top-level statement, for splitting a translation:
+    "include" for imports, "global" for an assignment to one name,
+    "function" for a def, "other" for anything else.
+    """
+    if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+        return "include", None
+    if isinstance(stmt, ast.FunctionDef):
+        return "function", stmt.name
+    if isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name):
+        return "global", stmt.target.id
+    if (
+        isinstance(stmt, ast.Assign)
+        and len(stmt.targets) == 1
+        and isinstance(stmt.targets[0], ast.Name)
+    ):
+        return "global", stmt.targets[0].id
+    return "other", None
+
+
 def ast_to_json_safe(node):
     if isinstance(node, ast.Constant):
         return {"__kind__": "constant", "value": node.value}
@@ -86,7 +125,7 @@ def is_core_python_type(type_string):
 def get_builtin_function_return_type(method_name: str, args: list):
     if method_name == "abs":
         arg_type1 = args[0]
-        print(f"abs called on arg type {arg_type1}")
+        type_log.debug("abs called on arg type %s", arg_type1)
 
         return arg_type1
 
@@ -219,7 +258,7 @@ def get_cpp_python_type(
 
 
 def get_python_builtin_class_method_type(class_name, method_name):
-    print(f"trying to find method {method_name} for type {class_name}")
+    type_log.debug("trying to find method %s for type %s", method_name, class_name)
     class_name_split = class_name.split(",")
     core_class = class_name_split[0]
 
@@ -243,15 +282,15 @@ def get_python_builtin_class_method_type(class_name, method_name):
             return "int"
 
     elif core_class == "dict":
-        print(f"analyzing dict, for method name {method_name}")
+        type_log.debug("analyzing dict, for method name %s", method_name)
         key_type = class_name_split[1] if len(class_name_split) > 1 else "any"
         value_type = class_name_split[2] if len(class_name_split) > 2 else "any"
-        print(f"dict looks like {key_type}:{value_type}")
+        type_log.debug("dict looks like %s:%s", key_type, value_type)
 
         if method_name == "keys":
             return f"list,{key_type}"
         elif method_name == "values":
-            print(f"returning type {value_type}")
+            type_log.debug("returning type %s", value_type)
             return f"list,{value_type}"
         elif method_name == "items":
             return f"dict_items,{key_type},{value_type}"
@@ -412,7 +451,8 @@ def get_python_builtin_class_method_type(class_name, method_name):
 
 
 def extract_annotation_type(node):
-    print(f"got node {ast.dump(node)}")
+    if type_log.isEnabledFor(logging.DEBUG):
+        type_log.debug("got node %s", ast.dump(node))
 
     if isinstance(node, ast.Name):
         return node.id
@@ -575,13 +615,63 @@ class DependencyResolver:
         self.conn = sql_conn
         self.platform = platform
         self.cursor = sql_conn.cursor()
+        self._table_columns = {}
+        self._init_change_tracking()
+        # session tables live in the connection's TEMP schema, in memory, so they
+        # never touch core_db.db and vanish with the connection at the latest.
+        self.cursor.execute("PRAGMA temp_store = MEMORY")
         self.delete_all_tables()  # delete values from previous transpilation because they can cause issues.
         self._create_tables()
         self._save_modules()
 
+    def _init_change_tracking(self):
+        # bumped on every insert, lets callers cache lookups between changes;
+        # methods_version only moves for methods/imports, and each variable
+        # name remembers the version it was last bound at
+        self.version = 0
+        self.methods_version = 0
+        self.variable_versions = {}
+
+        # running digest of the session state: the core modules it starts
+        # from, then every insert made on top of them
+        self.effects_digest = hashlib.sha256(
+            json.dumps(
+                [
+                    self.platform,
+                    [
+                        (m["name"], m["alias"], m.get("source_hash"))
+                        for m in self.imported_modules
+                    ],
+                ]
+            ).encode("utf-8")
+        ).hexdigest()
+
+        # set to a list to record inserts so they can be replayed later
+        self.effect_log = None
+
+    def _record_effect(self, method_name, kwargs):
+        """Note an insert made through `method_name`, called with `kwargs`."""
+        self.version += 1
+
+        effect = json.dumps([method_name, kwargs], sort_keys=True, default=str)
+        self.effects_digest = hashlib.sha256(
+            (self.effects_digest + effect).encode("utf-8")
+        ).hexdigest()
+
+        if self.effect_log is not None:
+            self.effect_log.append((method_name, kwargs))
+
+    def close(self):
+        """Drop this session's tables. Call once the session is finished."""
+        self.delete_all_tables()
+
+    def commit(self):
+        """Commit pending inserts. Inserts are visible to lookups before this."""
+        self.conn.commit()
+
     def _create_tables(self):
         query1 = f"""
-        CREATE TABLE IF NOT EXISTS {self.current_id}_methods(
+        CREATE TEMP TABLE IF NOT EXISTS {self.current_id}_methods(
             module_name TEXT,
             class_name TEXT,
             method_name TEXT,
@@ -599,7 +689,7 @@ class DependencyResolver:
         """
 
         query2 = f"""
-        CREATE TABLE IF NOT EXISTS {self.current_id}_variables(
+        CREATE TEMP TABLE IF NOT EXISTS {self.current_id}_variables(
             variable_name TEXT,
             variable_type TEXT,
             module_name TEXT,
@@ -609,7 +699,7 @@ class DependencyResolver:
         """
 
         query3 = f"""
-        CREATE TABLE IF NOT EXISTS {self.current_id}_modules(
+        CREATE TEMP TABLE IF NOT EXISTS {self.current_id}_modules(
             module_name TEXT,
             module_type TEXT, 
             translated_name TEXT,
@@ -621,7 +711,7 @@ class DependencyResolver:
         """
 
         query4 = f"""
-        CREATE TABLE IF NOT EXISTS {self.current_id}_imported_modules(
+        CREATE TEMP TABLE IF NOT EXISTS {self.current_id}_imported_modules(
 
             main_module TEXT, 
             imported_module TEXT, 
@@ -637,7 +727,7 @@ class DependencyResolver:
         self.cursor.execute(query4)
 
         self.conn.commit()
-        print("created tables")
+        resolver_log.debug("created tables")
 
     def delete_all_tables(self):
         tables_to_delete = [
@@ -649,13 +739,13 @@ class DependencyResolver:
 
         for table in tables_to_delete:
             try:
-                print(f"[DEBUG] Dropping table: {table}")
+                resolver_log.debug("Dropping table: %s", table)
                 self.cursor.execute(f"DROP TABLE IF EXISTS {table}")
             except Exception as e:
-                print(f"[ERROR] Failed to drop table {table}: {e}")
+                resolver_log.error("Failed to drop table %s: %s", table, e)
 
         self.conn.commit()
-        print(f"[DEBUG] All tables for {self.current_id} deleted.")
+        resolver_log.debug("All tables for %s deleted.", self.current_id)
 
     def variable_exists(self, variable_name: str) -> bool:
         """
@@ -714,28 +804,23 @@ class DependencyResolver:
             result = self.cursor.fetchone()
 
             if result is None:
-                print(f"Warning: Module '{module_name}' not found in database")
+                resolver_log.warning("Module '%s' not found in database", module_name)
                 return ""
 
             available_platforms = result[0] if result[0] else ""
             return available_platforms
 
         except Exception as e:
-            print(
-                f"Error retrieving available_platforms for module '{module_name}': {str(e)}"
+            resolver_log.error(
+                "Error retrieving available_platforms for module '%s': %s",
+                module_name,
+                e,
             )
             raise
 
     def get_method_metadata(self, method_name, module_name=None, class_name=None):
         methods_table = f"{self.current_id}_methods"
 
-        # Deep dive prints - show all inputs clearly
-        print(f"🔍 [get_method_metadata] START")
-        print(
-            f"   📋 Inputs: method_name='{method_name}', module_name='{module_name}', class_name='{class_name}'"
-        )
-        print(f"   🗃️  Table: {methods_table}")
-
         if module_name:
             if class_name:
                 query = f"""
@@ -743,22 +828,14 @@ class DependencyResolver:
                 FROM {methods_table}
                 WHERE method_name = ? AND module_name = ? AND class_name = ?
                 """
-                self.cursor.execute(query, (method_name, module_name, class_name))
-                print(f"   🎯 Query Type: MODULE + CLASS")
-                print(f"   📝 Query: {query}")
-                print(
-                    f"   🔢 Params: ('{method_name}', '{module_name}', '{class_name}')"
-                )
+                params = (method_name, module_name, class_name)
             else:
                 query = f"""
                 SELECT method_name, return_type, args
                 FROM {methods_table}
                 WHERE method_name = ? AND module_name = ?
                 """
-                self.cursor.execute(query, (method_name, module_name))
-                print(f"   🎯 Query Type: MODULE ONLY")
-                print(f"   📝 Query: {query}")
-                print(f"   🔢 Params: ('{method_name}', '{module_name}')")
+                params = (method_name, module_name)
         else:
             if class_name:
                 query = f"""
@@ -766,50 +843,43 @@ class DependencyResolver:
                 FROM {methods_table}
                 WHERE method_name = ? AND class_name = ?
                 """
-                self.cursor.execute(query, (method_name, class_name))
-                print(f"   🎯 Query Type: CLASS ONLY")
-                print(f"   📝 Query: {query}")
-                print(f"   🔢 Params: ('{method_name}', '{class_name}')")
+                params = (method_name, class_name)
             else:
                 query = f"""
                 SELECT method_name, return_type, args
                 FROM {methods_table}
                 WHERE method_name = ?
                 """
-                self.cursor.execute(query, (method_name,))
-                print(f"   🎯 Query Type: METHOD ONLY")
-                print(f"   📝 Query: {query}")
-                print(f"   🔢 Params: ('{method_name}',)")
+                params = (method_name,)
 
+        self.cursor.execute(query, params)
         row = self.cursor.fetchone()
-        print(f"   📊 Query Result: {row}")
+        resolver_log.debug(
+            "🔍 [get_method_metadata] method=%r module=%r class=%r -> %s",
+            method_name,
+            module_name,
+            class_name,
+            row,
+        )
 
         if row:
             method_name, return_type, args_json = row
-            print(f"   ✅ Row Found:")
-            print(f"      📛 Method: {method_name}")
-            print(f"      🔄 Return Type: {return_type}")
-            print(f"      📦 Args JSON: {args_json}")
 
             try:
                 args = json.loads(args_json) if args_json else []
-                print(f"      🎯 Parsed Args: {args}")
             except json.JSONDecodeError as e:
-                print(f"      ❌ JSON Decode Error: {e}")
+                resolver_log.warning(
+                    "❌ Could not decode args for method %r: %s", method_name, e
+                )
                 args = []
-                print(f"      🎯 Using empty args due to error")
 
             result = {
                 "method_name": method_name,
                 "return_type": return_type,
                 "args": args,
             }
-            print(f"   📤 Returning: {result}")
-            print(f"🔍 [get_method_metadata] END - SUCCESS")
             return result
 
-        print(f"   ❌ No row found for method '{method_name}'")
-        print(f"🔍 [get_method_metadata] END - NOT FOUND")
         return None
 
     def get_print_method_for_class(self, class_name):
@@ -947,23 +1017,23 @@ class DependencyResolver:
             class_names = [row[0] for row in self.cursor.fetchall() if row[0]]
 
             if not class_names:
-                print("[DEBUG] No class names found in table.")
+                resolver_log.debug("No class names found in table.")
                 return None
 
             matches = difflib.get_close_matches(
                 input_name, class_names, n=1, cutoff=cutoff
             )
             if matches:
-                print(
-                    f"[DEBUG] Closest class name for '{input_name}' is '{matches[0]}'"
+                resolver_log.debug(
+                    "Closest class name for '%s' is '%s'", input_name, matches[0]
                 )
                 return matches[0]
             else:
-                print(f"[DEBUG] No close match found for '{input_name}'")
+                resolver_log.debug("No close match found for '%s'", input_name)
                 return None
 
         except Exception as e:
-            print(f"[ERROR] Failed to find closest class name: {e}")
+            resolver_log.error("Failed to find closest class name: %s", e)
             return None
 
     def class_constructor_use_equal_to(self, class_name) -> bool:
@@ -1148,6 +1218,8 @@ class DependencyResolver:
         table_name = f"{self.current_id}_imported_modules"
 
         self._insert_dicts_to_table(table_name, [data])
+        self._record_effect("insert_imported_module", data)
+        self.methods_version += 1
 
     def get_module_call_return_type(self, module_name, method_name):
         methods_table = f"{self.current_id}_methods"
@@ -1220,26 +1292,20 @@ class DependencyResolver:
 
     def get_method_translation(self, method_name, module_name=None):
         methods_table = f"{self.current_id}_methods"
-        print(f"[DEBUG] Looking up method translation:")
-        print(f"        ├─ Method Name : {method_name}")
-        print(f"        ├─ Module Name : {module_name}")
-        print(f"        └─ Methods Table: {methods_table}")
 
-        # 🔍 Print all available modules for this method or in general
-        try:
-            print(f"[DEBUG] Listing all modules with '{method_name}' in table:")
+        if resolver_log.isEnabledFor(logging.DEBUG):
+            # listing candidate modules costs an extra query, only do it when tracing
             self.cursor.execute(
                 f"SELECT DISTINCT module_name FROM {methods_table} WHERE method_name=?",
                 (method_name,),
             )
-            modules = self.cursor.fetchall()
-            if modules:
-                for row in modules:
-                    print(f"        └─ Found module: {row[0]}")
-            else:
-                print("        └─ No modules found with that method name.")
-        except Exception as e:
-            print(f"[ERROR] Could not list modules: {e}")
+            modules = [row[0] for row in self.cursor.fetchall()]
+            resolver_log.debug(
+                "Looking up translation of %r in module %r (modules with it: %s)",
+                method_name,
+                module_name,
+                modules,
+            )
 
         if module_name:
             query = f"""
@@ -1249,8 +1315,6 @@ class DependencyResolver:
                 AND module_name=?
             """
             params = (method_name, module_name)
-            print(f"[DEBUG] Executing SQL (with module): {query.strip()}")
-            print(f"        Parameters: {params}")
             self.cursor.execute(query, params)
             result = self.cursor.fetchone()
         else:
@@ -1260,17 +1324,17 @@ class DependencyResolver:
             WHERE method_name=? 
             """
             params = (method_name,)
-            print(f"[DEBUG] Executing SQL (no module): {query.strip()}")
-            print(f"        Parameters: {params}")
             self.cursor.execute(query, params)
             result = self.cursor.fetchone()
 
         if result:
-            print(f"[DEBUG] Found translation: {result}")
+            resolver_log.debug("Found translation: %s", result)
             return result[0]
         else:
-            print(
-                f"[DEBUG] No translation found for method '{method_name}' in table '{methods_table}'"
+            resolver_log.debug(
+                "No translation found for method %r in table %r",
+                method_name,
+                methods_table,
             )
 
             return
@@ -1286,7 +1350,9 @@ class DependencyResolver:
         import_alias=?
         """
 
-        print(f"querying imported modules from {main_module} as {alias}")
+        resolver_log.debug(
+            "querying imported modules from %s as %s", main_module, alias
+        )
 
         self.cursor.execute(
             query,
@@ -1297,7 +1363,7 @@ class DependencyResolver:
         )
 
         result = self.cursor.fetchone()
-        print(f"got result {result}")
+        resolver_log.debug("got result %s", result)
 
         if result:
             return result[0]
@@ -1322,10 +1388,12 @@ class DependencyResolver:
         return None
 
     def get_variable_type(self, variable_name, scope):
-        print(f"checking type for {variable_name} in scope {scope}")
+        resolver_log.debug("checking type for %s in scope %s", variable_name, scope)
         if scope != "global":
             var_type = self._exec_get_variable_type_query(variable_name, scope)
-            print(f"got type {var_type} for {variable_name} in scope {scope}")
+            resolver_log.debug(
+                "got type %s for %s in scope %s", var_type, variable_name, scope
+            )
             if var_type:
                 return var_type
 
@@ -1442,38 +1510,30 @@ class DependencyResolver:
 
         self._insert_dicts_to_table()
 
-    def _insert_dicts_to_table(self, table_name, dict_list):
-        # print(f"📥 Inserting into table: {table_name}")
-        # print(f"📦 Incoming data: {dict_list}")
+    def _get_table_columns(self, table_name):
+        if table_name not in self._table_columns:
+            self.cursor.execute(f"PRAGMA table_info({table_name})")
+            self._table_columns[table_name] = [col[1] for col in self.cursor.fetchall()]
 
-        # Get existing column names from the table
-        self.cursor.execute(f"PRAGMA table_info({table_name})")
-        columns_info = self.cursor.fetchall()
-        table_columns = [col[1] for col in columns_info]
+        return self._table_columns[table_name]
 
-        # print(f"🧱 Table columns: {table_columns}")
-
-        for data in dict_list:
-            col_names = []
-            values = []
-
-            for col in table_columns:
-                if col in data:
-                    col_names.append(col)
-                    values.append(data[col])
-                else:
-                    col_names.append(col)
-                    values.append(None)
+    def _insert_dicts_to_table(self, table_name, dict_list):
+        """
+        Insert rows with a single executemany. Nothing is committed here;
+        callers commit once per batch (see commit()).
+        """
+        if not dict_list:
+            return
 
-            placeholders = ",".join("?" for _ in col_names)
-            column_str = ",".join(col_names)
+        table_columns = self._get_table_columns(table_name)
 
-            self.cursor.execute(
-                f"INSERT INTO {table_name} ({column_str}) VALUES ({placeholders})",
-                values,
-            )
+        placeholders = ",".join("?" for _ in table_columns)
+        column_str = ",".join(table_columns)
 
-        self.conn.commit()
+        self.cursor.executemany(
+            f"INSERT INTO {table_name} ({column_str}) VALUES ({placeholders})",
+            [[data.get(col) for col in table_columns] for data in dict_list],
+        )
 
     def _process_dunder_value(self, value):
         """
@@ -1508,37 +1568,16 @@ class DependencyResolver:
         # print(f"[DEBUG] Dunder '{name}' not found in AST node.")
         return None
 
-    def _insert_module_info(
-        self,
-        module_name,
-        translated_name,
-        module_type,
-        dependencies,
-        include_internal_modules,
-        available_platforms,
-    ):
-        data = {
-            "module_name": module_name,
-            "translated_name": translated_name,
-            "module_type": module_type,
-            "dependencies": dependencies,
-            "include_internal_modules": include_internal_modules,
-            "available_platforms": available_platforms,
-        }
-        table = f"{self.current_id}_modules"
-        self._insert_dicts_to_table(table, [data])
-        return
-
-    def _save_function(self, module, ast_node):
+    def _get_function_metadata(self, module, ast_node):
         method_name = ast_node.name
-        print(f"saving method {method_name}")
+        resolver_log.debug("saving method %s", method_name)
 
         # --- Return type ---
         if ast_node.returns:
             return_type = extract_annotation_type(ast_node.returns)
         else:
             return_type = None
-            print("[DEBUG] No return type annotation found.")
+            resolver_log.debug("No return type annotation found.")
 
         args = []
 
@@ -1602,6 +1641,11 @@ class DependencyResolver:
 
         use_as_is = True
         translation = None
+        is_reference = False
+        construct_with_equal_to = False
+        class_actual_type = None
+        pass_as = None
+        is_eval = False
 
         if module_type == "core":
             use_as_is = self._get_dunder_value(ast_node, "__use_as_is__")
@@ -1626,24 +1670,21 @@ class DependencyResolver:
 
             translation = f"{method_name}({joined_args})"
 
-        # print(f"[DEBUG] Inserting method: {method_name}, use_as_is: {use_as_is}")
-        self._insert_method(
-            method_name,
-            class_name,
-            module_name,
-            module_type,
-            args_json,
-            return_type,
-            use_as_is=use_as_is,
-            is_reference=is_reference,
-            translation=translation,
-            class_actual_type=class_actual_type,
-            pass_as=pass_as,
-            construct_with_equal_to=construct_with_equal_to,
-            is_eval=is_eval,
-        )
-
-        return
+        return {
+            "method_name": method_name,
+            "class_name": class_name,
+            "module_name": module_name,
+            "module_type": module_type,
+            "args": args_json,
+            "return_type": return_type,
+            "use_as_is": use_as_is,
+            "translation": translation,
+            "is_reference": is_reference,
+            "class_actual_type": class_actual_type,
+            "pass_as": pass_as,
+            "construct_with_equal_to": construct_with_equal_to,
+            "is_eval": is_eval,
+        }
 
     def _insert_method(
         self,
@@ -1680,14 +1721,16 @@ class DependencyResolver:
         }
 
         self._insert_dicts_to_table(table_name, [data])
+        self._record_effect("_insert_method", data)
+        self.methods_version += 1
         return
 
-    def _save_class(self, module, ast_node):
-        for item in ast_node.body:
-            if isinstance(item, ast.FunctionDef):
-                self._save_function(module, item)
-
-        return
+    def _get_class_metadata(self, module, ast_node):
+        return [
+            self._get_function_metadata(module, item)
+            for item in ast_node.body
+            if isinstance(item, ast.FunctionDef)
+        ]
 
     def insert_variable(
         self, variable_name, variable_type, module_name, module_type, scope="global"
@@ -1708,61 +1751,480 @@ class DependencyResolver:
         }
 
         self._insert_dicts_to_table(table_name, [args_dict])
+        self._record_effect("insert_variable", args_dict)
+        self.variable_versions[variable_name] = self.version
         return
 
+    def _build_module_metadata(self, module):
+        """
+        Walk a core module tree and collect the rows stored for it:
+        the module info, every method (top level and class) and every
+        annotated module variable.
+        """
+        module_tree = module["module_tree"]
+        if module_tree is None:
+            module_tree = parse_external_python_file(module["path"])
+
+        module_type = module["type"]
+        module_name = module["name"]
+
+        translated_name = self._get_dunder_value(module_tree, "__include_modules__")
+        dependencies = self._get_dunder_value(module_tree, "__dependencies__")
+        include_internal_modules = self._get_dunder_value(
+            module_tree, "__include_internal_modules__"
+        )
+
+        available_platforms = (
+            self._get_dunder_value(module_tree, "__available_platforms__") or "all"
+        )
+
+        module_info = {
+            "module_name": module_name,
+            "translated_name": translated_name,
+            "module_type": module_type,
+            "dependencies": dependencies,
+            "include_internal_modules": include_internal_modules,
+            "available_platforms": available_platforms,
+        }
+
+        methods = []
+        variables = []
+
+        for node in module_tree.body:
+            if isinstance(node, ast.FunctionDef):
+                module["class_name"] = None
+                methods.append(self._get_function_metadata(module, node))
+
+            elif isinstance(node, ast.ClassDef):
+                module["class_name"] = node.name
+                methods += self._get_class_metadata(module, node)
+
+            elif (
+                isinstance(node, ast.AnnAssign)
+                and isinstance(node.target, ast.Name)
+                and module_type == "core"
+            ):
+                variables.append(
+                    {
+                        "variable_name": node.target.id,
+                        "variable_type": ast.unparse(node.annotation),
+                        "module_name": module_name,
+                        "module_type": module_type,
+                        "scope": "global",
+                    }
+                )
+
+        return {"module": module_info, "methods": methods, "variables": variables}
+
+    def _get_module_metadata(self, module):
+        """Return module metadata from the precompiled cache, building it on a miss."""
+        source_hash = module.get("source_hash")
+        module_name = module["name"]
+
+        if source_hash:
+            metadata = load_module_metadata(module_name, self.platform, source_hash)
+            if metadata is not None:
+                return metadata
+
+        metadata = self._build_module_metadata(module)
+
+        if source_hash:
+            save_module_metadata(module_name, self.platform, source_hash, metadata)
+
+        return metadata
+
     def _save_modules(self):
+        modules = []
+        methods = []
+        variables = []
+
         for module in self.imported_modules:
-            module_tree = module["module_tree"]
-            module_type = module["type"]
-            module_name = module["name"]
-            module_alias = module["alias"]
+            resolver_log.debug("saving module %s", module["name"])
 
-            print(f"saving module {module_name}")
+            try:
+                metadata = self._get_module_metadata(module)
+            except (SyntaxError, OSError, ValueError) as core_err:
+                # core libs are parsed lazily, a broken one is skipped here
+                log.warning(
+                    "⚠️ Failed to load core module %s: %s", module["name"], core_err
+                )
+                continue
 
-            translated_name = self._get_dunder_value(module_tree, "__include_modules__")
-            dependencies = self._get_dunder_value(module_tree, "__dependencies__")
-            include_internal_modules = self._get_dunder_value(
-                module_tree, "__include_internal_modules__"
-            )
+            modules.append(metadata["module"])
+            methods += metadata["methods"]
+            variables += metadata["variables"]
 
-            available_platforms = (
-                self._get_dunder_value(module_tree, "__available_platforms__") or "all"
-            )
+        self._insert_dicts_to_table(f"{self.current_id}_modules", modules)
+        self._insert_dicts_to_table(f"{self.current_id}_methods", methods)
+        self._insert_dicts_to_table(f"{self.current_id}_variables", variables)
+        self.commit()
 
-            self._insert_module_info(
-                module_name,
-                translated_name,
-                module_type,
-                dependencies,
-                include_internal_modules,
-                available_platforms,
+        return
+
+
+class InMemoryDependencyResolver(DependencyResolver):
+    """
+    DependencyResolver that keeps the session tables in process memory.
+
+    Rows are stored per table in insertion order and indexed by the column
+    combinations the lookups filter on, so every lookup is a dict hit
+    instead of a full scan of an on-disk table. Lookups return the first
+    matching row, same as fetchone() on the SQLite backend, and a None
+    lookup value never matches (SQL NULL semantics).
+    """
+
+    TABLE_COLUMNS = {
+        "methods": (
+            "module_name",
+            "class_name",
+            "method_name",
+            "args",
+            "module_type",
+            "return_type",
+            "use_as_is",
+            "translation",
+            "is_reference",
+            "construct_with_equal_to",
+            "class_actual_type",
+            "pass_as",
+            "is_eval",
+        ),
+        "variables": (
+            "variable_name",
+            "variable_type",
+            "module_name",
+            "module_type",
+            "scope",
+        ),
+        "modules": (
+            "module_name",
+            "module_type",
+            "translated_name",
+            "dependencies",
+            "include_internal_modules",
+            "available_platforms",
+        ),
+        "imported_modules": ("main_module", "imported_module", "import_alias"),
+    }
+
+    # column combinations each table is indexed on, kept sorted
+    TABLE_INDEXES = {
+        "methods": (
+            ("method_name",),
+            ("method_name", "module_name"),
+            ("class_name", "method_name"),
+            ("class_name", "method_name", "module_name"),
+            ("class_name",),
+            ("class_name", "module_name"),
+        ),
+        "variables": (("variable_name",), ("scope", "variable_name")),
+        "modules": (("module_name",),),
+        "imported_modules": (("import_alias", "main_module"),),
+    }
+
+    def __init__(self, commit_hash, sql_conn, platform, imported_modules=[]):
+        self.current_id = "commit_" + commit_hash
+        self.imported_modules = imported_modules
+        self.conn = sql_conn
+        self.platform = platform
+        self.cursor = None
+        self._init_change_tracking()
+        self.delete_all_tables()
+        self._create_tables()
+        self._save_modules()
+
+    def _create_tables(self):
+        self.rows = {table: [] for table in self.TABLE_COLUMNS}
+        self.indexes = {
+            table: {columns: {} for columns in indexes}
+            for table, indexes in self.TABLE_INDEXES.items()
+        }
+
+    def delete_all_tables(self):
+        self.rows = {}
+        self.indexes = {}
+
+    def commit(self):
+        pass
+
+    def _insert_dicts_to_table(self, table_name, dict_list):
+        table = table_name[len(self.current_id) + 1 :]
+        table_rows = self.rows[table]
+        table_indexes = self.indexes[table]
+        columns = self.TABLE_COLUMNS[table]
+
+        for data in dict_list:
+            row = {col: data.get(col) for col in columns}
+            table_rows.append(row)
+
+            for index_columns, index in table_indexes.items():
+                key = tuple(row[col] for col in index_columns)
+                index.setdefault(key, []).append(row)
+
+    def _select(self, table, **where):
+        """Return all rows of a table matching the equality filters."""
+        index_columns = tuple(sorted(where))
+        key = tuple(where[col] for col in index_columns)
+
+        if None in key:
+            return []
+
+        return self.indexes[table][index_columns].get(key, [])
+
+    def _select_first(self, table, **where):
+        rows = self._select(table, **where)
+        return rows[0] if rows else None
+
+    def variable_exists(self, variable_name: str) -> bool:
+        return bool(self._select("variables", variable_name=variable_name))
+
+    def get_imported_global_methods(self, current_module_name):
+        return {
+            row["method_name"]: row["module_name"]
+            for row in self.rows["methods"]
+            if row["class_name"] is None
+            and row["module_name"] is not None
+            and row["module_name"] != current_module_name
+        }
+
+    def get_available_platforms(self, module_name):
+        row = self._select_first("modules", module_name=module_name)
+
+        if row is None:
+            resolver_log.warning("Module '%s' not found in database", module_name)
+            return ""
+
+        return row["available_platforms"] or ""
+
+    def get_method_metadata(self, method_name, module_name=None, class_name=None):
+        where = {"method_name": method_name}
+        if module_name:
+            where["module_name"] = module_name
+        if class_name:
+            where["class_name"] = class_name
+
+        row = self._select_first("methods", **where)
+
+        if row is None:
+            return None
+
+        try:
+            args = json.loads(row["args"]) if row["args"] else []
+        except json.JSONDecodeError:
+            args = []
+
+        return {
+            "method_name": row["method_name"],
+            "return_type": row["return_type"],
+            "args": args,
+        }
+
+    def get_print_method_for_class(self, class_name):
+        row = self._select_first(
+            "methods", class_name=class_name, method_name="__print__"
+        )
+        if row:
+            return row["translation"]
+
+        return
+
+    def get_method_is_eval(self, method_name, module_name):
+        row = self._select_first(
+            "methods", method_name=method_name, module_name=module_name
+        )
+        if row:
+            return row["is_eval"]
+
+        return False
+
+    def get_method_args(self, module_name, method_name):
+        row = self._select_first(
+            "methods", method_name=method_name, module_name=module_name
+        )
+        if row:
+            return json.loads(row["args"])
+
+        return
+
+    def is_setup_and_loop_present(self):
+        method_names = {
+            row["method_name"]
+            for row in self.rows["methods"]
+            if row["method_name"] in ("setup", "loop")
+            and row["module_name"] == "main"
+            and row["class_name"] is None
+        }
+        return method_names == {"setup", "loop"}
+
+    def get_class_pass_as(self, class_name):
+        row = self._select_first("methods", class_name=class_name)
+        if row:
+            return row["pass_as"]
+
+        return "reference"
+
+    def get_closest_class_name(self, input_name, cutoff=0.5):
+        import difflib
+
+        class_names = [key[0] for key in self.indexes["methods"][("class_name",)]]
+
+        if not class_names:
+            return None
+
+        matches = difflib.get_close_matches(input_name, class_names, n=1, cutoff=cutoff)
+        return matches[0] if matches else None
+
+    def _get_class_init_column(self, class_name, column):
+        row = self._select_first("methods", class_name=class_name, method_name="__init__")
+        if row:
+            return row[column]
+
+        return
+
+    def class_constructor_use_equal_to(self, class_name) -> bool:
+        return self._get_class_init_column(class_name, "construct_with_equal_to")
+
+    def get_actual_class_type(self, class_name):
+        return self._get_class_init_column(class_name, "class_actual_type")
+
+    def get_class_init_translation(self, class_name):
+        return self._get_class_init_column(class_name, "translation")
+
+    def is_class_init_reference(self, class_name):
+        return self._get_class_init_column(class_name, "is_reference")
+
+    def is_module_class(self, class_name, module_name=None) -> bool:
+        if module_name:
+            rows = self._select("methods", class_name=class_name, module_name=module_name)
+        else:
+            rows = self._select("methods", class_name=class_name)
+
+        return bool(rows)
+
+    def get_global_function_return_type(self, method_name, current_module_name):
+        row = self._select_first(
+            "methods", method_name=method_name, module_name=current_module_name
+        )
+        if row:
+            return row["return_type"]
+
+        return
+
+    def get_module_call_return_type(self, module_name, method_name):
+        if self._select("methods", module_name=module_name, class_name=method_name):
+            return method_name
+
+        row = self._select_first(
+            "methods", module_name=module_name, method_name=method_name
+        )
+        if row:
+            return row["return_type"]
+
+        return "auto"
+
+    def get_class_method_translation(
+        self, method_name: str, class_name: str, module_name: str = None
+    ) -> str:
+        where = {"method_name": method_name, "class_name": class_name}
+        if module_name:
+            where["module_name"] = module_name
+
+        row = self._select_first("methods", **where)
+        if row:
+            return row["translation"]
+        return None
+
+    def get_method_translation(self, method_name, module_name=None):
+        if module_name:
+            row = self._select_first(
+                "methods", method_name=method_name, module_name=module_name
             )
+        else:
+            row = self._select_first("methods", method_name=method_name)
 
-            for node in module_tree.body:
-                if isinstance(node, ast.FunctionDef):
-                    module["class_name"] = None
-                    self._save_function(module, node)
-
-                elif isinstance(node, ast.ClassDef):
-                    module["class_name"] = node.name
-                    self._save_class(module, node)
-
-                elif (
-                    isinstance(node, ast.AnnAssign)
-                    and isinstance(node.target, ast.Name)
-                    and module_type == "core"
-                ):
-                    variable_name = node.target.id
-                    variable_type = ast.unparse(node.annotation)
-                    module_import_line = module["line_num"]
-                    occurence_line = node.lineno
-
-                    self.insert_variable(
-                        variable_name, variable_type, module_name, module_type
-                    )
+        if row:
+            return row["translation"]
+
+        return
+
+    def get_module_name_from_alias(self, main_module, alias):
+        row = self._select_first(
+            "imported_modules", main_module=main_module, import_alias=alias
+        )
+        if row:
+            return row["imported_module"]
 
         return
 
+    def _exec_get_variable_type_query(self, variable_name, scope):
+        row = self._select_first("variables", variable_name=variable_name, scope=scope)
+        if row:
+            return row["variable_type"]
+
+        return None
+
+    def get_variable_module_name(self, variable_name, scope):
+        row = self._select_first("variables", variable_name=variable_name, scope=scope)
+        if row:
+            return row["module_name"]
+
+        return None
+
+    def get_class_method_return_type(self, class_name, method_name):
+        row = self._select_first(
+            "methods", class_name=class_name, method_name=method_name
+        )
+        if row:
+            return row["return_type"]
+
+        return "auto"
+
+    def get_module_translation(self, module_name):
+        row = self._select_first("modules", module_name=module_name)
+        if row:
+            return row["translated_name"]
+
+        else:
+            return module_name
+
+    def get_module_dependencies(self, module_name):
+        row = self._select_first("modules", module_name=module_name)
+        if row:
+            return row["dependencies"]
+
+    def get_module_internal_includes(self, module_name):
+        row = self._select_first("modules", module_name=module_name)
+        if row:
+            return row["include_internal_modules"]
+
+
+RESOLVER_BACKENDS = {
+    "sqlite": DependencyResolver,
+    "memory": InMemoryDependencyResolver,
+}
+
+# the SQLite backend answers every lookup with SQL on the session's TEMP tables and
+# is the reference the memory backend mirrors; set MOJOSCALE_RESOLVER_BACKEND=sqlite
+# to compare against it while debugging the transpiler.
+DEFAULT_RESOLVER_BACKEND = os.getenv("MOJOSCALE_RESOLVER_BACKEND", "memory")
+
+
+def create_dependency_resolver(
+    commit_hash, sql_conn, platform, imported_modules=[], backend=None
+):
+    backend = backend or DEFAULT_RESOLVER_BACKEND
+
+    if backend not in RESOLVER_BACKENDS:
+        raise ValueError(
+            f"Unknown resolver backend '{backend}'. "
+            f"Available: {', '.join(RESOLVER_BACKENDS)}"
+        )
+
+    resolver_class = RESOLVER_BACKENDS[backend]
+    return resolver_class(
+        commit_hash, sql_conn, platform, imported_modules=imported_modules
+    )
+
 
 class TranslatedExpr:
     """Wrapper to keep translated code and its inferred type for chained calls."""
@@ -1793,6 +2255,13 @@ class TypeAnalyzer:
         self.get_is_inside_loop = get_is_inside_loop
         self.get_loop_vars = get_loop_vars
 
+        # (node, scope, loop vars, name versions) -> type, valid until methods change
+        self._type_cache = {}
+        self._node_names = {}
+        self._type_cache_version = None
+        self.type_cache_hits = 0
+        self.type_cache_misses = 0
+
     def get_lhs_name(self, target):
         """Return a string representing the LHS name from any assignment target."""
         if isinstance(target, ast.Name):
@@ -1829,7 +2298,7 @@ class TypeAnalyzer:
     def _call_type_analyzer(self, call_chain: dict, node):
         prev_type = None
         prev_statement = None
-        print(f"processing call chain {call_chain}")
+        type_log.debug("processing call chain %s", call_chain)
 
         for called_entity in call_chain:
             called_entity_type = called_entity["type"]
@@ -1848,7 +2317,7 @@ class TypeAnalyzer:
                         self.current_module_name, called_entity_value
                     )
 
-                    print(f"found module {module_name}")
+                    type_log.debug("found module %s", module_name)
 
                     if module_name:
                         # this is an imported module
@@ -1901,7 +2370,7 @@ class TypeAnalyzer:
                         # import lib as l
                         # l.foo()
                         # currently going over foo.
-                        print(f"visited args are {args}")
+                        type_log.debug("visited args are %s", args)
                         module_name = prev_statement
 
                         is_module_class = self.dependency_resolver.is_module_class(
@@ -1959,6 +2428,60 @@ class TypeAnalyzer:
         self.scope = self.get_scope()
         self.is_inside_loop = self.get_is_inside_loop()
         self.loop_variables = self.get_loop_vars()
+
+        if prev_translated_expr is not None:
+            return self._infer_node_type(node, prev_translated_expr)
+
+        # new methods or imports can change any type, start over
+        methods_version = self.dependency_resolver.methods_version
+        if methods_version != self._type_cache_version:
+            self._type_cache.clear()
+            self._type_cache_version = methods_version
+
+        # the node itself is the key (not id()), so it can't be collected and
+        # reused; rebinding any name the subtree refers to changes the key
+        variable_versions = self.dependency_resolver.variable_versions
+        key = (
+            node,
+            self.scope,
+            tuple(self.loop_variables.items()) if self.is_inside_loop else None,
+            tuple(variable_versions.get(name) for name in self._get_node_names(node)),
+        )
+        if key in self._type_cache:
+            self.type_cache_hits += 1
+            return self._type_cache[key]
+
+        self.type_cache_misses += 1
+        node_type = self._infer_node_type(node)
+        self._type_cache[key] = node_type
+        return node_type
+
+    def _get_node_names(self, node):
+        """Names and dotted attribute chains a subtree can look up as variables."""
+        names = self._node_names.get(node)
+        if names is None:
+            found = set()
+            for child in ast.walk(node):
+                if isinstance(child, ast.Name):
+                    found.add(child.id)
+                elif isinstance(child, ast.Attribute):
+                    found.add(child.attr)
+                    try:
+                        found.add(self.get_lhs_name(child))
+                    except Exception:
+                        pass
+            names = self._node_names[node] = tuple(sorted(found))
+        return names
+
+    def get_type_cache_stats(self):
+        lookups = self.type_cache_hits + self.type_cache_misses
+        return {
+            "hits": self.type_cache_hits,
+            "misses": self.type_cache_misses,
+            "hit_rate": self.type_cache_hits / lookups if lookups else 0.0,
+        }
+
+    def _infer_node_type(self, node, prev_translated_expr=None):
         if isinstance(node, ast.Constant):
             return type(node.value).__name__ or "str"
 
@@ -2034,18 +2557,18 @@ class TypeAnalyzer:
 
         elif isinstance(node, ast.Call):
             call_chain = _extract_chain(node)
-            print(f"evaluating call chain {call_chain}")
+            type_log.debug("evaluating call chain %s", call_chain)
             return self._call_type_analyzer(call_chain, node)
 
         elif isinstance(node, ast.Subscript):
             value = node.value
 
-            print(f"getting type for {value}")
+            type_log.debug("getting type for %s", value)
 
             value_type = self.get_node_type(value)
 
             value_type_split = value_type.split(",")
-            print(f"value type split is {value_type_split}")
+            type_log.debug("value type split is %s", value_type_split)
             core_type = value_type_split[0]
 
             if core_type == "str":
@@ -2054,12 +2577,12 @@ class TypeAnalyzer:
 
             elif core_type == "list":
                 element_type = value_type_split[1]
-                print(f"element type is {element_type}")
+                type_log.debug("element type is %s", element_type)
                 if isinstance(node.slice, ast.Constant):
                     # user has called an index list[i]
                     # return self.dependency_resolver.get_list_element_type(value.id, self.scope)
                     # return self._get_list_element_type(value.elts)
-                    print(f"found slice constant.")
+                    type_log.debug("found slice constant.")
                     if isinstance(value, ast.Name):
                         # this is a defined variable
                         return element_type
@@ -2083,11 +2606,13 @@ class TypeAnalyzer:
                 return value_type_split[2]
 
         elif isinstance(node, ast.BinOp):
-            print("starting type extraction")
+            type_log.debug("starting type extraction")
             left_type = self.get_node_type(node.left)
             right_type = self.get_node_type(node.right)
 
-            print(f"left type is {left_type} and right type is {right_type}")
+            type_log.debug(
+                "left type is %s and right type is %s", left_type, right_type
+            )
 
             if not left_type or not right_type:
                 raise TypeError(f"BinaryOp missing operand types: {ast.dump(node)}")
@@ -2255,6 +2780,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
         tree: ast.Module,
         dependency_resolver: DependencyResolver,
         monitor_speed: int,
+        unit_cache=None,
     ):
         self.tree = tree
         self.current_module_name = current_module_name
@@ -2267,6 +2793,14 @@ class ArduinoTranspiler(ast.NodeVisitor):
         self.monitor_speed = monitor_speed
         self.dependencies = []
         self.has_transpiled = False
+        # translations of the top-level statements, see get_unit_kind
+        self.units = []
+        # TranspileUnitCache for top-level statements, None to always transpile
+        self.unit_cache = unit_cache
+        # set when a translation was evaluated at transpile time (e.g. env vars)
+        self.unit_uses_eval = False
+        # sticky across units: the whole output depends on the environment
+        self.uses_eval = False
         self.type_analyzer = TypeAnalyzer(
             dependency_resolver=self.dependency_resolver,
             current_module_name=self.current_module_name,
@@ -2275,14 +2809,42 @@ class ArduinoTranspiler(ast.NodeVisitor):
             get_loop_vars=lambda: self.loop_variables,
         )
 
+    # node class name -> (visit_* function, whether it accepts `context`)
+    _visit_dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._build_visit_dispatch()
+
+    @classmethod
+    def _build_visit_dispatch(cls):
+        """Introspect the visit_* methods once so visit() is a single direct call."""
+        dispatch = {}
+        for attr_name in dir(cls):
+            if not attr_name.startswith("visit_"):
+                continue
+            func = getattr(cls, attr_name)
+            if not callable(func):
+                continue
+
+            parameters = inspect.signature(func).parameters
+            takes_context = "context" in parameters or any(
+                p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters.values()
+            )
+            dispatch[attr_name[len("visit_") :]] = (func, takes_context)
+
+        cls._visit_dispatch = dispatch
+
     def visit(self, node, context=None):
-        """Central dispatcher that forwards context if provided."""
-        method_name = "visit_" + node.__class__.__name__
-        visitor = getattr(self, method_name, self.generic_visit)
-        try:
-            return visitor(node, context=context)
-        except TypeError:
-            return visitor(node)
+        """Central dispatcher that forwards context to visitors accepting it."""
+        entry = self._visit_dispatch.get(node.__class__.__name__)
+        if entry is None:
+            return self.generic_visit(node, context=context)
+
+        visitor, takes_context = entry
+        if takes_context:
+            return visitor(self, node, context=context)
+        return visitor(self, node)
 
     def generic_visit(self, node, context=None):
         for field, value in ast.iter_fields(node):
@@ -2298,7 +2860,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
         transpiled_code = self.visit(self.tree)
 
         topline_includes = self.get_topline_includes()
-        has_transpiled = True
+        self.has_transpiled = True
 
         return "\n".join([topline_includes, transpiled_code])
 
@@ -2315,15 +2877,69 @@ class ArduinoTranspiler(ast.NodeVisitor):
 
         return op
 
+    def _get_unit_key(self, stmt):
+        return self.unit_cache.make_key(
+            self.dependency_resolver.effects_digest,
+            self.current_module_name,
+            self.monitor_speed,
+            ",".join(self.added_imports),
+            ast.dump(stmt),
+        )
+
+    def _visit_unit(self, stmt):
+        """Visit a top-level statement, reusing its cached translation if possible."""
+        if self.unit_cache is None:
+            line = self.visit(stmt)
+            self.uses_eval = self.uses_eval or self.unit_uses_eval
+            return line
+
+        dr = self.dependency_resolver
+        key = self._get_unit_key(stmt)
+        entry = self.unit_cache.get(key)
+
+        if entry is not None:
+            for method_name, kwargs in entry["effects"]:
+                getattr(dr, method_name)(**kwargs)
+            self.dependencies.extend(entry["dependencies"])
+            self.added_imports.extend(entry["added_imports"])
+            return entry["code"]
+
+        dependencies_before = len(self.dependencies)
+        added_imports_before = len(self.added_imports)
+        self.unit_uses_eval = False
+        dr.effect_log = []
+        try:
+            line = self.visit(stmt)
+            effects = dr.effect_log
+        finally:
+            dr.effect_log = None
+
+        # evaluated translations can read the environment, never reuse them
+        if self.unit_uses_eval:
+            self.uses_eval = True
+        else:
+            self.unit_cache.put(
+                key,
+                {
+                    "code": line,
+                    "effects": effects,
+                    "dependencies": self.dependencies[dependencies_before:],
+                    "added_imports": self.added_imports[added_imports_before:],
+                },
+            )
+
+        return line
+
     def visit_Module(self, node):
         lines = []
+        self.units = []
         for stmt in node.body:
-            line = self.visit(stmt)
+            line = self._visit_unit(stmt)
             if not line:
                 continue
 
             stripped = line.rstrip()
-            print(f"stripped is {stripped}")
+            log.debug("stripped is %s", stripped)
 
             # only append semicolon if it looks like a "statement" line, not a block
             if not (
@@ -2335,9 +2951,11 @@ class ArduinoTranspiler(ast.NodeVisitor):
             ):
                 line = stripped + ";"
 
-            print(f"line is {line}")
+            log.debug("line is %s", line)
 
             lines.append(line)
+            kind, name = get_unit_kind(stmt)
+            self.units.append({"kind": kind, "name": name, "code": line})
 
         return "\n".join(lines)
 
@@ -2474,7 +3092,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
         self.is_inside_loop = True
         loop_var_type = self.type_analyzer.get_node_type(node.iter)
         loop_type = loop_var_type.split(",")[0]
-        print(f"loop type is {loop_type}")
+        log.debug("loop type is %s", loop_type)
         result = []
         loop_var = self.visit(node.target)
         iterable = self.visit(node.iter)
@@ -2725,7 +3343,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
             self.dependency_resolver.insert_imported_module(
                 self.current_module_name, alias_name, imported_as
             )
-            print(f"inserted {alias_name} imported as {imported_as}")
+            log.debug("inserted %s imported as %s", alias_name, imported_as)
             translated_modules = self.dependency_resolver.get_module_translation(
                 alias_name
             )
@@ -2734,9 +3352,9 @@ class ArduinoTranspiler(ast.NodeVisitor):
             include_internal_modules = (
                 self.dependency_resolver.get_module_internal_includes(alias_name)
             )
-            print(f"translated modules are {translated_modules}")
-            print(f"dependencies are {dependencies}")
-            print(f"internal modules are {include_internal_modules}")
+            log.debug("translated modules are %s", translated_modules)
+            log.debug("dependencies are %s", dependencies)
+            log.debug("internal modules are %s", include_internal_modules)
 
             if dependencies:
                 for dependency in dependencies.split(","):
@@ -2776,10 +3394,10 @@ class ArduinoTranspiler(ast.NodeVisitor):
         prev_type = None
         prev_statement = None
         prev_entity_type = None
-        print(f"processing call chain {call_chain}")
+        log.debug("processing call chain %s", call_chain)
 
         for called_entity in call_chain:
-            print(f"prev_statement after processing: '{prev_statement}'")
+            log.debug("prev_statement after processing: '%s'", prev_statement)
             called_entity_type = called_entity["type"]
             called_entity_value = called_entity["value"]
             if not prev_type:
@@ -2790,7 +3408,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
                         self.type_analyzer.get_node_type(called_entity_value) or "str"
                     )
                     prev_entity_type = "const"
-                    print(f"found {called_entity_value} type {prev_type}")
+                    log.debug("found %s type %s", called_entity_value, prev_type)
 
                 elif called_entity_type == "attr":
                     # this is a call like x.foo()
@@ -2800,7 +3418,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
                         self.current_module_name, called_entity_value
                     )
 
-                    print(f"found module {module_name}")
+                    log.debug("found module %s", module_name)
 
                     prev_entity_type = "attr"
 
@@ -2843,7 +3461,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
                             self.current_module_name, method_name
                         )
 
-                        print(f"stored args are {stored_args}")
+                        log.debug("stored args are %s", stored_args)
                         """processed_args = self._process_func_args(
                             self.current_module_name, method_name, args
                         )
@@ -2886,7 +3504,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
                         # import lib as l
                         # l.foo()
                         # currently going over foo.
-                        print(f"visited args are {args}")
+                        log.debug("visited args are %s", args)
                         module_name = prev_statement
 
                         is_module_class = self.dependency_resolver.is_module_class(
@@ -2914,13 +3532,18 @@ class ArduinoTranspiler(ast.NodeVisitor):
                                 args, kwargs, method_data["args"]
                             )
 
-                            print(
-                                f"doing translation for {method_name} module {prev_statement} and args are {args}"
+                            log.debug(
+                                "doing translation for %s module %s and args are %s",
+                                method_name,
+                                prev_statement,
+                                args,
                             )
 
                             prev_type = method_name  # this is class name itself
-                            print(
-                                f"[CA] translation is {called_entity_translation} and args kwargs are {method_args_kwargs}"
+                            log.debug(
+                                "[CA] translation is %s and args kwargs are %s",
+                                called_entity_translation,
+                                method_args_kwargs,
                             )
                             prev_statement = f"{called_entity_translation.format(**method_args_kwargs)}"
                             prev_entity_type = "call"
@@ -2952,15 +3575,16 @@ class ArduinoTranspiler(ast.NodeVisitor):
                             )
 
                             prev_type = called_entity_return_type
-                            print(f"found args {args}")
+                            log.debug("found args %s", args)
 
                             is_eval = self.dependency_resolver.get_method_is_eval(
                                 method_name, module_name
                             )
 
-                            print(f"method {method_name} is eval: {is_eval}")
+                            log.debug("method %s is eval: %s", method_name, is_eval)
 
                             if is_eval:
+                                self.unit_uses_eval = True
                                 if (
                                     method_name == "get_env_var"
                                     and module_name == "core.env_vars"
@@ -2981,8 +3605,11 @@ class ArduinoTranspiler(ast.NodeVisitor):
                                     translation = called_entity_translation.format(
                                         **method_args_kwargs
                                     )
-                                    print(
-                                        f"translation for eval method {method_name} for module {module_name} is {translation}"
+                                    log.debug(
+                                        "translation for eval method %s for module %s is %s",
+                                        method_name,
+                                        module_name,
+                                        translation,
                                     )
                                     prev_statement = eval(translation)
 
@@ -3035,8 +3662,12 @@ class ArduinoTranspiler(ast.NodeVisitor):
                         else:
                             # here prev_type is class name, prev_statement is class instance
                             # and entity called is the class method
-                            print(
-                                f"evaluation for {prev_statement}, {prev_type} and current {method_name}, args are {args}"
+                            log.debug(
+                                "evaluation for %s, %s and current %s, args are %s",
+                                prev_statement,
+                                prev_type,
+                                method_name,
+                                args,
                             )
 
                             called_entity_translation = (
@@ -3054,7 +3685,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
                             method_data = self.dependency_resolver.get_method_metadata(
                                 method_name, class_name=prev_type
                             )
-                            print(f"[CAA] method data is {method_data}")
+                            log.debug("[CAA] method data is %s", method_data)
                             saved_args_kwargs = method_data["args"]
 
                             saved_args_kwargs.pop(
@@ -3081,9 +3712,10 @@ class ArduinoTranspiler(ast.NodeVisitor):
         visited_args = []
 
         for arg in args:
-            print(f"Visiting arg: {ast.dump(arg)}")  # Add this
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Visiting arg: %s", ast.dump(arg))
             visited_arg = self.visit(arg)
-            print(f"Result: '{visited_arg}'")  # Add this
+            log.debug("Result: '%s'", visited_arg)
             visited_args.append(visited_arg)
 
         return visited_args
@@ -3141,9 +3773,9 @@ class ArduinoTranspiler(ast.NodeVisitor):
                     value = self.visit(kwarg_map[name].value)
                 else:
                     default_value_node = json_to_ast(default)
-                    print(f"[GAKD] default node is {default_value_node}")
+                    log.debug("[GAKD] default node is %s", default_value_node)
                     value = self.visit(default_value_node)
-                    print(f"[GAKD] default value is {value}")
+                    log.debug("[GAKD] default value is %s", value)
 
             result[name] = value
 
@@ -3217,6 +3849,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
                         )
 
                         if is_translation_eval == True:
+                            self.unit_uses_eval = True
                             raw_args = []
                             for arg in node.args:
                                 raw_args.append(arg.value)
@@ -3346,12 +3979,12 @@ class ArduinoTranspiler(ast.NodeVisitor):
         print(f"[WARN] visit_Call fell through! Node: {ast.dump(node)}")"""
 
     def _process_func_args(self, module_name, method_name, args_list):
-        print(f"processing for {module_name} and method {method_name}")
+        log.debug("processing for %s and method %s", module_name, method_name)
         stored_args = self.dependency_resolver.get_method_args(module_name, method_name)
 
         for i in range(len(stored_args)):
             arg = stored_args[i]
-            print(f"proceeing arg is {arg}")
+            log.debug("proceeing arg is %s", arg)
             arg_type = arg["arg_type"]
 
             if arg and not is_core_python_type(arg_type):
@@ -3605,7 +4238,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
         return "\n".join(result)
 
     def visit_JoinedStr(self, node: ast.JoinedStr):
-        print("doing joined str")
+        log.debug("doing joined str")
         parts = []
         for value in node.values:
             if isinstance(value, ast.FormattedValue):
@@ -3629,8 +4262,8 @@ class ArduinoTranspiler(ast.NodeVisitor):
                     )
 
                     if print_method:
-                        print(f"expr code is {expr_code}")
-                        print(f"print method is {print_method}")
+                        log.debug("expr code is %s", expr_code)
+                        log.debug("print method is %s", print_method)
                         parts.append(print_method.format(expr_code))
 
                     else:
@@ -3737,16 +4370,16 @@ class ArduinoTranspiler(ast.NodeVisitor):
                     base_name = base.id
 
                     # Subcase 2a: base is an imported module
-                    print(f"getting module name for alias {base_name}")
+                    log.debug("getting module name for alias %s", base_name)
                     module_name = self.dependency_resolver.get_module_name_from_alias(
                         self.current_module_name, base_name
                     )
-                    print(f"got module name {module_name}")
+                    log.debug("got module name %s", module_name)
                     if module_name:
                         # 👇 This is the missing piece
                         # Check if the attribute is a class inside the imported module
-                        print(f"checking if the method is a class")
-                        print(f"checking {method_name} in {module_name}")
+                        log.debug("checking if the method is a class")
+                        log.debug("checking %s in %s", method_name, module_name)
                         if self.dependency_resolver.is_module_class(
                             method_name, module_name=module_name
                         ):
@@ -3758,7 +4391,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
                                 module_name, method_name
                             )
                         )
-                        print(f"git return type {return_type} for {method_name}")
+                        log.debug("git return type %s for %s", return_type, method_name)
 
                         return return_type
 
@@ -3825,11 +4458,11 @@ class ArduinoTranspiler(ast.NodeVisitor):
                 return dict_info["value_type"]
 
         elif isinstance(node, ast.BinOp):
-            print("starting type extraction")
+            log.debug("starting type extraction")
             left_type = self.type_analyzer.get_node_type(node.left)
             right_type = self.type_analyzer.get_node_type(node.right)
 
-            print(f"left type is {left_type} and right type is {right_type}")
+            log.debug("left type is %s and right type is %s", left_type, right_type)
 
             if not left_type or not right_type:
                 raise TypeError(f"BinaryOp missing operand types: {ast.dump(node)}")
@@ -3981,26 +4614,28 @@ class ArduinoTranspiler(ast.NodeVisitor):
         Logs reasons why a node is or is not considered a constructor call.
         """
         if not isinstance(node, ast.Call):
-            print("🚫 Node is not a function call.")
+            log.debug("🚫 Node is not a function call.")
             return False
 
         # Case 1: Direct constructor like WiFiClient()
         if isinstance(node.func, ast.Name):
             func_name = node.func.id
-            print(f"🔍 Found function call: {func_name}()")
+            log.debug("🔍 Found function call: %s()", func_name)
 
             if is_builtin_function(func_name):
-                print(
-                    f"⚠️ {func_name} is a built-in function. Not treating as constructor."
+                log.debug(
+                    "⚠️ %s is a built-in function. Not treating as constructor.",
+                    func_name,
                 )
                 return False
 
             if self.dependency_resolver.is_module_class(func_name):
-                print(f"✅ {func_name} is a known class. Treating as constructor.")
+                log.debug("✅ %s is a known class. Treating as constructor.", func_name)
                 return True
 
-            print(
-                f"❓ {func_name} is not a built-in and not found in module class list. Not treating as constructor."
+            log.debug(
+                "❓ %s is not a built-in and not found in module class list. Not treating as constructor.",
+                func_name,
             )
             return False
 
@@ -4012,29 +4647,37 @@ class ArduinoTranspiler(ast.NodeVisitor):
             method_name = node.func.attr
             base_name = base.id
 
-            print(
-                f"🔍 Found attribute-style constructor call: {base_name}.{method_name}()"
+            log.debug(
+                "🔍 Found attribute-style constructor call: %s.%s()",
+                base_name,
+                method_name,
             )
 
             module_name = self.dependency_resolver.get_module_name_from_alias(
                 self.current_module_name, base_name
             )
-            print(f"📦 Alias {base_name} maps to module {module_name}")
+            log.debug("📦 Alias %s maps to module %s", base_name, module_name)
 
             if module_name and self.dependency_resolver.is_module_class(
                 method_name, module_name=module_name
             ):
-                print(
-                    f"✅ {method_name} is a class in module {module_name}. Treating as constructor."
+                log.debug(
+                    "✅ %s is a class in module %s. Treating as constructor.",
+                    method_name,
+                    module_name,
                 )
                 return True
             else:
-                print(
-                    f"❌ {method_name} is not recognized as a class in module {module_name}."
+                log.debug(
+                    "❌ %s is not recognized as a class in module %s.",
+                    method_name,
+                    module_name,
                 )
                 return False
 
-        print("🚫 Node.func is not a simple name or recognizable attribute-based call.")
+        log.debug(
+            "🚫 Node.func is not a simple name or recognizable attribute-based call."
+        )
         return False
 
     def visit_AnnAssign(self, node):
@@ -4042,7 +4685,7 @@ class ArduinoTranspiler(ast.NodeVisitor):
         rhs_type = extract_annotation_type(node.annotation)
 
         if isinstance(node.value, ast.List) or isinstance(node.value, ast.Dict):
-            print(f"visint with context {rhs_type}")
+            log.debug("visint with context %s", rhs_type)
             rhs_converted = self.visit(node.value, context=rhs_type)
         else:
             rhs_converted = self.visit(node.value)
@@ -4060,8 +4703,8 @@ class ArduinoTranspiler(ast.NodeVisitor):
 
         is_lhs_name = isinstance(node.targets[0], ast.Name)
         rhs_converted = self.visit(node.value)
-        print(f"rhs converted is {rhs_converted}")
-        print(f"node value is {node.value}")
+        log.debug("rhs converted is %s", rhs_converted)
+        log.debug("node value is %s", node.value)
 
         if is_lhs_name:
             # is lhs is subscript x[1], or other special type
@@ -4087,7 +4730,9 @@ class ArduinoTranspiler(ast.NodeVisitor):
     ):
         if not variable_exists:
             is_python_type = is_core_python_type(rhs_type)
-            print(f"var {lhs_name} is declared {rhs_type} of type {is_python_type}")
+            log.debug(
+                "var %s is declared %s of type %s", lhs_name, rhs_type, is_python_type
+            )
 
             cpp_type = get_cpp_python_type(
                 rhs_type, custom_type_str=False, custom_bool_type=False
@@ -4138,6 +4783,9 @@ class ArduinoTranspiler(ast.NodeVisitor):
             return f"{lhs_name} = {rhs_converted}"
 
 
+ArduinoTranspiler._build_visit_dispatch()
+
+
 def parse_external_python_file(filepath):
     filepath = Path(filepath)
 
@@ -4160,22 +4808,27 @@ def extract_imported_modules_from_tree(tree, path_to_core_libs, input_files={}):
                 module_path = os.path.join(*module_name.split(".")) + ".py"
 
                 if module_path in input_files:
-                    print(f"🔗 Found internal import: {module_name}")
+                    log.debug("🔗 Found internal import: %s", module_name)
                     continue
 
                 core_lib_path = os.path.join(path_to_core_libs, module_path)
-                print(f"🧩 Trying core module: {module_name} at {core_lib_path}")
+                log.debug("🧩 Trying core module: %s at %s", module_name, core_lib_path)
                 try:
+                    # the tree is only parsed when the metadata cache misses
                     module = {
                         "name": module_name,
                         "alias": alias.asname,
                         "type": "core",
-                        "module_tree": parse_external_python_file(core_lib_path),
+                        "path": core_lib_path,
+                        "source_hash": get_source_hash(core_lib_path),
+                        "module_tree": None,
                         "line_num": node.lineno,
                     }
                     modules.append(module)
                 except Exception as core_err:
-                    print(f"⚠️ Failed to load core module {module_name}: {core_err}")
+                    log.warning(
+                        "⚠️ Failed to load core module %s: %s", module_name, core_err
+                    )
 
     return modules
 
@@ -4187,28 +4840,41 @@ def main(
     path_to_core_libs,
     platform,
     monitor_speed=115200,
+    resolver_backend=None,
+    profile_path=None,
+    incremental=True,
 ):
     """
     input_files: {"file_name.py": "<py code>"}
+    resolver_backend: key of RESOLVER_BACKENDS, defaults to DEFAULT_RESOLVER_BACKEND
+    profile_path: write a visitor profile here, defaults to $MOJOSCALE_PROFILE
+    incremental: reuse translations of unchanged top-level statements
     """
+    unit_cache = TRANSPILE_UNIT_CACHE if incremental else None
+    profile_path = get_profile_path(profile_path)
+    profiler = VisitorProfiler() if profile_path else None
+    dr = None
+
     try:
-        print(f"🧠 [transpiler_main] called with {len(input_files)} file(s)")
-        print(f"📦 core_lib path: {path_to_core_libs}")
-        print(f"📄 files: {list(input_files.keys())}")
+        log.info("🧠 [transpiler_main] called with %s file(s)", len(input_files))
+        log.debug("📦 core_lib path: %s", path_to_core_libs)
+        log.debug("📄 files: %s", list(input_files.keys()))
 
         input_trees = {}
         output = {}
         transpiled_code = {}
+        units = {}
         dependencies = set()
         modules = []
+        uses_eval = False
 
         for k, v in input_files.items():
-            print(f"\n🧾 Parsing file: {k}")
+            log.debug("🧾 Parsing file: %s", k)
             try:
                 tree = ast.parse(v)
                 input_trees[k] = tree
             except Exception as parse_err:
-                print(f"❌ Failed to parse {k}: {parse_err}")
+                log.error("❌ Failed to parse %s: %s", k, parse_err)
                 raise
 
             extracted_modules = extract_imported_modules_from_tree(
@@ -4216,35 +4882,63 @@ def main(
             )
             modules += extracted_modules
 
-        print(f"\n📚 Found {len(modules)} external/core modules")
-        dr = DependencyResolver(
-            commit_hash, sql_conn, platform, imported_modules=modules
+        log.debug("📚 Found %s external/core modules", len(modules))
+        dr = create_dependency_resolver(
+            commit_hash,
+            sql_conn,
+            platform,
+            imported_modules=modules,
+            backend=resolver_backend,
         )
-        print(f"🧮 Current transpilation ID: {dr.current_id}")
+        log.debug("🧮 Current transpilation ID: %s", dr.current_id)
 
         for key, tree in input_trees.items():
-            print(f"\n🛠️ Transpiling {key}")
+            log.debug("🛠️ Transpiling %s", key)
             try:
-                at = ArduinoTranspiler(key, tree, dr, monitor_speed)
-                transpiled_code[key] = at.transpile()
-                module_dependencies = at.get_dependencies()
+                at = ArduinoTranspiler(
+                    key, tree, dr, monitor_speed, unit_cache=unit_cache
+                )
+                if profiler is not None:
+                    profiler.attach(at)
+
+                with profiler.profile(key) if profiler else nullcontext():
+                    transpiled_code[key] = at.transpile()
+                    module_dependencies = at.get_dependencies()
+                units[key] = at.units
+                uses_eval = uses_eval or at.uses_eval
+                dr.commit()
+
+                type_log.debug(
+                    "Type cache for %s: %s", key, at.type_analyzer.get_type_cache_stats()
+                )
+                if unit_cache is not None:
+                    log.debug("Unit cache: %s", unit_cache.get_stats())
 
                 for dependency in module_dependencies:
                     dependencies.add(dependency)
-                print(f"✅ {key} transpiled successfully")
+                log.debug("✅ %s transpiled successfully", key)
             except Exception as transpile_err:
-                print(f"❌ Transpilation failed for {key}: {transpile_err}")
+                log.error("❌ Transpilation failed for %s: %s", key, transpile_err)
                 raise
 
         output["code"] = transpiled_code
+        output["units"] = units
         output["dependencies"] = list(dependencies)
-        print(f"\n✅ Transpilation complete. Files: {list(transpiled_code.keys())}")
-        # dr.delete_all_tables()
+        # read the environment at transpile time, so not reusable
+        output["uses_eval"] = uses_eval
+        log.info("✅ Transpilation complete. Files: %s", list(transpiled_code.keys()))
         return output
 
     except Exception as e:
-        print(f"\n❌ [FATAL] transpiler_main crashed: {e}")
+        log.error("❌ [FATAL] transpiler_main crashed: %s", e)
         import traceback
 
         traceback.print_exc()
         raise
+
+    finally:
+        if dr is not None:
+            dr.close()
+        if profiler is not None:
+            profiler.write(profile_path)
+            log.info("⏱️ Visitor profile written to %s", profile_path)
@@ -0,0 +1,72 @@
+"""
+In-process cache of transpiled top-level statements.
+
+ArduinoTranspiler.visit_Module translates a module one top-level statement
+(import, global, FunctionDef, ...) at a time. Each statement is keyed by
+its AST dump plus a running digest of every change made to the resolver
+before it (core modules imported, globals, functions and imports inserted
+by earlier statements and modules), so a unit is only reused when
+everything it can see is unchanged. An entry holds the generated C++ and
+the side effects to replay on a hit: resolver inserts, dependencies and
+added imports.
+
+After a small edit in loop(), only loop() and the statements after it are
+transpiled again.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_UNITS = 4096
+
+
+class TranspileUnitCache:
+    def __init__(self, max_units=DEFAULT_MAX_UNITS):
+        self.max_units = max_units
+        self._units = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._units.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._units.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._units[key] = entry
+            self._units.move_to_end(key)
+            while len(self._units) > self.max_units:
+                self._units.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._units.clear()
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "units": len(self._units),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# shared by every transpile in this process
+TRANSPILE_UNIT_CACHE = TranspileUnitCache()
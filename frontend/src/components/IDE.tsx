@@ -99,7 +99,8 @@ const IDE: React.FC<IDEProps> = ({ projectId, isApiReady }) => {
   const [isCompiling, setIsCompiling] = useState(false);
   const [compilationResult, setCompilationResult] = useState<CompilationResult | null>(null);
   const [showCompilationResult, setShowCompilationResult] = useState(false);
-  const [pollingInterval, setPollingInterval] = useState<NodeJS.Timeout | null>(null);
+  // Long-poll loop waiting for the backend to report the build result
+  const statusWatchRef = useRef<{ cancelled: boolean } | null>(null);
   const [isResultMinimized, setIsResultMinimized] = useState(false);
   const [showProjectSettings, setShowProjectSettings] = useState(false);
   const [updatingProject, setUpdatingProject] = useState(false);
@@ -124,14 +125,15 @@ const IDE: React.FC<IDEProps> = ({ projectId, isApiReady }) => {
   const lastRequestKeyRef = useRef<string>("");
   const COMPLETION_CACHE_SIZE = 50;
 
-  // Cleanup polling on unmount
-  useEffect(() => {
-    return () => {
-      if (pollingInterval) {
-        clearInterval(pollingInterval);
-      }
-    };
-  }, [pollingInterval]);
+  const stopWatchingResults = useCallback(() => {
+    if (statusWatchRef.current) {
+      statusWatchRef.current.cancelled = true;
+      statusWatchRef.current = null;
+    }
+  }, []);
+
+  // Stop waiting for results on unmount
+  useEffect(() => stopWatchingResults, [stopWatchingResults]);
 
   // Fetch project + code and extract board info from metadata
   const fetchProject = useCallback(async () => {
@@ -188,10 +190,15 @@ const IDE: React.FC<IDEProps> = ({ projectId, isApiReady }) => {
     fetchProject();
   }, [fetchProject]);
 
- // Poll for compilation results
-const startPollingForResults = useCallback(async () => {
+ // Wait for compilation results: the backend answers wait_compile_status
+ // as soon as the status changes, so there is no polling interval
+const watchForResults = useCallback(async (sessionId?: string) => {
   if (!projectId || !window.pywebview?.api) return;
 
+  stopWatchingResults();
+  const watch = { cancelled: false };
+  statusWatchRef.current = watch;
+
   // helper to normalize specs into a consistent shape
   const normalizeSpecs = (specs: any): CompilationResult["specs"] => {
     if (
@@ -209,55 +216,57 @@ const startPollingForResults = useCallback(async () => {
     };
   };
 
-  const poll = async () => {
-    try {
-      if (!window.pywebview?.api?.get_compile_status) {
-        console.warn("PyWebView API not available yet");
-        return;
-      }
-      const status = await window.pywebview.api.get_compile_status(projectId);
-
-      if (status && status.completed) {
-        // Stop polling
-        if (pollingInterval) {
-          clearInterval(pollingInterval);
-          setPollingInterval(null);
-        }
-
-        setIsCompiling(false);
+  const showResult = (status: any) => {
+    setIsCompiling(false);
+
+    // Normalize and format result safely
+    const formattedResult: CompilationResult = {
+      success: status.success ?? false,
+      error: status.error ?? "",
+      warnings: Array.isArray(status.warnings) ? status.warnings : [],
+      suggestions: Array.isArray(status.suggestions) ? status.suggestions : [],
+      // Remove the message property since it's not in CompilationResult
+      specs: normalizeSpecs(status.specs),
+    };
 
-        // Normalize and format result safely
-        const formattedResult: CompilationResult = {
-          success: status.success ?? false,
-          error: status.error ?? "",
-          warnings: Array.isArray(status.warnings) ? status.warnings : [],
-          suggestions: Array.isArray(status.suggestions) ? status.suggestions : [],
-          // Remove the message property since it's not in CompilationResult
-          specs: normalizeSpecs(status.specs),
-        };
+    setCompilationResult(formattedResult);
+    setShowCompilationResult(true);
+    setIsResultMinimized(false);
 
-        setCompilationResult(formattedResult);
-        setShowCompilationResult(true);
-        setIsResultMinimized(false);
+    if (formattedResult.success) {
+      message.success("✅ Compilation successful!");
+    } else {
+      message.error("❌ Compilation failed");
+    }
+  };
 
-        if (formattedResult.success) {
-          message.success("✅ Compilation successful!");
-        } else {
-          message.error("❌ Compilation failed");
-        }
+  // seq 0 returns the current status straight away; results of an older
+  // build are skipped by comparing session ids
+  let since = 0;
+  while (!watch.cancelled) {
+    try {
+      if (!window.pywebview?.api?.wait_compile_status) {
+        console.warn("PyWebView API not available yet");
+        await new Promise((resolve) => setTimeout(resolve, 500));
+        continue;
+      }
+      const update = await window.pywebview.api.wait_compile_status(projectId, since, 25);
+      if (watch.cancelled) break;
+      since = update.seq;
+
+      const status = update.status;
+      const isOurBuild = !sessionId || status?.session_id === sessionId;
+      if (status && status.completed && isOurBuild) {
+        stopWatchingResults();
+        showResult(status);
+        break;
       }
     } catch (err) {
-      console.error("❌ Error polling compilation status:", err);
+      console.error("❌ Error waiting for compilation status:", err);
+      await new Promise((resolve) => setTimeout(resolve, 1000));
     }
-  };
-
-  // Start polling every 2 seconds
-  const interval = setInterval(poll, 2000);
-  setPollingInterval(interval);
-
-  // Initial poll
-  poll();
-}, [projectId, project, pollingInterval]);
+  }
+}, [projectId, stopWatchingResults]);
 
   // Linting
   const lintCode = useCallback(
@@ -528,8 +537,8 @@ const startPollingForResults = useCallback(async () => {
       
       if (result.success) {
         message.info("🔄 Compilation scheduled...");
-        // Start polling for results
-        startPollingForResults();
+        // Wait for the result to be pushed back
+        watchForResults(result.session_id);
       } else {
         setIsCompiling(false);
         message.error(`❌ Failed to schedule compilation: ${result.error}`);
@@ -561,11 +570,8 @@ const startPollingForResults = useCallback(async () => {
     setIsResultMinimized(false);
     setCompilationResult(null);
     
-    // Stop any existing polling
-    if (pollingInterval) {
-      clearInterval(pollingInterval);
-      setPollingInterval(null);
-    }
+    // Stop waiting for a previous result
+    stopWatchingResults();
     
     handleCompile();
   };
@@ -579,11 +585,8 @@ const startPollingForResults = useCallback(async () => {
     setShowCompilationResult(false);
     setIsResultMinimized(true);
     
-    // Stop polling when user manually closes
-    if (pollingInterval) {
-      clearInterval(pollingInterval);
-      setPollingInterval(null);
-    }
+    // Stop waiting when user manually closes
+    stopWatchingResults();
   };
 
   const handleToggleResult = () => {
@@ -601,11 +604,8 @@ const startPollingForResults = useCallback(async () => {
     setIsResultMinimized(false);
     setCompilationResult(null);
     
-    // Stop polling
-    if (pollingInterval) {
-      clearInterval(pollingInterval);
-      setPollingInterval(null);
-    }
+    // Stop waiting for the result
+    stopWatchingResults();
   };
 
   // Project settings handlers
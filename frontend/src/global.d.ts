@@ -2,6 +2,69 @@
 export {};
 
 declare global {
+  //
+  // --- Package prefetch progress pushed by the backend (see core/prefetch.py) ---
+  //
+  interface PrefetchStatus {
+    state: "disabled" | "idle" | "skipped" | "running" | "done" | "failed";
+    percent?: number;
+    done?: number;
+    total?: number;
+    current?: string | null;
+    failed?: string[];
+    updated_at?: number;
+  }
+
+  //
+  // --- Compile status pushed by the backend (see core/compile_status.py) ---
+  //
+  interface CompileStatusSnapshot {
+    state?: "queued" | "transpiling" | "compiling" | "uploading" | "done" | "failed" | "cancelled";
+    percent?: number;
+    seq?: number;
+    project_id?: string;
+    updated_at?: number;
+    completed?: boolean;
+    success?: boolean;
+    in_progress?: boolean;
+    message?: string;
+    error?: string;
+    warnings?: string[];
+    specs?: Record<string, any>;
+    suggestions?: string[];
+    exists?: boolean;
+    session_id?: string | null;
+    results?: Array<{
+      board: string;
+      platform: string | null;
+      success: boolean;
+      session_id?: string;
+      specs?: Record<string, any>;
+      error?: string | null;
+    }> | null;
+    queue?: {
+      state: "queued" | "running" | null;
+      queue_depth: number;
+      running: number;
+      workers: number;
+      avg_wait: number;
+      max_wait: number;
+      wait_time?: number;
+      coalesced?: number;
+      queue_position?: number;
+      background?: boolean;
+    };
+    size_report?: Record<string, any> | null;
+    // background build started on save (opt-in per project)
+    speculative?: {
+      state: "queued" | "building" | "ready" | "failed";
+      session_id: string;
+      board: string;
+      error?: string | null;
+      finished_at?: number;
+    } | null;
+  }
+
   //
   // --- PyWebView API typing (backend -> frontend bridge) ---
   //
@@ -68,19 +131,34 @@ declare global {
       project_id: string,
       upload?: boolean,
       port?: string | null
-    ) => Promise<{ success: boolean; message?: string; error?: string }>;
+    ) => Promise<{
+      success: boolean;
+      message?: string;
+      error?: string;
+      session_id?: string;
+    }>;
     get_compile_status: (
       project_id: string
+    ) => Promise<CompileStatusSnapshot>;
+    get_prefetch_status: () => Promise<PrefetchStatus>;
+    compile_matrix: (
+      project_id: string,
+      board_ids?: string[]
     ) => Promise<{
-      completed?: boolean;
-      success?: boolean;
-      in_progress?: boolean;
+      success: boolean;
       message?: string;
       error?: string;
-      warnings?: string[];
-      specs?: Record<string, any>;
-      suggestions?: string[];
-      exists?: boolean;
+      session_id?: string;
+    }>;
+    wait_compile_status: (
+      project_id: string,
+      since?: number,
+      timeout?: number
+    ) => Promise<{
+      seq: number;
+      status: CompileStatusSnapshot | null;
+      events: CompileStatusSnapshot[];
+      truncated: boolean;
     }>;
     cancel_compile: (
       project_id: string
@@ -146,6 +224,12 @@ declare global {
 
     /** Called when compiler/PlatformIO logs stream in */
     __appendTerminalLog?: (line: string) => void;
+
+    /** Fired when the backend pushes a compile status transition */
+    __onCompileStatus?: (status: CompileStatusSnapshot) => void;
+
+    /** Fired when the startup package prefetch makes progress */
+    __onPrefetchStatus?: (status: PrefetchStatus) => void;
   }
 
   //
@@ -114,6 +114,8 @@ const IDEPage: React.FC = () => {
         begin_transpile: 10,
         end_transpile: 25,
         begin_compile: 40,
+        compile_cache_miss: 35,
+        compile_cache_hit: 65,
         end_compile: 70,
         start_upload: 80,
         end_upload: 95,
@@ -304,13 +306,24 @@ const IDEPage: React.FC = () => {
             }
         };
 
+        // Status transitions pushed by the backend carry a finer percentage
+        // (compiled objects, esptool upload progress) than the phase map
+        const handleCompileStatus = (status: any) => {
+            if (!status || status.project_id !== projectId || typeof status.percent !== "number") return;
+            if (status.state === "compiling" || status.state === "uploading") {
+                setProgressPercent(status.percent);
+            }
+        };
+
         // Assign handlers to window
         window.__onCompilerEvent = handleCompilerEvent;
         window.__appendTerminalLog = handleTerminalLog;
+        window.__onCompileStatus = handleCompileStatus;
 
         return () => {
             window.__onCompilerEvent = undefined;
             window.__appendTerminalLog = undefined;
+            window.__onCompileStatus = undefined;
         };
     }, [progressPercent, isUploading, hasCompilationError, hasUploadError, showUploadLogs, phaseProgress, sessionId, projectId, ongoingCompilation, uploadLogs]);
 
@@ -471,6 +484,8 @@ const IDEPage: React.FC = () => {
             case "begin_transpile": return "Preparing code...";
             case "end_transpile": return "Code preparation complete";
             case "begin_compile": return "Compiling firmware...";
+            case "compile_cache_hit": return "Reusing previous firmware";
+            case "compile_cache_miss": return "Compiling firmware...";
             case "end_compile": return "Compilation successful";
             case "start_upload": return "Uploading to device...";
             case "end_upload": return "Upload complete!";
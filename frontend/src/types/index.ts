@@ -33,6 +33,21 @@ export interface CompileStatus {
   specs?: any;
   status?: string;
   message?: string;
+  session_id?: string | null;
+  queue?: CompileQueueStatus;
+}
+
+export interface CompileQueueStatus {
+  state: "queued" | "running" | null;
+  queue_depth: number;
+  running: number;
+  workers: number;
+  avg_wait: number;
+  max_wait: number;
+  session_id?: string;
+  wait_time?: number;
+  coalesced?: number;
+  queue_position?: number;
 }
 
 export interface CompletionItem {
@@ -0,0 +1,23 @@
+"""
+pytest setup for the unit tests in tests/.
+
+The other test_*.py files here (and under core_libs/) are sample sketches
+for the transpiler, not pytest modules. core.db creates the app dir and its
+database on import, so HOME points at a throwaway directory first.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT_DIR, "tests", "fixtures")
+
+_home = tempfile.mkdtemp(prefix="mojoscale_tests_")
+os.environ["HOME"] = _home
+os.environ["USERPROFILE"] = _home
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+collect_ignore_glob = ["test_py*.py", "core_libs/*"]
@@ -0,0 +1,9 @@
+/* Source of sizes.o: gcc -Os -c -fno-asynchronous-unwind-tables -fno-ident sizes.c */
+int counter = 3;
+int table[16] = {1};
+static char buffer[100];
+const char message[] = "hello";
+
+char *get_buffer(void) { return buffer; }
+
+int add(int a, int b) { return a + b + counter + table[1] + message[0]; }
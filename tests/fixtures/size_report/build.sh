@@ -0,0 +1,13 @@
+#!/bin/sh
+# Rebuilds firmware.elf and firmware.map, run from this directory.
+# The object paths mimic a PlatformIO build so the linker map classifies them.
+set -e
+B=.pio/build/esp32dev
+mkdir -p $B/src $B/lib0a1
+CXXFLAGS="-Os -fno-exceptions -fno-rtti -fno-asynchronous-unwind-tables -fno-ident -fno-pie -ffunction-sections -fdata-sections -fno-threadsafe-statics -Iinclude"
+g++ $CXXFLAGS -c src/main.ino.cpp -o $B/src/main.ino.cpp.o
+g++ $CXXFLAGS -c lib/filter.cpp -o $B/lib0a1/filter.cpp.o
+ar rcs $B/lib0a1/libFilter.a $B/lib0a1/filter.cpp.o
+g++ -nostdlib -static -no-pie -Wl,--build-id=none -Wl,-e,_Z5setupv -Wl,--undefined=_Z12apply_filterf \
+    -Wl,-Map,firmware.map -o firmware.elf $B/src/main.ino.cpp.o $B/lib0a1/libFilter.a
+rm -rf .pio
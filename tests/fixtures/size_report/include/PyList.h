@@ -0,0 +1,13 @@
+#pragma once
+
+class PyList {
+public:
+    int items[32];
+    int count = 0;
+
+    void append(int value) {
+        static int appended = 0;
+        appended++;
+        items[count++] = value;
+    }
+};
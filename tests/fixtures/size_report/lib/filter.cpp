@@ -0,0 +1,6 @@
+float filter_state[24];
+
+float apply_filter(float value) {
+    filter_state[0] = value * 0.5f + filter_state[1];
+    return filter_state[0];
+}
@@ -0,0 +1,16 @@
+from PyList import PyList
+
+readings = PyList()
+sensor_history = [0] * 64
+
+
+def blink(times: int) -> int:
+    return times
+
+
+def setup() -> None:
+    readings.append(1)
+
+
+def loop() -> None:
+    blink(1)
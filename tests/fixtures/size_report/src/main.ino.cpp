@@ -0,0 +1,29 @@
+#include "PyList.h"
+
+int blink(int times);
+int count_seed();
+
+PyList readings;
+int sensor_history[64];
+
+int blink(int times) {
+    static int calls = 0;
+    calls += times;
+    return calls;
+}
+
+void setup() {
+    static char banner[48] = "size report fixture";
+    banner[1] = banner[count_seed()];
+    readings.append(banner[0]);
+}
+
+void loop() {
+    static int count = 0;
+    count = blink(count);
+    sensor_history[count & 63] = count;
+}
+
+int count_seed() {
+    return sensor_history[0] & 7;
+}
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from core import compiler
+from core.compiler import prune_build_cache
+
+
+def _write(path, size, mtime):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def cache_root(tmp_path):
+    root = tmp_path / ".platformio" / compiler.BUILD_CACHE_DIR_NAME
+    board = root / "esp32dev-0123456789abcdef"
+    _write(str(board / "aa" / "old.o"), 100, 1000)
+    _write(str(board / "bb" / "new.o"), 100, 3000)
+    _write(str(board / "pch" / "key" / "PyRuntime.h.gch"), 500, 10)
+    return root
+
+
+def _files(root):
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+        for dirpath, _, names in os.walk(root)
+        for name in names
+    )
+
+
+def test_prune_evicts_oldest_objects_but_not_the_pch(tmp_path, cache_root):
+    prune_build_cache(str(tmp_path), max_bytes=150)
+
+    assert _files(cache_root) == [
+        compiler.BUILD_CACHE_PRUNE_MARKER,
+        "esp32dev-0123456789abcdef/bb/new.o",
+        "esp32dev-0123456789abcdef/pch/key/PyRuntime.h.gch",
+    ]
+
+
+def test_prune_skips_the_walk_until_the_cache_grows(tmp_path, cache_root, monkeypatch):
+    prune_build_cache(str(tmp_path), max_bytes=1000)
+
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(
+        compiler.os, "walk", lambda *a, **kw: walks.append(a) or real_walk(*a, **kw)
+    )
+
+    prune_build_cache(str(tmp_path), max_bytes=1000)
+    assert walks == []
+
+    bucket = cache_root / "esp32dev-0123456789abcdef" / "cc"
+    _write(str(bucket / "added.o"), 100, 4000)
+    prune_build_cache(str(tmp_path), max_bytes=250)
+    assert len(walks) == 1
+    assert "esp32dev-0123456789abcdef/aa/old.o" not in _files(cache_root)
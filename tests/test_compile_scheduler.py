@@ -0,0 +1,123 @@
+import asyncio
+
+from core.compile_scheduler import CompileScheduler
+
+
+async def _noop(job):
+    pass
+
+
+def _board_request(upload=False, port=None, code="pass"):
+    return {
+        "board": "esp32dev",
+        "platform": "espressif32",
+        "code_files": {"main.py": code},
+        "upload": upload,
+        "port": port,
+    }
+
+
+def _matrix_request(code="pass"):
+    return {"boards": ["esp32dev", "uno"], "code_files": {"main.py": code}}
+
+
+def test_compile_request_keeps_a_waiting_upload():
+    async def scenario():
+        scheduler = CompileScheduler(_noop, workers=1)
+        upload = await scheduler.submit(
+            "p1", _board_request(upload=True, port="/dev/ttyUSB0", code="v1")
+        )
+        compile_only = await scheduler.submit("p1", _board_request(code="v2"))
+        return scheduler, upload, compile_only
+
+    scheduler, upload, compile_only = asyncio.run(scenario())
+
+    assert compile_only is upload
+    assert upload.coalesced == 1
+    assert upload.request["upload"] is True
+    assert upload.request["port"] == "/dev/ttyUSB0"
+    assert upload.request["code_files"] == {"main.py": "v2"}
+    assert len(scheduler.pending) == 1
+
+
+def test_newer_upload_request_wins():
+    async def scenario():
+        scheduler = CompileScheduler(_noop, workers=1)
+        job = await scheduler.submit("p1", _board_request())
+        await scheduler.submit("p1", _board_request(upload=True, port="COM3"))
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.request["upload"] is True
+    assert job.request["port"] == "COM3"
+
+
+def test_matrix_and_single_board_requests_do_not_coalesce():
+    async def scenario():
+        scheduler = CompileScheduler(_noop, workers=1)
+        upload = await scheduler.submit("p1", _board_request(upload=True))
+        matrix = await scheduler.submit("p1", _matrix_request())
+        return scheduler, upload, matrix
+
+    scheduler, upload, matrix = asyncio.run(scenario())
+
+    assert matrix is not upload
+    assert upload.request["upload"] is True
+    assert "boards" in matrix.request
+    assert scheduler.has_pending("p1")
+    assert scheduler.get_job_status("p1")["session_id"] == upload.session.id
+
+    # one build per project at a time, oldest first
+    assert scheduler._next_job() is upload
+    assert scheduler._next_job() is None
+    scheduler.running.pop("p1")
+    assert scheduler._next_job() is matrix
+
+
+def test_compile_request_preempting_an_upload_keeps_the_upload():
+    async def scenario():
+        scheduler = CompileScheduler(_noop, workers=1)
+        running = await scheduler.submit(
+            "p1", _board_request(upload=True, port="COM3", code="v1")
+        )
+        assert scheduler._next_job() is running
+        running.session.quiet = True
+
+        job = await scheduler.submit("p1", _board_request(code="v2"))
+        return running, job
+
+    running, job = asyncio.run(scenario())
+
+    assert running.preempted and running.session.cancelled
+    assert job.request["upload"] is True
+    assert job.request["port"] == "COM3"
+    assert job.request["code_files"] == {"main.py": "v2"}
+
+
+def test_matrix_request_does_not_preempt_a_single_board_build():
+    async def scenario():
+        scheduler = CompileScheduler(_noop, workers=1)
+        running = await scheduler.submit("p1", _board_request(upload=True))
+        scheduler._next_job()
+        matrix = await scheduler.submit("p1", _matrix_request())
+        return running, matrix
+
+    running, matrix = asyncio.run(scenario())
+
+    assert not running.preempted
+    assert not running.session.cancelled
+    assert matrix.request == _matrix_request()
+
+
+def test_cancel_drops_every_waiting_job_of_the_project():
+    async def scenario():
+        scheduler = CompileScheduler(_noop, workers=1)
+        await scheduler.submit("p1", _board_request())
+        await scheduler.submit("p1", _matrix_request())
+        await scheduler.submit("p2", _board_request())
+        assert await scheduler.cancel("p1")
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert not scheduler.has_pending("p1")
+    assert scheduler.has_pending("p2")
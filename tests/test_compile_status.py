@@ -0,0 +1,64 @@
+import threading
+
+from core.compile_status import CompileStatusStore
+
+
+def test_not_truncated_by_other_projects_evictions():
+    store = CompileStatusStore(history_size=4)
+    store.set("a", {"state": "queued"})
+    since = store.get("a")["seq"]
+
+    # other projects push the rest of the history out
+    for i in range(6):
+        store.set("b", {"state": "compiling", "percent": i})
+
+    result = store.wait("a", since=since, timeout=0)
+    assert result["events"] == []
+    assert not result["truncated"]
+
+    store.set("a", {"state": "done"})
+    result = store.wait("a", since=since, timeout=0)
+    assert [e["state"] for e in result["events"]] == ["done"]
+    assert not result["truncated"]
+
+
+def test_truncated_when_own_transitions_were_evicted():
+    store = CompileStatusStore(history_size=3)
+    store.set("a", {"state": "queued"})
+    since = store.get("a")["seq"]
+
+    store.set("a", {"state": "transpiling"})
+    store.set("b", {"state": "queued"})
+    store.set("b", {"state": "compiling"})
+    store.set("a", {"state": "compiling"})
+
+    result = store.wait("a", since=since, timeout=0)
+    assert [e["state"] for e in result["events"]] == ["compiling"]
+    assert result["truncated"]
+
+    # every transition evicted
+    for i in range(3):
+        store.set("b", {"state": "compiling", "percent": i})
+    result = store.wait("a", since=since, timeout=0)
+    assert result["events"] == []
+    assert result["truncated"]
+    assert result["status"]["state"] == "compiling"
+
+
+def test_snapshots_are_published_in_seq_order():
+    published = []
+    store = CompileStatusStore(publish=published.append)
+
+    def worker(project_id):
+        for i in range(200):
+            store.update(project_id, percent=i)
+
+    threads = [threading.Thread(target=worker, args=(p,)) for p in "abcd"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    seqs = [snapshot["seq"] for snapshot in published]
+    assert seqs == sorted(seqs)
+    assert len(seqs) == 800
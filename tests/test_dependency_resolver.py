@@ -0,0 +1,41 @@
+import ast
+import sqlite3
+
+import pytest
+
+from core.transpiler.transpiler import (
+    create_dependency_resolver,
+    extract_imported_modules_from_tree,
+)
+
+
+@pytest.fixture
+def core_libs(tmp_path):
+    (tmp_path / "good.py").write_text(
+        '__include_modules__ = "Good.h"\n'
+        '__dependencies__ = "someone/GoodLib"\n\n\n'
+        "def blink(times: int) -> None:\n"
+        "    pass\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "broken.py").write_text("def oops(:\n", encoding="utf-8")
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_core_module_with_syntax_error_is_skipped(core_libs, backend):
+    tree = ast.parse("import good\nimport broken\nimport missing\n")
+    modules = extract_imported_modules_from_tree(tree, core_libs)
+    # a missing file is dropped here, a broken one only when it is parsed
+    assert [m["name"] for m in modules] == ["good", "broken"]
+
+    resolver = create_dependency_resolver(
+        "test_resolver",
+        sqlite3.connect(":memory:"),
+        "espressif32",
+        imported_modules=modules,
+        backend=backend,
+    )
+
+    assert resolver.get_module_dependencies("good") == "someone/GoodLib"
+    assert resolver.get_module_dependencies("broken") is None
@@ -0,0 +1,168 @@
+import threading
+
+import pytest
+
+from core.event_stream import EventBatcher
+
+
+def _event(text, phase="begin_compile", level="info", session_id="s1"):
+    return {"phase": phase, "text": text, "level": level, "session_id": session_id}
+
+
+@pytest.fixture
+def batches():
+    return []
+
+
+@pytest.fixture
+def batcher(batches, monkeypatch):
+    batcher = EventBatcher(dispatch=batches.append, max_batch=100, max_pending=4)
+    # flushed by the tests instead of the dispatcher thread
+    monkeypatch.setattr(batcher, "_ensure_thread", lambda: None)
+    return batcher
+
+
+def _texts(batch):
+    return [event["text"] for event in batch]
+
+
+def test_progress_lines_are_condensed(batcher, batches):
+    batcher.push(_event("Building in release mode"))
+    batcher.push(_event("Compiling a.o"))
+    batcher.push(_event("Compiling b.o"))
+    batcher.push(_event("Compiling c.o"))
+    batcher.push(_event("Linking firmware.elf"))
+    batcher.flush()
+
+    assert len(batches) == 1
+    events = batches[0]
+    assert _texts(events) == [
+        "Building in release mode",
+        "Compiling c.o",
+        "Linking firmware.elf",
+    ]
+    assert events[1]["repeat"] == 3
+    assert batcher.stats["condensed"] == 2
+
+
+def test_exact_repeats_are_folded(batcher, batches):
+    batcher.push(_event("Looking for upload port"))
+    for _ in range(3):
+        batcher.push(_event("waiting for port"))
+    batcher.push(_event("port found"))
+    batcher.flush()
+
+    assert _texts(batches[0]) == [
+        "Looking for upload port",
+        "waiting for port",
+        "port found",
+    ]
+    assert batches[0][1]["repeat"] == 3
+
+
+def test_phase_changes_and_errors_are_kept(batcher, batches):
+    batcher.push(_event("Compiling a.o"))
+    batcher.push(_event("Compiling b.o", level="warning"))
+    batcher.push(_event("Compiling c.o"))
+    batcher.push(_event("Compiling d.o", phase="end_compile"))
+    batcher.flush()
+
+    assert _texts(batches[0]) == [
+        "Compiling a.o",
+        "Compiling b.o",
+        "Compiling c.o",
+        "Compiling d.o",
+    ]
+
+
+def test_sessions_are_not_condensed_together(batcher, batches):
+    batcher.push(_event("Compiling a.o", session_id="s1"))
+    batcher.push(_event("Compiling a.o", session_id="s2"))
+    batcher.flush()
+
+    assert [e["session_id"] for e in batches[0]] == ["s1", "s2"]
+
+
+def test_skipped_lines_are_summarised_where_they_were_dropped(batcher, batches):
+    batcher.push(_event("start"))
+    for i in range(3):
+        batcher.push(_event(f"line {i}"))
+    # the queue is full, these are dropped
+    for i in range(3, 8):
+        batcher.push(_event(f"line {i}"))
+    batcher.push(_event("undefined reference", level="error"))
+    batcher.push(_event("Linking done", phase="end_compile"))
+    batcher.flush()
+
+    assert _texts(batches[0]) == [
+        "start",
+        "line 0",
+        "line 1",
+        "line 2",
+        "... 5 lines skipped",
+        "undefined reference",
+        "Linking done",
+    ]
+    assert batches[0][4]["phase"] == "begin_compile"
+    assert batcher.stats["dropped"] == 5
+
+
+def test_drops_after_a_kept_event_get_a_new_summary(batcher, batches):
+    for i in range(4):
+        batcher.push(_event(f"line {i}"))
+    batcher.push(_event("dropped 1"))
+    batcher.push(_event("warning", level="warning"))
+    batcher.push(_event("dropped 2"))
+    batcher.push(_event("dropped 3"))
+    batcher.flush()
+
+    assert _texts(batches[0])[4:] == [
+        "... 1 lines skipped",
+        "warning",
+        "... 2 lines skipped",
+    ]
+
+    # a flush starts over
+    batcher.push(_event("after"))
+    batcher.flush()
+    assert _texts(batches[1]) == ["after"]
+
+
+def test_important_events_are_never_dropped(batcher, batches):
+    for i in range(4):
+        batcher.push(_event(f"line {i}"))
+    batcher.push({"type": "status", "status": {"seq": 1}}, important=True)
+    batcher.flush()
+
+    assert batches[0][-1] == {"type": "status", "status": {"seq": 1}}
+
+
+def test_empty_flush_sends_nothing(batcher, batches):
+    batcher.flush()
+    assert batches == []
+
+
+def test_dispatch_errors_are_swallowed(monkeypatch):
+    def dispatch(events):
+        raise RuntimeError("window closed")
+
+    batcher = EventBatcher(dispatch=dispatch)
+    monkeypatch.setattr(batcher, "_ensure_thread", lambda: None)
+    batcher.push(_event("line"))
+    batcher.flush()
+    assert batcher.stats["batches"] == 1
+
+
+def test_dispatcher_thread_flushes_important_events():
+    delivered = threading.Event()
+    batches = []
+
+    def dispatch(events):
+        batches.append(events)
+        delivered.set()
+
+    batcher = EventBatcher(dispatch=dispatch, interval=60)
+    batcher.push(_event("done", phase="all_done"))
+
+    assert delivered.wait(5)
+    assert _texts(batches[0]) == ["done"]
@@ -0,0 +1,197 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import FIXTURES_DIR
+import core.compiler as compiler
+from core.elf import ElfError, ElfFile, get_size_totals
+
+
+def read_log(name):
+    with open(os.path.join(FIXTURES_DIR, "platformio", name), encoding="utf-8") as f:
+        return f.read()
+
+
+ELF_FIXTURE = os.path.join(FIXTURES_DIR, "elf", "sizes.o")
+
+
+def test_parse_memory_usage_avr():
+    specs = compiler.parse_memory_usage(read_log("uno_build.log"))
+
+    assert specs == {
+        "ram": {"used": 188, "total": 2048, "percent": 9.2},
+        "flash": {"used": 1808, "total": 32256, "percent": 5.6},
+    }
+
+
+def test_parse_memory_usage_esp32():
+    specs = compiler.parse_memory_usage(read_log("esp32dev_build.log"))
+
+    assert specs["ram"] == {"used": 21344, "total": 327680, "percent": 6.5}
+    assert specs["flash"] == {"used": 267641, "total": 1310720, "percent": 20.4}
+
+
+def test_parse_memory_usage_without_usage_lines():
+    assert compiler.parse_memory_usage(read_log("failed_build.log")) == {}
+
+
+def test_parse_platformio_result():
+    success = compiler.parse_platformio_result(read_log("esp32dev_build.log"), "")
+    failed = compiler.parse_platformio_result(read_log("failed_build.log"), "")
+
+    assert success["success"] is True
+    assert success["specs"]["flash"]["used"] == 267641
+    assert failed["success"] is False
+    assert failed["specs"] == {}
+
+
+def test_elf_size_totals():
+    # the same numbers `size tests/fixtures/elf/sizes.o` prints
+    totals = get_size_totals(ElfFile.from_path(ELF_FIXTURE))
+
+    assert totals["text"] == 33
+    assert totals["data"] == 68
+    assert totals["bss"] == 100
+    assert totals["total"] == 201
+    assert totals["sections"] == {".text": 27, ".data": 68, ".bss": 100, ".rodata": 6}
+
+
+def test_elf_symbols():
+    symbols = {s.name: s for s in ElfFile.from_path(ELF_FIXTURE).get_symbols()}
+
+    assert {name: s.size for name, s in symbols.items()} == {
+        "counter": 4,
+        "table": 64,
+        "buffer": 100,
+        "message": 6,
+        "get_buffer": 8,
+        "add": 19,
+    }
+    assert symbols["buffer"].section.name == ".bss"
+
+
+def test_elf_rejects_other_files():
+    with pytest.raises(ElfError):
+        ElfFile(b"not an elf file")
+
+
+def make_build_dir(tmp_path, board, elf_path=None):
+    build_dir = tmp_path / "build"
+    firmware_dir = build_dir / ".pio" / "build" / board
+    firmware_dir.mkdir(parents=True)
+    if elf_path is not None:
+        shutil.copyfile(elf_path, firmware_dir / "firmware.elf")
+    return str(build_dir)
+
+
+def test_add_elf_specs(tmp_path):
+    build_dir = make_build_dir(tmp_path, "esp32dev", ELF_FIXTURE)
+    specs = compiler.parse_memory_usage(read_log("esp32dev_build.log"))
+
+    result = compiler.add_elf_specs(specs, build_dir, "esp32dev")
+
+    assert result["elf"]["bss"] == 100
+    assert result["additional"] == {
+        ".text": "33 bytes",
+        ".data": "68 bytes",
+        ".bss": "100 bytes",
+    }
+    assert result["ram"] == specs["ram"]
+    assert "elf" not in specs
+
+
+def test_add_elf_specs_without_firmware(tmp_path):
+    build_dir = make_build_dir(tmp_path, "esp32dev")
+    specs = {"ram": {"used": 1, "total": 2, "percent": 50.0}}
+
+    assert compiler.add_elf_specs(specs, build_dir, "esp32dev") == specs
+
+
+def test_add_elf_specs_with_broken_firmware(tmp_path):
+    broken = tmp_path / "broken.elf"
+    broken.write_bytes(b"\x7fELF garbage")
+    build_dir = make_build_dir(tmp_path, "uno", broken)
+
+    assert compiler.add_elf_specs({}, build_dir, "uno") == {}
+
+
+@pytest.fixture
+def build_history(monkeypatch):
+    """Stand-in for the build history table: (previous record, recorded)."""
+    history = {"previous": None, "recorded": []}
+    monkeypatch.setattr(
+        compiler, "get_last_build", lambda project_id, board: history["previous"]
+    )
+    monkeypatch.setattr(
+        compiler,
+        "record_build",
+        lambda *args, **kwargs: history["recorded"].append((args, kwargs)),
+    )
+    return history
+
+
+def ram_specs(used, total=327680):
+    return {
+        "ram": {"used": used, "total": total, "percent": round(used * 100 / total, 1)},
+        "flash": {"used": 267641, "total": 1310720, "percent": 20.4},
+    }
+
+
+def test_record_build_specs_warns_about_ram_regression(build_history):
+    build_history["previous"] = {"ram_used": 21344, "flash_used": 260000}
+    specs = ram_specs(21344 + compiler.RAM_REGRESSION_BYTES)
+
+    warnings = compiler.record_build_specs("p1", "esp32dev", "espressif32", specs)
+
+    assert len(warnings) == 1
+    assert "RAM use grew by 2048 bytes" in warnings[0]
+    assert specs["additional"]["RAM change"] == "+2048 bytes"
+    assert specs["additional"]["Flash change"] == "+7641 bytes"
+    assert len(build_history["recorded"]) == 1
+
+
+def test_record_build_specs_small_growth(build_history):
+    build_history["previous"] = {"ram_used": 21344, "flash_used": 267641}
+    specs = ram_specs(21344 + compiler.RAM_REGRESSION_BYTES - 1)
+
+    assert compiler.record_build_specs("p1", "esp32dev", "espressif32", specs) == []
+    assert specs["additional"]["RAM change"] == "+2047 bytes"
+
+
+def test_record_build_specs_first_build(build_history):
+    specs = ram_specs(21344)
+
+    assert compiler.record_build_specs("p1", "esp32dev", "espressif32", specs) == []
+    assert "RAM change" not in specs["additional"]
+
+
+def test_record_build_specs_skips_reused_firmware(build_history):
+    build_history["previous"] = {
+        "ram_used": 21344,
+        "flash_used": 267641,
+        "digest": "abc",
+    }
+
+    compiler.record_build_specs(
+        "p1", "esp32dev", "espressif32", ram_specs(21344), "abc", cached=True
+    )
+    assert build_history["recorded"] == []
+
+    # a cache hit on older firmware, or a real build, is recorded
+    compiler.record_build_specs(
+        "p1", "esp32dev", "espressif32", ram_specs(21344), "def", cached=True
+    )
+    compiler.record_build_specs(
+        "p1", "esp32dev", "espressif32", ram_specs(21344), "abc"
+    )
+    assert len(build_history["recorded"]) == 2
+
+
+def test_record_build_specs_warns_about_full_ram(build_history):
+    specs = ram_specs(1900, total=2048)
+
+    warnings = compiler.record_build_specs("p1", "uno", "atmelavr", specs)
+
+    assert len(warnings) == 1
+    assert "92.8%" in warnings[0]
@@ -0,0 +1,290 @@
+import io
+import json
+import os
+import tarfile
+import threading
+
+import pytest
+
+from core.package_mirror import (
+    DirectoryRegistry,
+    PackageMirror,
+    get_manifest_dependencies,
+    mirror_lib_deps,
+    parse_dependency,
+    pick_version,
+    read_archive_manifest,
+    version_satisfies,
+)
+
+
+def write_archive(root, owner, name, version, dependencies=()):
+    """A library archive as the registry serves it, laid out like the mirror."""
+    manifest = {"name": name, "version": version, "dependencies": list(dependencies)}
+    owner_dir = os.path.join(root, owner)
+    os.makedirs(owner_dir, exist_ok=True)
+    path = os.path.join(owner_dir, f"{name.replace(' ', '_')}@{version}.tar.gz")
+    with tarfile.open(path, "w:gz") as archive:
+        for filename, data in (
+            ("library.json", json.dumps(manifest).encode("utf-8")),
+            ("src/library.h", b"#pragma once\n"),
+        ):
+            info = tarfile.TarInfo(filename)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return path
+
+
+@pytest.fixture
+def registry_dir(tmp_path):
+    """Stand-in for the PlatformIO registry."""
+    root = str(tmp_path / "registry")
+    write_archive(root, "bblanchon", "ArduinoJson", "6.21.4")
+    write_archive(root, "bblanchon", "ArduinoJson", "7.0.0")
+    write_archive(root, "adafruit", "Adafruit BusIO", "1.14.1")
+    write_archive(root, "adafruit", "Adafruit BusIO", "1.16.0")
+    write_archive(root, "adafruit", "Adafruit Unified Sensor", "1.1.9")
+    write_archive(
+        root,
+        "adafruit",
+        "Adafruit SHT31 Library",
+        "2.2.0",
+        [
+            {"owner": "adafruit", "name": "Adafruit BusIO", "version": "~1.14.0"},
+            {"name": "TinyWireM", "platforms": "atmelavr"},
+        ],
+    )
+    write_archive(root, "adafruit", "Adafruit SHT31 Library", "3.0.0")
+    return root
+
+
+@pytest.fixture
+def mirror(tmp_path, registry_dir):
+    return PackageMirror(
+        str(tmp_path / "mirror"), registry=DirectoryRegistry(registry_dir)
+    )
+
+
+def mirrored(mirror, owner, filename):
+    return "file://" + os.path.join(mirror.mirror_dir, owner, filename).replace(
+        os.sep, "/"
+    )
+
+
+@pytest.mark.parametrize(
+    "version, requirement, expected",
+    [
+        ("1.2.3", "", True),
+        ("1.2.3", "*", True),
+        ("6.21.4", "6.21.4", True),
+        ("6.21.5", "6.21.4", False),
+        ("6.21.4", "=6.21.4", True),
+        ("1.9.0", "^1.2.0", True),
+        ("2.0.0", "^1.2.0", False),
+        ("1.1.9", "^1.2.0", False),
+        ("0.2.5", "^0.2.1", True),
+        ("0.3.0", "^0.2.1", False),
+        ("0.0.3", "^0.0.3", True),
+        ("0.0.4", "^0.0.3", False),
+        ("1.2.9", "~1.2.3", True),
+        ("1.3.0", "~1.2.3", False),
+        ("1.5.0", ">=1.0 <2", True),
+        ("2.0.0", ">=1.0 <2", False),
+        ("1.5.0", ">=1.0,<2", True),
+        ("1.0.0", ">1.0.0", False),
+        ("1.0.0", "!=1.0.0", False),
+        ("1.0", "1.0.0", True),
+        ("v1.2.3", "^1.0.0", True),
+        ("latest", "*", False),
+        ("1.0.0", "^banana", False),
+    ],
+)
+def test_version_satisfies(version, requirement, expected):
+    assert version_satisfies(version, requirement) is expected
+
+
+def test_pick_version():
+    versions = ["1.14.1", "1.16.0", "2.0.0", "1.9.10", "not-a-version"]
+
+    assert pick_version(versions, "^1.14.0") == "1.16.0"
+    assert pick_version(versions, "~1.14.0") == "1.14.1"
+    assert pick_version(versions, "") == "2.0.0"
+    assert pick_version(versions, ">=1.9 <1.10") == "1.9.10"
+    assert pick_version(versions, "^3.0.0") is None
+
+
+def test_parse_dependency():
+    assert parse_dependency("adafruit/Adafruit APDS9960 Library @ ^1.1.4") == (
+        "adafruit",
+        "Adafruit APDS9960 Library",
+        "^1.1.4",
+    )
+    assert parse_dependency("ArduinoJson@6.21.4") == (None, "ArduinoJson", "6.21.4")
+    assert parse_dependency("tzapu/WiFiManager") == ("tzapu", "WiFiManager", "")
+
+
+def test_manifest_dependencies_for_platform(registry_dir):
+    manifest = read_archive_manifest(
+        os.path.join(registry_dir, "adafruit", "Adafruit_SHT31_Library@2.2.0.tar.gz")
+    )
+
+    assert get_manifest_dependencies(manifest, "espressif32") == [
+        "adafruit/Adafruit BusIO@~1.14.0"
+    ]
+    assert get_manifest_dependencies(manifest, "atmelavr") == [
+        "adafruit/Adafruit BusIO@~1.14.0",
+        "TinyWireM",
+    ]
+    assert get_manifest_dependencies({"dependencies": {"OneWire": "^2.3"}}) == [
+        "OneWire@^2.3"
+    ]
+
+
+def test_resolve_fetches_into_the_mirror(mirror):
+    resolved = mirror.resolve(
+        ["bblanchon/ArduinoJson@6.21.4", "adafruit/Adafruit SHT31 Library@^2.2.0"],
+        "espressif32",
+    )
+
+    assert resolved == [
+        mirrored(mirror, "bblanchon", "ArduinoJson@6.21.4.tar.gz"),
+        mirrored(mirror, "adafruit", "Adafruit_SHT31_Library@2.2.0.tar.gz"),
+        # from the SHT31 library.json
+        mirrored(mirror, "adafruit", "Adafruit_BusIO@1.14.1.tar.gz"),
+    ]
+    assert sorted(os.listdir(os.path.join(mirror.mirror_dir, "adafruit"))) == [
+        "Adafruit_BusIO@1.14.1.tar.gz",
+        "Adafruit_SHT31_Library@2.2.0.tar.gz",
+    ]
+
+
+def test_resolve_without_owner(mirror):
+    assert mirror.resolve(["ArduinoJson@^6.0.0"]) == [
+        mirrored(mirror, "bblanchon", "ArduinoJson@6.21.4.tar.gz")
+    ]
+
+
+def test_resolve_prefers_the_mirror(mirror, registry_dir):
+    mirror.resolve(["adafruit/Adafruit BusIO@~1.14.0"])
+
+    # 1.16.0 is in the registry, but 1.14.1 already satisfies the spec
+    assert mirror.resolve(["adafruit/Adafruit BusIO@^1.14.0"]) == [
+        mirrored(mirror, "adafruit", "Adafruit_BusIO@1.14.1.tar.gz")
+    ]
+
+
+def test_resolve_deduplicates(mirror):
+    resolved = mirror.resolve(
+        [
+            "adafruit/Adafruit SHT31 Library@^2.2.0",
+            "adafruit/Adafruit BusIO@~1.14",
+            "adafruit/Adafruit SHT31 Library@^2.2.0",
+        ]
+    )
+
+    assert len(resolved) == 2
+
+
+def test_offline_mode_uses_only_the_mirror(tmp_path, mirror, registry_dir):
+    mirror.resolve(["bblanchon/ArduinoJson@6.21.4"])
+    offline = PackageMirror(
+        mirror.mirror_dir, registry=DirectoryRegistry(registry_dir), offline=True
+    )
+
+    resolved = offline.resolve(
+        ["bblanchon/ArduinoJson@6.21.4", "adafruit/Adafruit Unified Sensor"]
+    )
+
+    assert resolved == [
+        mirrored(mirror, "bblanchon", "ArduinoJson@6.21.4.tar.gz"),
+        "adafruit/Adafruit Unified Sensor",
+    ]
+    assert not os.path.exists(os.path.join(mirror.mirror_dir, "adafruit"))
+
+
+def test_url_dependencies_pass_through(mirror):
+    url = "https://github.com/labay11/MQ-2-sensor-library.git"
+
+    assert mirror.resolve([url, "file:///libs/Local.zip"]) == [
+        url,
+        "file:///libs/Local.zip",
+    ]
+    assert not os.path.exists(mirror.mirror_dir)
+
+
+def test_missing_spec_falls_back_to_the_registry_name(mirror):
+    resolved = mirror.resolve(
+        ["knolleary/PubSubClient", "bblanchon/ArduinoJson@^8.0.0", "ArduinoJson@^6"]
+    )
+
+    assert resolved == [
+        "knolleary/PubSubClient",
+        "bblanchon/ArduinoJson@^8.0.0",
+        mirrored(mirror, "bblanchon", "ArduinoJson@6.21.4.tar.gz"),
+    ]
+
+
+def test_missing_transitive_dependency_is_left_to_platformio(tmp_path):
+    registry = str(tmp_path / "registry")
+    write_archive(registry, "someone", "Sensor", "1.0.0", [{"name": "Unknown"}])
+    mirror = PackageMirror(
+        str(tmp_path / "mirror"), registry=DirectoryRegistry(registry)
+    )
+
+    assert mirror.resolve(["someone/Sensor"]) == [
+        mirrored(mirror, "someone", "Sensor@1.0.0.tar.gz")
+    ]
+
+
+def test_mirror_lib_deps_modes(monkeypatch, tmp_path, registry_dir):
+    deps = ["ArduinoJson@6.21.4"]
+    monkeypatch.setattr(
+        "core.package_mirror.get_app_dir", lambda: str(tmp_path / "app")
+    )
+    monkeypatch.setenv("MOJOSCALE_PACKAGE_REGISTRY", registry_dir)
+
+    monkeypatch.delenv("MOJOSCALE_PACKAGE_MIRROR", raising=False)
+    assert mirror_lib_deps(deps) == deps
+
+    monkeypatch.setenv("MOJOSCALE_PACKAGE_MIRROR", "offline")
+    assert mirror_lib_deps(deps) == deps
+
+    monkeypatch.setenv("MOJOSCALE_PACKAGE_MIRROR", "on")
+    (resolved,) = mirror_lib_deps(deps)
+    assert resolved.startswith("file://")
+    assert resolved.endswith("/package_mirror/bblanchon/ArduinoJson@6.21.4.tar.gz")
+
+    # now mirrored, so available offline too
+    monkeypatch.setenv("MOJOSCALE_PACKAGE_MIRROR", "offline")
+    assert mirror_lib_deps(deps) == [resolved]
+
+
+def test_parallel_builds_download_once(tmp_path, registry_dir):
+    downloads = []
+
+    class CountingRegistry(DirectoryRegistry):
+        def download(self, *args):
+            downloads.append(args[:3])
+            return super().download(*args)
+
+    registry = CountingRegistry(registry_dir)
+    mirror_dir = str(tmp_path / "mirror")
+    # one PackageMirror per platformio.ini, as write_platformio_ini does
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                PackageMirror(mirror_dir, registry=registry).resolve(
+                    ["bblanchon/ArduinoJson@6.21.4"]
+                )
+            )
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert downloads == [("bblanchon", "ArduinoJson", "6.21.4")]
+    assert len({tuple(result) for result in results}) == 1
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import pytest
+
+from core.compiler import CompilerSession, transpile_project
+from core.transpiler.result_cache import get_result_key, load_transpile_result
+from core.transpiler.transpiler import main as transpiler_main
+
+SKETCH = """import core.env_vars as env
+
+
+def setup() -> None:
+    print(env.get_env_var("WIFI_SSID"))
+
+
+def loop() -> None:
+    pass
+"""
+
+PLAIN_SKETCH = """def setup() -> None:
+    print("hello")
+
+
+def loop() -> None:
+    pass
+"""
+
+
+def _transpile(py_files):
+    session = CompilerSession()
+    session.quiet = True
+    return asyncio.run(transpile_project(session, py_files, "espressif32"))
+
+
+def _with_incremental(incremental):
+    def transpile(*args, **kwargs):
+        return transpiler_main(*args, incremental=incremental, **kwargs)
+
+    return transpile
+
+
+def _set_env(monkeypatch, name, value):
+    monkeypatch.setenv(name, json.dumps({"value": value}))
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_env_var_change_misses_cache(monkeypatch, incremental):
+    monkeypatch.setattr(
+        "core.compiler.transpiler_main", _with_incremental(incremental)
+    )
+    py_files = {"main.py": SKETCH}
+    key = get_result_key(py_files, "espressif32", 115200)
+
+    _set_env(monkeypatch, "WIFI_SSID", "old-network")
+    first = _transpile(py_files)
+    assert first["uses_eval"]
+    assert "old-network" in first["code"]["main.py"]
+    assert load_transpile_result(key) is None
+
+    _set_env(monkeypatch, "WIFI_SSID", "new-network")
+    second = _transpile(py_files)
+    assert "new-network" in second["code"]["main.py"]
+    assert "old-network" not in second["code"]["main.py"]
+
+
+def test_unchanged_sketch_hits_cache():
+    py_files = {"main.py": PLAIN_SKETCH}
+
+    first = _transpile(py_files)
+    assert not first["uses_eval"]
+
+    cached = load_transpile_result(get_result_key(py_files, "espressif32", 115200))
+    assert cached == first
@@ -0,0 +1,166 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from core.size_report import (
+    _classify_object,
+    analyze_firmware_size,
+    demangle,
+    format_top_consumers,
+    parse_map_file,
+)
+
+# firmware.elf and firmware.map linked from src/, include/ and lib/ by build.sh
+FIXTURE_DIR = os.path.join(FIXTURES_DIR, "size_report")
+SKETCH_OBJECT = ".pio/build/esp32dev/src/main.ino.cpp.o"
+LIBRARY_OBJECT = ".pio/build/esp32dev/lib0a1/libFilter.a(filter.cpp.o)"
+
+
+@pytest.mark.parametrize(
+    "mangled, expected",
+    [
+        ("_Z5setupv", "setup"),
+        ("_Z5blinki", "blink"),
+        ("_ZN6PyList6appendEi", "PyList::append"),
+        ("_ZN6PyListC2Ev", "PyList::PyList"),
+        ("_ZN6PyListD1Ev", "PyList::~PyList"),
+        ("_ZNSt6vectorIiSaIiEE9push_backERKi", "std::vector::push_back"),
+        ("_ZNK6PyList3getEi", "PyList::get"),
+        # function-local statics
+        ("_ZZ5setupvE5count", "setup::count"),
+        ("_ZZ4loopvE5count_0", "loop::count"),
+        ("_ZZ3fooRK6PyListE7scratch__12_", "foo::scratch"),
+        ("_ZZN6PyList6appendEiE8appended", "PyList::append::appended"),
+        ("_ZZ5setupvE6countE", "setup::countE"),
+        ("_ZZ4loopvEs", "loop::string literal"),
+        ("_ZZ5setupvENKUlvE_clEv", "setup"),
+        # special names are charged to what they belong to
+        ("_ZGVZ5setupvE5count", "setup::count"),
+        ("_ZTV6PyList", "PyList"),
+        ("_ZTI6PyList", "PyList"),
+        # not mangled
+        ("main", "main"),
+        ("filter_state", "filter_state"),
+    ],
+)
+def test_demangle(mangled, expected):
+    assert demangle(mangled) == expected
+
+
+def test_parse_map_file():
+    ranges = parse_map_file(os.path.join(FIXTURE_DIR, "firmware.map"))
+
+    assert ranges == sorted(ranges)
+    # .text._Z5setupv wraps onto the next line in the map
+    assert (0x401018, 0x401052, SKETCH_OBJECT) in ranges
+    assert (0x401081, 0x40109A, LIBRARY_OBJECT) in ranges
+    assert (0x404200, 0x404260, LIBRARY_OBJECT) in ranges
+    # empty input sections are left out
+    assert all(end > start for start, end, _ in ranges)
+
+
+def test_parse_map_file_wrapped_and_inline_names(tmp_path):
+    map_path = tmp_path / "firmware.map"
+    map_path.write_text(
+        "Linker script and memory map\n\n"
+        ".flash.text     0x400d0020    0x1000\n"
+        " .text.loop     0x400d0020       0x2a .pio/build/esp32dev/src/main.ino.cpp.o\n"
+        "                0x400d0020                loop()\n"
+        " .literal._ZN6PyList6appendEi\n"
+        "                0x400d004c        0x8 .pio/build/esp32dev/src/main.ino.cpp.o\n"
+        " .text          0x400d0054        0x0 /pkgs/libc.a(lib_a-memcpy.o)\n"
+        " .text.memcpy   0x400d0054       0x40 /pkgs/toolchain-xtensa/lib/libc.a(lib_a-memcpy.o)\n",
+        encoding="utf-8",
+    )
+
+    assert parse_map_file(str(map_path)) == [
+        (0x400D0020, 0x400D004A, ".pio/build/esp32dev/src/main.ino.cpp.o"),
+        (0x400D004C, 0x400D0054, ".pio/build/esp32dev/src/main.ino.cpp.o"),
+        (0x400D0054, 0x400D0094, "/pkgs/toolchain-xtensa/lib/libc.a(lib_a-memcpy.o)"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "obj, expected",
+    [
+        (SKETCH_OBJECT, ("main.ino", "sketch")),
+        (LIBRARY_OBJECT, ("Filter", "library")),
+        (
+            "/pkgs/toolchain-xtensa-esp32/lib/libc.a(lib_a-memcpy.o)",
+            ("libc.a", "toolchain"),
+        ),
+        (
+            ".pio/build/esp32dev/libFrameworkArduino.a(HardwareSerial.cpp.o)",
+            ("Arduino framework", "framework"),
+        ),
+    ],
+)
+def test_classify_object(obj, expected):
+    assert _classify_object(obj) == expected
+
+
+@pytest.fixture
+def build_dir(tmp_path):
+    """A build folder laid out like PlatformIO's, holding the fixture firmware."""
+    board_dir = tmp_path / ".pio" / "build" / "esp32dev"
+    board_dir.mkdir(parents=True)
+    for name in ("firmware.elf", "firmware.map"):
+        shutil.copyfile(os.path.join(FIXTURE_DIR, name), board_dir / name)
+    shutil.copytree(os.path.join(FIXTURE_DIR, "include"), tmp_path / "include")
+    return str(tmp_path)
+
+
+def get_py_files():
+    with open(os.path.join(FIXTURE_DIR, "main.py"), encoding="utf-8") as f:
+        return {"main.py": f.read()}
+
+
+def test_analyze_firmware_size_groups(build_dir):
+    report = analyze_firmware_size(build_dir, "esp32dev", get_py_files())
+    groups = {(g["kind"], g["name"]): g for g in report["groups"]}
+
+    # setup() and its static banner[48], which lives in .data
+    setup = groups[("function", "setup")]
+    assert setup["source"] == "main.py:11"
+    assert (setup["flash"], setup["ram"], setup["symbols"]) == (58 + 48, 48, 2)
+
+    loop = groups[("function", "loop")]
+    assert (loop["flash"], loop["ram"], loop["symbols"]) == (37, 4, 2)
+
+    blink = groups[("function", "blink")]
+    assert (blink["flash"], blink["ram"]) == (15, 4)
+
+    helper = groups[("helper", "PyList.h")]
+    assert helper["source"] == "include/PyList.h"
+    assert helper["ram"] == 4
+
+    library = groups[("library", "Filter")]
+    assert (library["flash"], library["ram"]) == (25, 96)
+
+    # globals and functions that are not a def in main.py
+    sketch = groups[("sketch", "main.ino")]
+    assert sketch["ram"] == 0x100 + 0x84
+    assert sketch["symbols"] == 4
+
+    assert report["flash"] == sum(g["flash"] for g in report["groups"])
+    assert report["ram"] == sum(g["ram"] for g in report["groups"])
+
+
+def test_analyze_firmware_size_top_symbols(build_dir):
+    report = analyze_firmware_size(build_dir, "esp32dev", get_py_files(), top=3)
+
+    assert [row["symbol"] for row in report["top_symbols"]] == [
+        "sensor_history",
+        "readings",
+        "filter_state",
+    ]
+    assert report["top_symbols"][0]["region"] == "ram"
+
+    table = format_top_consumers(report, limit=len(report["groups"]))
+    assert "setup() (main.py:11)" in table
+
+
+def test_analyze_firmware_size_without_firmware(tmp_path):
+    assert analyze_firmware_size(str(tmp_path), "esp32dev", {}) is None
@@ -0,0 +1,142 @@
+import ast
+import glob
+import os
+
+import pytest
+
+from core.compiler import CORE_LIBS_PATH, STARTER_TEMPLATE
+from core.template_closure import get_template_closure, get_template_index
+
+TEMPLATE_FILES = {
+    "include/PyRuntime.h": '#include "PyList.h"\n',
+    "include/PyList.h": "#pragma once\n",
+    "scripts/pch.py": "Import('env')\n",
+    "include/helpers/sensors/DHTHelper.h": (
+        '#include <DHT.h>\n#include "../common/Filter.h"\n'
+    ),
+    "include/helpers/common/Filter.h": "#pragma once\n",
+    "include/helpers/actuators/ServoHelper.h": "#include <Servo.h>\n",
+    "include/helpers/WifiHelper.h": '#include "common/Filter.h"\n',
+    "lib/DHT/DHT.h": '#include "DHT_U.h"\n#include <OneWire.h>\n',
+    "lib/DHT/DHT_U.h": "#pragma once\n",
+    "lib/DHT/DHT.cpp": '#include "DHT.h"\n',
+    "lib/OneWire/OneWire.h": "#pragma once\n",
+    "lib/OneWire/OneWire.cpp": '#include "OneWire.h"\n',
+    "lib/Servo/Servo.h": "#pragma once\n",
+    "lib/NewPing/src/NewPing.h": "#pragma once\n",
+    "lib/SensorA/Sensor.h": "#pragma once\n",
+    "lib/SensorB/Sensor.h": "#pragma once\n",
+    "lib/SensorB/SensorB.cpp": '#include "Sensor.h"\n',
+}
+
+ALWAYS_KEPT = ["include/PyList.h", "include/PyRuntime.h", "scripts/pch.py"]
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    for rel_path, code in TEMPLATE_FILES.items():
+        path = tmp_path.joinpath(*rel_path.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(code, encoding="utf-8")
+    return str(tmp_path)
+
+
+def test_sketch_without_includes_keeps_only_the_runtime(template_dir):
+    sources = ['#include "PyList.h"\nvoid setup() {}\n']
+    assert get_template_closure(template_dir, sources) == ALWAYS_KEPT
+
+
+def test_helper_include_chain(template_dir):
+    sources = ['#include "helpers/sensors/DHTHelper.h"\n']
+    assert get_template_closure(template_dir, sources) == sorted(
+        ALWAYS_KEPT
+        + [
+            "include/helpers/common/Filter.h",
+            "include/helpers/sensors/DHTHelper.h",
+            # reached from the helper, then from DHT.h
+            "lib/DHT/DHT.cpp",
+            "lib/DHT/DHT.h",
+            "lib/DHT/DHT_U.h",
+            "lib/OneWire/OneWire.cpp",
+            "lib/OneWire/OneWire.h",
+        ]
+    )
+
+
+def test_library_header_in_a_subdirectory(template_dir):
+    closure = get_template_closure(template_dir, ["#include <NewPing.h>\n"])
+    assert "lib/NewPing/src/NewPing.h" in closure
+    assert "lib/DHT/DHT.h" not in closure
+
+
+def test_same_basename_headers_keep_every_library(template_dir):
+    closure = get_template_closure(template_dir, ["#include <Sensor.h>\n"])
+    assert {
+        "lib/SensorA/Sensor.h",
+        "lib/SensorB/Sensor.h",
+        "lib/SensorB/SensorB.cpp",
+    } <= set(closure)
+
+
+def test_lib_deps_named_libraries_are_kept(template_dir):
+    closure = get_template_closure(
+        template_dir, [], dependencies=["adafruit/Servo@^1.2", "someone/Unknown"]
+    )
+    assert closure == sorted(ALWAYS_KEPT + ["lib/Servo/Servo.h"])
+
+    closure = get_template_closure(template_dir, [], dependencies=["OneWire"])
+    assert "lib/OneWire/OneWire.cpp" in closure
+
+
+def test_framework_headers_are_ignored(template_dir):
+    sources = ["#include <Arduino.h>\n#include <WiFi.h>\n"]
+    assert get_template_closure(template_dir, sources) == ALWAYS_KEPT
+
+
+def test_includes_match_case_insensitively(template_dir):
+    sources = ['#include "helpers/WiFiHelper.h"\n#include <onewire.h>\n']
+    assert get_template_closure(template_dir, sources) == sorted(
+        ALWAYS_KEPT
+        + [
+            "include/helpers/WifiHelper.h",
+            "include/helpers/common/Filter.h",
+            "lib/OneWire/OneWire.cpp",
+            "lib/OneWire/OneWire.h",
+        ]
+    )
+
+
+def _get_internal_includes(path):
+    """helpers/... entries of a core lib's __include_internal_modules__."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    values = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == "__include_internal_modules__"
+            for t in node.targets
+        ):
+            value = ast.literal_eval(node.value)
+            values += value.values() if isinstance(value, dict) else [value]
+
+    # the others (e.g. "SPIFFS") are framework headers
+    return [
+        name.strip()
+        for value in values
+        for name in value.split(",")
+        if name.strip().startswith("helpers/")
+    ]
+
+
+def test_every_core_lib_helper_is_in_the_template():
+    index = get_template_index(str(STARTER_TEMPLATE))
+    core_libs = glob.glob(os.path.join(CORE_LIBS_PATH, "**", "*.py"), recursive=True)
+
+    checked = 0
+    for path in core_libs:
+        for helper in _get_internal_includes(path):
+            header = f"{helper}.h"
+            assert index.resolve('"', header) == [f"include/{header}"], path
+            checked += 1
+    assert checked > 0
@@ -0,0 +1,220 @@
+import os
+
+import pytest
+
+from core.translation_units import (
+    SplitError,
+    split_function,
+    split_global,
+    split_module,
+    split_translation_units,
+)
+
+
+def _unit(kind, name, code):
+    return {"kind": kind, "name": name, "code": code}
+
+
+MAIN_UNITS = [
+    _unit("include", None, '#include "PyList.h"'),
+    _unit("global", "counter", "int counter = 0;"),
+    _unit("global", "readings", "PyList<int> readings = PyList<int>({1, 2});"),
+    _unit(
+        "function",
+        "blink",
+        'void blink(int times = 3, String label = String("a,b")) {\n'
+        "    counter += times;\n"
+        "}",
+    ),
+    _unit("function", "setup", "void setup() {\n    blink();\n}"),
+    _unit("function", "loop", "void loop() {\n}"),
+]
+
+
+@pytest.mark.parametrize(
+    "code, prototype, definition_signature",
+    [
+        ("void setup() {\n}", "void setup();", "void setup()"),
+        (
+            "int add(int a = 1, int b = 2) { return a + b; }",
+            "int add(int a = 1, int b = 2);",
+            "int add(int a, int b)",
+        ),
+        # commas and `=` inside defaults are not separators
+        (
+            'void log(String s = String("x,y"), PyList<int> l = PyList<int>({1, 2})) {}',
+            'void log(String s = String("x,y"), PyList<int> l = PyList<int>({1, 2}));',
+            "void log(String s, PyList<int> l)",
+        ),
+        (
+            'void greet(String s = "a==b") {}',
+            'void greet(String s = "a==b");',
+            "void greet(String s)",
+        ),
+        (
+            "PyDict<String, int> make() {\n    return {};\n}",
+            "PyDict<String, int> make();",
+            "PyDict<String, int> make()",
+        ),
+    ],
+)
+def test_split_function(code, prototype, definition_signature):
+    name = code.split("(")[0].split()[-1]
+    declaration, definition = split_function(name, code)
+    assert declaration == prototype
+    assert definition.startswith(definition_signature + " {")
+    assert definition.endswith("}")
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "void setup();",
+        "#define setup() 1",
+    ],
+)
+def test_split_function_rejects_non_definitions(code):
+    with pytest.raises(SplitError):
+        split_function("setup", code)
+
+
+@pytest.mark.parametrize(
+    "name, code, declaration",
+    [
+        ("counter", "int counter = 0;", "extern int counter;"),
+        (
+            "readings",
+            "PyList<int> readings = PyList<int>({1, 2});",
+            "extern PyList<int> readings;",
+        ),
+        ("name", 'String name("x");', "extern String name;"),
+        ("table", "PyDict<String, int> table;", "extern PyDict<String, int> table;"),
+    ],
+)
+def test_split_global(name, code, declaration):
+    assert split_global(name, code) == (declaration, code)
+
+
+@pytest.mark.parametrize(
+    "name, code",
+    [
+        ("counter", "auto counter = 0;"),
+        ("counter", "static int counter = 0;"),
+        ("counter", "extern int counter;"),
+        ("counter", "int counter = 0; int other = 1;"),
+        ("counter", "int counter = 0"),
+        ("counter", "counter = 0;"),
+    ],
+)
+def test_split_global_rejects(name, code):
+    with pytest.raises(SplitError):
+        split_global(name, code)
+
+
+def test_split_main_module():
+    files = split_module("main.py", MAIN_UNITS)
+
+    assert sorted(files) == [
+        os.path.join("include", "main.h"),
+        os.path.join("src", "main.blink.cpp"),
+        os.path.join("src", "main.cpp"),
+        os.path.join("src", "main.loop.cpp"),
+        os.path.join("src", "main.setup.cpp"),
+    ]
+
+    header = files[os.path.join("include", "main.h")]
+    assert header.startswith("#pragma once\n#include <Arduino.h>\n")
+    assert "extern int counter;" in header
+    assert 'void blink(int times = 3, String label = String("a,b"));' in header
+
+    globals_cpp = files[os.path.join("src", "main.cpp")]
+    assert globals_cpp.startswith('#include "main.h"\n')
+    assert "int counter = 0;" in globals_cpp
+
+    blink_cpp = files[os.path.join("src", "main.blink.cpp")]
+    assert "void blink(int times, String label) {" in blink_cpp
+    assert "= 3" not in blink_cpp
+
+
+def test_split_user_module_into_one_source():
+    files = split_module(
+        "sensors.py",
+        [
+            _unit("global", "last", "float last = 0.0;"),
+            _unit("function", "read", "float read() {\n    return last;\n}"),
+        ],
+    )
+    assert sorted(files) == [
+        os.path.join("include", "sensors.h"),
+        os.path.join("src", "sensors.cpp"),
+    ]
+    source = files[os.path.join("src", "sensors.cpp")]
+    assert "float last = 0.0;" in source
+    assert "float read() {" in source
+
+
+def test_template_functions_stay_in_the_header():
+    template = (
+        "template <typename T>\nT first(PyList<T> items) {\n    return items[0];\n}"
+    )
+    files = split_module(
+        "main.py",
+        [
+            _unit("function", "first", template),
+            _unit("function", "setup", "void setup() {}"),
+        ],
+    )
+
+    assert template in files[os.path.join("include", "main.h")]
+    assert os.path.join("src", "main.first.cpp") not in files
+    assert os.path.join("src", "main.setup.cpp") in files
+
+
+def test_duplicate_function_is_rejected():
+    with pytest.raises(SplitError):
+        split_module(
+            "main.py",
+            [
+                _unit("function", "setup", "void setup() {}"),
+                _unit("function", "setup", "void setup() {}"),
+            ],
+        )
+
+
+@pytest.mark.parametrize(
+    "include",
+    [
+        '#include "helpers/sensors/DHTHelper.h"',
+        '#include "sensors.h"',
+    ],
+)
+def test_non_runtime_include_keeps_single_file(include):
+    units = {"main.py": [_unit("include", None, include)] + MAIN_UNITS[1:]}
+    assert split_translation_units(units) is None
+
+
+def test_system_includes_are_allowed():
+    units = {"main.py": [_unit("include", None, "#include <Wire.h>")] + MAIN_UNITS}
+    files = split_translation_units(units)
+    assert "#include <Wire.h>" in files[os.path.join("include", "main.h")]
+
+
+def test_unsplittable_project_keeps_single_file():
+    assert split_translation_units({}) is None
+    assert split_translation_units({"sensors.py": []}) is None
+    units = {"main.py": [_unit("global", "counter", "auto counter = 0;")]}
+    assert split_translation_units(units) is None
+
+
+def test_file_names_only_depend_on_python_names():
+    units = {"main.py": MAIN_UNITS}
+    files = split_translation_units(units)
+    assert split_translation_units(units) == files
+
+    edited = [dict(unit) for unit in MAIN_UNITS]
+    edited[-1]["code"] = "void loop() {\n    delay(10);\n}"
+    edited_files = split_translation_units({"main.py": edited})
+
+    assert sorted(edited_files) == sorted(files)
+    changed = [path for path in files if files[path] != edited_files[path]]
+    assert changed == [os.path.join("src", "main.loop.cpp")]